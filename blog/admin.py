@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Count
+from .cache import invalidate_listing, invalidate_sitemap
 from .models import Post, Category, Comment, PostImage, PostVideo
+from .search import reindex_posts
+from core.indexnow import send_indexnow
+from core.jobs import enqueue_unique
 
 # ------------------ Category Admin ------------------
 @admin.register(Category)
@@ -150,17 +154,35 @@ class PostAdmin(admin.ModelAdmin):
     
     def make_published(self, request, queryset):
         from django.utils import timezone
+        posts = dict(queryset.values_list('pk', 'slug'))
         updated = queryset.update(status='published', published_at=timezone.now())
+        # update() مابيبعتش signals، فالكاش وفهرس البحث والمقالات ذات الصلة وIndexNow بيتحدثوا هنا
+        reindex_posts(list(posts))
+        for pk in posts:
+            enqueue_unique('blog.related', post_id=pk)
+        send_indexnow(*[f"https://alagme.com/blog/{slug}/" for slug in posts.values()])
+        invalidate_listing()
+        invalidate_sitemap()
         self.message_user(request, f'تم نشر {updated} مقال')
     make_published.short_description = 'نشر المقالات المحددة'
     
     def make_draft(self, request, queryset):
+        posts = dict(queryset.values_list('pk', 'slug'))
         updated = queryset.update(status='draft')
+        # update() مابيبعتش signals، فالكاش وفهرس البحث والمقالات ذات الصلة وIndexNow بيتحدثوا هنا
+        # (IndexNow بياخد الروابط اللي اتشالت كمان عشان تخرج من النتايج)
+        reindex_posts(list(posts))
+        for pk in posts:
+            enqueue_unique('blog.related', post_id=pk)
+        send_indexnow(*[f"https://alagme.com/blog/{slug}/" for slug in posts.values()])
+        invalidate_listing()
+        invalidate_sitemap()
         self.message_user(request, f'تم تحويل {updated} مقال إلى مسودة')
     make_draft.short_description = 'تحويل إلى مسودة'
     
     def make_featured(self, request, queryset):
         updated = queryset.update(is_featured=True)
+        invalidate_listing()
         self.message_user(request, f'تم تمييز {updated} مقال')
     make_featured.short_description = 'تمييز المقالات'
 
@@ -198,10 +220,12 @@ class CommentAdmin(admin.ModelAdmin):
     
     def approve_comments(self, request, queryset):
         updated = queryset.update(is_approved=True)
+        invalidate_listing()
         self.message_user(request, f'تمت الموافقة على {updated} تعليق')
     approve_comments.short_description = 'الموافقة على التعليقات'
     
     def unapprove_comments(self, request, queryset):
         updated = queryset.update(is_approved=False)
+        invalidate_listing()
         self.message_user(request, f'تم إلغاء الموافقة على {updated} تعليق')
     unapprove_comments.short_description = 'إلغاء الموافقة'
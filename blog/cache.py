@@ -0,0 +1,42 @@
+"""namespaces الكاش بتاعة البلوج (core/cache_versions.py).
+
+- 'blog': أي حاجة معتمدة على قايمة المقالات (صفحة البلوج، التصنيفات، الشريط الجانبي).
+- 'blog:post:<id>': أجزاء صفحة مقال واحد.
+- 'sitemap': الـ sitemap.xml المتخزن في كاش 'sitemap' (ملفات على كل dyno)، والإصدار
+  في الكاش المشترك زي الباقي عشان التعديل يبطّله على كل الـ dynos.
+"""
+from core.cache_versions import bump_version, versioned_key
+
+BLOG_NAMESPACE = 'blog'
+SITEMAP_NAMESPACE = 'sitemap'
+
+
+def post_namespace(post_id):
+    return f'{BLOG_NAMESPACE}:post:{post_id}'
+
+
+def blog_cache_key(*parts):
+    return versioned_key(BLOG_NAMESPACE, *parts)
+
+
+def post_cache_key(post_id, *parts):
+    return versioned_key(post_namespace(post_id), *parts)
+
+
+def sitemap_cache_key(*parts):
+    return versioned_key(SITEMAP_NAMESPACE, *parts)
+
+
+def invalidate_sitemap():
+    bump_version(SITEMAP_NAMESPACE)
+
+
+def invalidate_listing():
+    """تصنيف أو فيديو اتغير: قايمة البلوج والشريط الجانبي بس"""
+    bump_version(BLOG_NAMESPACE)
+
+
+def invalidate_post(post_id):
+    """مقال اتعدل/اتنشر/اتمسح: القايمة + الـ sitemap + أجزاء المقال ده بس"""
+    bump_version(BLOG_NAMESPACE, post_namespace(post_id))
+    invalidate_sitemap()
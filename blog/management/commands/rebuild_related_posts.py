@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    """
+    بيعيد حساب المقالات ذات الصلة (blog/related.py) لكل المقالات المنشورة.
+    حفظ أي مقال بيحدّثه هو وجيرانه في الخلفية، فده محتاجينه أول مرة بعد
+    الـ migration، أو بعد تعديل الأوزان، أو من cron بالليل عشان الـ IDF يتظبط
+    لكل المقالات بعد إضافة مقالات كتير.
+
+    الاستخدام:
+        python manage.py rebuild_related_posts
+    """
+    help = 'يعيد حساب المقالات ذات الصلة بالتشابه في المحتوى'
+
+    def handle(self, *args, **options):
+        count = rebuild_related_posts()
+        self.stdout.write(self.style.SUCCESS(f'تم حساب المقالات ذات الصلة لـ {count} مقال.'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerms',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='terms', serialize=False, to='blog.post')),
+                ('terms', models.JSONField(default=dict, verbose_name='الكلمات')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'كلمات مقال',
+                'verbose_name_plural': 'كلمات المقالات',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='درجة التشابه')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='الترتيب')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_from', to='blog.post')),
+            ],
+            options={
+                'verbose_name': 'مقال ذو صلة',
+                'verbose_name_plural': 'المقالات ذات الصلة',
+                'ordering': ['post', 'rank'],
+                'indexes': [models.Index(fields=['post', 'rank'], name='blog_related_post_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'related'), name='blog_relatedpost_unique_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.utils.html import strip_tags
+
+from core.search import index_text
+
+POST_KIND = 'blog.post'
+
+
+def fill_post_index(apps, schema_editor):
+    """نفس blog.search.rebuild_post_index للمقالات المنشورة قبل ما الفهرس يتعمل،
+    عشان البحث مايرجعش فاضي لحد ما كل مقال يتحفظ تاني"""
+    Post = apps.get_model('blog', 'Post')
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    posts = Post.objects.filter(status='published').only('pk', 'title', 'excerpt', 'keywords', 'content')
+    documents = [
+        SearchDocument(
+            kind=POST_KIND, object_id=post.pk, title=index_text(post.title),
+            body=index_text(' '.join(filter(None, [post.excerpt, post.keywords, strip_tags(post.content or '')]))),
+        )
+        for post in posts.iterator(chunk_size=200)
+    ]
+    SearchDocument.objects.bulk_create(
+        documents, batch_size=200,
+        update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['title', 'body', 'updated_at'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_related_posts'),
+        ('core', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_post_index, migrations.RunPython.noop),
+    ]
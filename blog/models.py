@@ -2,10 +2,23 @@ from django.db import models
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 import uuid
-import cloudinary.uploader
+
+from core.slugs import save_with_unique_slug
+from core.view_counters import post_views
 
 User = get_user_model()
 
+
+def image_display_url(obj):
+    if obj.cloud_url:
+        return obj.cloud_url
+    return obj.image.url if obj.image else ''
+
+
+def image_variant_url(obj, width):
+    """المقاس المتخزن وقت الرفع (من غير ما القالب يطلب transformation من كلاود)"""
+    return obj.image_variants.get(str(width)) or image_display_url(obj)
+
 class Category(models.Model):
     """تصنيفات المقالات"""
     name = models.CharField(max_length=100, verbose_name='اسم التصنيف')
@@ -44,6 +57,10 @@ class Post(models.Model):
     content = models.TextField(verbose_name='المحتوى')
     image = models.ImageField(upload_to='blog/', blank=True, null=True, verbose_name='الصورة الرئيسية')
     cloud_url = models.URLField(blank=True, null=True, verbose_name='رابط الصورة على كلاود')
+    # المقاسات المشتقة (العرض: الرابط) بتتعمل مرة واحدة وقت الرفع (blog/tasks.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='مقاسات الصورة')
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='عرض الصورة')
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='ارتفاع الصورة')
     # ✅ جديد: نص بديل مخصص للصورة الرئيسية (يفيد الـ SEO وقارئ الشاشة).
     # اختياري تماماً، والمقالات القديمة تعمل بدونه (يتم استخدام العنوان بدلاً منه تلقائياً).
     image_alt = models.CharField(max_length=200, blank=True, verbose_name='النص البديل للصورة (Alt)',
@@ -74,20 +91,6 @@ class Post(models.Model):
     
 
     def save(self, *args, **kwargs):
-        # توليد slug تلقائياً
-        if not self.slug:
-            self.slug = slugify(self.title, allow_unicode=True)
-            original = self.slug
-            counter = 1
-            while Post.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
-                self.slug = f"{original}-{counter}"
-                counter += 1
-        
-        # رفع الصورة على Cloudinary لو موجودة ولم يتم رفعها قبل
-        if self.image and not self.cloud_url:
-            result = cloudinary.uploader.upload(self.image)
-            self.cloud_url = result['secure_url']
-        
         # حساب وقت القراءة
         word_count = len(self.content.split())
         self.reading_time = max(1, round(word_count / 200))
@@ -96,22 +99,53 @@ class Post(models.Model):
         if not self.excerpt and self.content:
             self.excerpt = self.content[:250] + '...'
         
-        super().save(*args, **kwargs)
+        # توليد slug تلقائياً (فريد باستعلام واحد، core/slugs.py)
+        if not self.slug:
+            save_with_unique_slug(
+                self, slugify(self.title, allow_unicode=True), lambda: super(Post, self).save(*args, **kwargs)
+            )
+        else:
+            super().save(*args, **kwargs)
+
+        # رفع الصورة على Cloudinary لو موجودة ولم يتم رفعها قبل (في الخلفية، blog/tasks.py)
+        if self.image and not self.cloud_url:
+            from .tasks import schedule_image_upload
+            schedule_image_upload(self.pk)
 
     
     def __str__(self):
         return self.title
+
+    def get_absolute_url(self):
+        from django.urls import reverse
+        return reverse('blog_detail', kwargs={'slug': self.slug})
     
-    def increment_views(self):
-        """زيادة عدد المشاهدات"""
-        self.views_count += 1
-        self.save(update_fields=['views_count'])
+    def increment_views(self, request=None):
+        """زيادة عدد المشاهدات في الكاش بس (من غير save ولا signals)،
+        والرقم بيتنقل للداتابيز على دفعات من core.view_counters"""
+        # الرقم المعروض = المتسجل في الداتابيز + اللي لسه في الكاش
+        self.views_count += post_views.record(self.pk, request)
 
     @property
     def display_image_alt(self):
         """النص البديل النهائي المستخدم فعلياً في القوالب"""
         return self.image_alt or self.title
 
+    @property
+    def display_url(self):
+        """رابط كلاود لو اترفعت، وإلا الملف المحلي لحد ما الرفع يخلص"""
+        return image_display_url(self)
+
+    @property
+    def card_url(self):
+        """مقاس الكروت (قايمة المقالات والمقالات ذات الصلة)"""
+        return image_variant_url(self, 800)
+
+    @property
+    def thumb_url(self):
+        """مقاس الصور الصغيرة (الشريط الجانبي)"""
+        return image_variant_url(self, 400)
+
 
 class PostImage(models.Model):
     """
@@ -122,6 +156,9 @@ class PostImage(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='gallery_images', verbose_name='المقال')
     image = models.ImageField(upload_to='blog/gallery/', verbose_name='الصورة')
     cloud_url = models.URLField(blank=True, null=True, verbose_name='رابط الصورة على كلاود')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='مقاسات الصورة')
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='عرض الصورة')
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='ارتفاع الصورة')
     caption = models.CharField(max_length=200, blank=True, verbose_name='وصف الصورة (Alt/Caption)')
     order = models.PositiveIntegerField(default=0, verbose_name='الترتيب')
 
@@ -131,10 +168,11 @@ class PostImage(models.Model):
         ordering = ['order', 'id']
 
     def save(self, *args, **kwargs):
-        if self.image and not self.cloud_url:
-            result = cloudinary.uploader.upload(self.image)
-            self.cloud_url = result['secure_url']
         super().save(*args, **kwargs)
+        if self.image and not self.cloud_url:
+            # كل صور المقال بترتفع مع بعض مرة واحدة (blog/tasks.py)
+            from .tasks import schedule_image_upload
+            schedule_image_upload(self.post_id)
 
     def __str__(self):
         return f"صورة - {self.post.title[:30]}"
@@ -143,6 +181,14 @@ class PostImage(models.Model):
     def display_alt(self):
         return self.caption or self.post.title
 
+    @property
+    def display_url(self):
+        return image_display_url(self)
+
+    @property
+    def card_url(self):
+        return image_variant_url(self, 800)
+
 
 class PostVideo(models.Model):
     """
@@ -235,11 +281,74 @@ class Comment(models.Model):
         return f"{self.author_name} - {self.post.title[:30]}"
     
 
-from django.db.models.signals import post_save
+
+class PostTerms(models.Model):
+    """الكلمات المطبّعة ووزنها لكل مقال منشور (مدخل حساب المقالات ذات الصلة، blog/related.py)"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='terms')
+    terms = models.JSONField(default=dict, verbose_name='الكلمات')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'كلمات مقال'
+        verbose_name_plural = 'كلمات المقالات'
+
+
+class RelatedPost(models.Model):
+    """أقرب المقالات لكل مقال (TF-IDF)، محسوبة مسبقًا فصفحة المقال بتعمل استعلام واحد"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_from')
+    score = models.FloatField(verbose_name='درجة التشابه')
+    rank = models.PositiveSmallIntegerField(verbose_name='الترتيب')
+
+    class Meta:
+        verbose_name = 'مقال ذو صلة'
+        verbose_name_plural = 'المقالات ذات الصلة'
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_relatedpost_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['post', 'rank'], name='blog_related_post_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} → {self.related_id} ({self.score:.3f})"
+
+
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
+
+from .cache import invalidate_listing, invalidate_post, invalidate_sitemap
 
 @receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
 def clear_sitemap_cache(sender, instance, **kwargs):
-    """مسح كاش الـ Sitemap عند نشر مقال جديد"""
-    cache.clear()
+    """تبطيل كاش القايمة والـ Sitemap وأجزاء المقال ده بس (بدل cache.clear())"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'views_count'}:
+        return
+    invalidate_post(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def clear_category_cache(sender, instance, **kwargs):
+    """التصنيفات ظاهرة في الشريط الجانبي وفي الـ Sitemap"""
+    invalidate_listing()
+    invalidate_sitemap()
+
+
+@receiver(post_save, sender=PostVideo)
+@receiver(post_delete, sender=PostVideo)
+def clear_video_cache(sender, instance, **kwargs):
+    """أحدث الفيديوهات في الشريط الجانبي + صفحة المقال نفسه"""
+    invalidate_post(instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=PostImage)
+@receiver(post_delete, sender=PostImage)
+def clear_post_page_cache(sender, instance, **kwargs):
+    """التعليقات وصور المعرض ظاهرين في صفحة المقال المتكاشة (core/page_cache.py)"""
+    invalidate_post(instance.post_id)
@@ -0,0 +1,269 @@
+"""المقالات ذات الصلة بالتشابه في المحتوى (TF-IDF + cosine).
+
+كل مقال منشور ليه صف في PostTerms فيه كلماته بعد التطبيع العربي (نفس
+search_tokens بتاعة البحث) ووزن كل كلمة: العنوان ×3، الكلمات المفتاحية ×2،
+المقتطف والمحتوى ×1، والتصنيف بيدخل ككلمة وهمية. أقرب RELATED_TOP_K مقالات
+لكل مقال بتتخزن في RelatedPost، فصفحة المقال بتعمل استعلام واحد على
+(post, rank).
+
+الحساب بيحصل في الخلفية (شغلانة 'blog.related') مع كل حفظ للمقال، من غير
+ما يلف على كل المقالات:
+- عدد المقالات اللي فيها كل كلمة (الـ document frequency بتاع الـ IDF)
+  متخزن في الكاش وبيتعدل بفرق كلمات المقال القديمة والجديدة بس.
+- المرشحين = المقالات اللي فيها واحدة على الأقل من أقوى CANDIDATE_TERMS كلمة
+  في المقال (استعلام has_any_keys على PostTerms)، والتشابه بيتحسب معاهم بس.
+- قوايم المقالات التانية بتتعدل بالدمج: المقال بيدخل مكان الأضعف أو بيخرج،
+  واللي قايمتها نقصت بسبب خروجه بس هي اللي بتتحسب من جديد.
+المقال المحذوف قوايمه بتتمسح بالـ cascade، فالـ signal بيحفظ أصحاب القوايم دي
+قبل الحذف ويعمل لكل واحد فيهم شغلانة تحسبه من جديد.
+الـ IDF بالشكل ده بيبعد شوية مع الوقت، والأمر rebuild_related_posts (يتشغل
+بشكل دوري) بيعيد كل حاجة من الأول ويظبطه.
+
+الحساب ده بيشتغل في الـ worker أو في أمر ومابيبطّلش كاش الصفحات (كان هيبطّل
+البلوج كله مع كل حفظ): حفظ المقال نفسه بيبطّل كاش البلوج من الـ signal،
+والصفحات المتكاشة بعدها بتاخد القوايم الجديدة أول ما PAGE_CACHE_TIMEOUT يعدي.
+أعداد الـ IDF في الكاش الافتراضي بتاع الـ worker، ولو ضاعت بتتحسب تاني.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.html import strip_tags
+
+from core.search import STOPWORDS, search_tokens
+
+from .models import Post, PostTerms, RelatedPost
+
+RELATED_TOP_K = 6
+RELATED_MIN_SCORE = 0.05
+# أكتر كلمات بتتخزن لكل مقال (الباقي وزنه ضعيف ومابيفرقش في الترتيب)
+MAX_TERMS_PER_POST = 300
+
+FIELD_WEIGHTS = (('title', 3), ('keywords', 2), ('excerpt', 1), ('content', 1))
+CATEGORY_WEIGHT = 2
+# أقوى الكلمات في المقال اللي بيتدور بيها على المقالات المرشحة
+CANDIDATE_TERMS = 40
+
+DOCUMENT_FREQUENCY_KEY = 'blog:related:df'
+DOCUMENT_FREQUENCY_TIMEOUT = 60 * 60 * 24
+
+
+def post_terms(post):
+    """وزن كل كلمة في المقال (قبل الـ IDF)"""
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        text = getattr(post, field) or ''
+        if field == 'content':
+            text = strip_tags(text)
+        for token in search_tokens(text):
+            if len(token) > 1 and token not in STOPWORDS and not token.isdigit():
+                counts[token] += weight
+    if post.category_id:
+        counts[f'category:{post.category_id}'] += CATEGORY_WEIGHT
+    return dict(counts.most_common(MAX_TERMS_PER_POST))
+
+
+def _weights(terms, total, document_frequency):
+    """TF-IDF متطبّع (طوله 1)، فالـ cosine = حاصل الضرب بس"""
+    vector = {
+        term: (1 + math.log(count)) * math.log((1 + total) / (1 + document_frequency.get(term, 0)))
+        for term, count in terms.items()
+    }
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {term: weight / norm for term, weight in vector.items() if weight} if norm else {}
+
+
+def _vectors(terms_by_post):
+    total = len(terms_by_post)
+    document_frequency = Counter()
+    for terms in terms_by_post.values():
+        document_frequency.update(terms.keys())
+    return {pk: _weights(terms, total, document_frequency) for pk, terms in terms_by_post.items()}
+
+
+def _postings(vectors):
+    postings = defaultdict(list)
+    for pk, vector in vectors.items():
+        for term, weight in vector.items():
+            postings[term].append((pk, weight))
+    return postings
+
+
+def _similarities(pk, vectors, postings):
+    scores = defaultdict(float)
+    for term, weight in vectors[pk].items():
+        for other, other_weight in postings[term]:
+            if other != pk:
+                scores[other] += weight * other_weight
+    return scores
+
+
+def _top_neighbours(scores):
+    ranked = sorted(
+        ((score, other) for other, score in scores.items() if score >= RELATED_MIN_SCORE),
+        key=lambda item: (-item[0], -item[1]),
+    )
+    return ranked[:RELATED_TOP_K]
+
+
+def _save_neighbours(pk, neighbours):
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id=pk).delete()
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post_id=pk, related_id=other, score=score, rank=rank)
+            for rank, (score, other) in enumerate(neighbours)
+        ])
+
+
+def _document_frequencies():
+    """{'total': عدد المقالات المنشورة، 'terms': {كلمة: عدد المقالات اللي فيها}}
+    من الكاش، ولو مش موجود بيتحسب من PostTerms مرة واحدة"""
+    frequencies = cache.get(DOCUMENT_FREQUENCY_KEY)
+    if frequencies is None:
+        counts = Counter()
+        published = PostTerms.objects.filter(post__status='published').values_list('terms', flat=True)
+        total = 0
+        for terms in published.iterator(chunk_size=500):
+            counts.update(terms.keys())
+            total += 1
+        frequencies = {'total': total, 'terms': dict(counts)}
+        cache.set(DOCUMENT_FREQUENCY_KEY, frequencies, DOCUMENT_FREQUENCY_TIMEOUT)
+    return frequencies
+
+
+def _adjust_frequencies(old_terms, new_terms):
+    """فرق كلمات مقال واحد (القديمة ← الجديدة) على الأعداد المتخزنة"""
+    frequencies = cache.get(DOCUMENT_FREQUENCY_KEY)
+    if frequencies is None:
+        return
+    counts = frequencies['terms']
+    frequencies['total'] += bool(new_terms) - bool(old_terms)
+    for term in old_terms:
+        if counts.get(term, 0) > 1:
+            counts[term] -= 1
+        else:
+            counts.pop(term, None)
+    for term in new_terms:
+        counts[term] = counts.get(term, 0) + 1
+    cache.set(DOCUMENT_FREQUENCY_KEY, frequencies, DOCUMENT_FREQUENCY_TIMEOUT)
+
+
+def _scores(pk, terms, frequencies):
+    """التشابه بين المقال والمقالات المرشحة بس (اللي فيها أقوى كلماته)"""
+    vector = _weights(terms, frequencies['total'], frequencies['terms'])
+    strongest = sorted(vector, key=vector.get, reverse=True)[:CANDIDATE_TERMS]
+    if not strongest:
+        return {}
+    candidates = (
+        PostTerms.objects.filter(post__status='published', terms__has_any_keys=strongest)
+        .exclude(post_id=pk).values_list('post_id', 'terms')
+    )
+    scores = {}
+    for other, other_terms in candidates.iterator(chunk_size=200):
+        other_vector = _weights(other_terms, frequencies['total'], frequencies['terms'])
+        score = sum(weight * other_vector.get(term, 0) for term, weight in vector.items())
+        if score:
+            scores[other] = score
+    return scores
+
+
+def _recompute(pk, frequencies):
+    terms = PostTerms.objects.filter(post_id=pk, post__status='published').values_list('terms', flat=True).first()
+    _save_neighbours(pk, _top_neighbours(_scores(pk, terms, frequencies)) if terms else [])
+
+
+def update_related_posts(post_id):
+    """handler شغلانة 'blog.related': بيحدّث المقال ده وقوايم المقالات اللي
+    اتأثرت بيه (دخل فيها أو خرج منها)"""
+    old_terms = PostTerms.objects.filter(post_id=post_id).values_list('terms', flat=True).first() or {}
+    post = Post.objects.filter(pk=post_id).first()
+    # قوايم المقالات اللي المقال ده فيها دلوقتي
+    current = defaultdict(list)
+    for owner, related, score in RelatedPost.objects.filter(
+        post_id__in=RelatedPost.objects.filter(related_id=post_id).values('post_id'),
+    ).values_list('post_id', 'related_id', 'score'):
+        current[owner].append((score, related))
+
+    if post is None or post.status != 'published':
+        PostTerms.objects.filter(post_id=post_id).delete()
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        if post is None:
+            # كلماته اتمسحت مع الحذف فالفرق مش معروف: الأعداد تتبني من جديد
+            cache.delete(DOCUMENT_FREQUENCY_KEY)
+        else:
+            _adjust_frequencies(old_terms, {})
+        frequencies = _document_frequencies()
+        for pk in current:
+            _recompute(pk, frequencies)
+        return
+
+    terms = post_terms(post)
+    PostTerms.objects.update_or_create(post=post, defaults={'terms': terms})
+    _adjust_frequencies(old_terms, terms)
+    frequencies = _document_frequencies()
+    scores = _scores(post_id, terms, frequencies)
+    _save_neighbours(post_id, _top_neighbours(scores))
+
+    # المرشحين اللي ممكن المقال يدخل قايمتهم، غير اللي هو فيها أصلًا
+    entering = [pk for pk, score in scores.items() if score >= RELATED_MIN_SCORE and pk not in current]
+    for owner, related, score in RelatedPost.objects.filter(post_id__in=entering).values_list('post_id', 'related_id', 'score'):
+        current[owner].append((score, related))
+
+    for pk in set(current) | set(entering):
+        neighbours = current.get(pk, [])
+        others = {related: old for old, related in neighbours if related != post_id}
+        score = scores.get(pk, 0)
+        was_listed = len(others) < len(neighbours)
+        if was_listed and len(neighbours) >= RELATED_TOP_K and score < min(old for old, _ in neighbours):
+            # المقال نزل تحت آخر واحد في قايمة كاملة: اللي بعده مش معروف من غير حساب
+            _recompute(pk, frequencies)
+            continue
+        merged = _top_neighbours({**others, post_id: score})
+        if merged != _top_neighbours({related: old for old, related in neighbours}):
+            _save_neighbours(pk, merged)
+
+
+def rebuild_related_posts():
+    """بيعيد حساب الكلمات والجيران لكل المقالات المنشورة. بيرجع عدد المقالات"""
+    published = Post.objects.filter(status='published').only(
+        'pk', 'title', 'keywords', 'excerpt', 'content', 'category_id',
+    )
+    terms_by_post = {post.pk: post_terms(post) for post in published.iterator(chunk_size=200)}
+
+    with transaction.atomic():
+        PostTerms.objects.exclude(post_id__in=terms_by_post).delete()
+        PostTerms.objects.bulk_create(
+            [PostTerms(post_id=pk, terms=terms) for pk, terms in terms_by_post.items()],
+            update_conflicts=True, unique_fields=['post'], update_fields=['terms'],
+        )
+
+    vectors = _vectors(terms_by_post)
+    postings = _postings(vectors)
+    rows = [
+        RelatedPost(post_id=pk, related_id=other, score=score, rank=rank)
+        for pk in vectors
+        for rank, (score, other) in enumerate(_top_neighbours(_similarities(pk, vectors, postings)))
+    ]
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(rows, batch_size=1000)
+    # الأعداد المتخزنة بتتبني من جديد مع أول تحديث
+    cache.delete(DOCUMENT_FREQUENCY_KEY)
+    return len(vectors)
+
+
+def related_posts_for(post, limit=3):
+    """استعلام واحد على الجدول المحسوب، ولو لسه ماتحسبش (أو أقل من limit)
+    بيكمّل بأحدث مقالات نفس التصنيف زي الأول"""
+    related = list(
+        Post.objects.filter(related_from__post=post, status='published')
+        .select_related('category').order_by('related_from__rank')[:limit]
+    )
+    if len(related) < limit:
+        related += list(
+            Post.objects.filter(status='published', category=post.category)
+            .exclude(pk__in=[post.pk] + [item.pk for item in related])
+            .select_related('category')[:limit - len(related)]
+        )
+    return related
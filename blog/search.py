@@ -0,0 +1,42 @@
+"""فهرسة المقالات المنشورة في البحث العام (core/search.py)"""
+from django.utils.html import strip_tags
+
+from core.search import highlight, index_document, remove_document, search
+
+from .models import Post
+
+POST_KIND = 'blog.post'
+
+
+def post_body_text(post):
+    return strip_tags(post.content or '')
+
+
+def update_post_index(post):
+    """المنشور بس هو اللي بيظهر في البحث"""
+    if post.status != 'published':
+        remove_document(POST_KIND, post.pk)
+        return
+    body = ' '.join(filter(None, [post.excerpt, post.keywords, post_body_text(post)]))
+    index_document(POST_KIND, post.pk, post.title, body)
+
+
+def reindex_posts(pks):
+    """للتحديثات بالجملة (queryset.update في الأدمن) اللي مابتبعتش post_save"""
+    for post in Post.objects.filter(pk__in=pks).iterator(chunk_size=200):
+        update_post_index(post)
+
+
+def rebuild_post_index():
+    for post in Post.objects.filter(status='published').iterator(chunk_size=200):
+        update_post_index(post)
+
+
+def search_post_ids(query):
+    return search(POST_KIND, query)
+
+
+def attach_snippets(posts, query):
+    """بيضيف post.search_snippet (مقطع مظلل) للمقالات اللي هتتعرض في الصفحة بس"""
+    for post in posts:
+        post.search_snippet = highlight(post_body_text(post), query)
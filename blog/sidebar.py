@@ -0,0 +1,40 @@
+"""أجزاء صفحة البلوج اللي مش معتمدة على الصفحة/الفلتر المفتوح (المميز، التصنيفات،
+الأكثر قراءة، إجمالي المشاهدات، أحدث الفيديوهات).
+
+بتتحسب مرة واحدة وتتخزن تحت namespace 'blog' (blog/cache.py)، فأي حفظ/حذف
+لمقال أو تصنيف أو فيديو بيبطلها فورًا. المشاهدات بتتنقل للداتابيز من غير
+signals (core/view_counters.py)، فالـ timeout هو اللي بيحدّث الأكثر قراءة.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+from .cache import blog_cache_key
+from .models import Category, Post, PostVideo
+
+SIDEBAR_CACHE_TIMEOUT = 60 * 10
+
+
+def _build_sidebar_blocks():
+    published = Post.objects.filter(status='published')
+    return {
+        'featured_posts': list(published.filter(is_featured=True).select_related('author', 'category')[:3]),
+        'categories': list(
+            Category.objects.annotate(
+                posts_count=Count('posts', filter=Q(posts__status='published'))
+            ).filter(posts_count__gt=0)
+        ),
+        'popular_posts': list(published.order_by('-views_count')[:5]),
+        'total_views': published.aggregate(total=Sum('views_count'))['total'] or 0,
+        'recent_videos': list(
+            PostVideo.objects.filter(post__status='published').select_related('post').order_by('-id')[:4]
+        ),
+    }
+
+
+def get_sidebar_blocks():
+    key = blog_cache_key('sidebar')
+    blocks = cache.get(key)
+    if blocks is None:
+        blocks = _build_sidebar_blocks()
+        cache.set(key, blocks, SIDEBAR_CACHE_TIMEOUT)
+    return blocks
@@ -1,8 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Post
-from accounts.notifications import send_public_notification
-from core.indexnow import send_indexnow  # 👈 ضيف ده
+from .models import Post, RelatedPost
+from .search import POST_KIND, update_post_index
+from core.indexnow import send_indexnow
+from core.search import remove_document
+from core.jobs import enqueue, enqueue_unique
 
 @receiver(post_save, sender=Post)
 def notify_new_post(sender, instance, created, **kwargs):
@@ -12,11 +14,38 @@ def notify_new_post(sender, instance, created, **kwargs):
 
         # إشعار
         if created:
-            send_public_notification(
-                title="📖 مقال جديد!",
-                message=instance.title,
-                url=url
-            )
-
-        # 🔥 IndexNow (مهم جدًا)
-        send_indexnow(url)
\ No newline at end of file
+            enqueue('push.public', title="📖 مقال جديد!", message=instance.title, url=url)
+
+        # 🔥 IndexNow (مهم جدًا) - بيدخل دفعة الإرسال الجاية (core/indexnow.py)
+        send_indexnow(url)
+
+
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'views_count'}:
+        return
+    update_post_index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search(sender, instance, **kwargs):
+    remove_document(POST_KIND, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_related_posts(sender, instance, update_fields=None, **kwargs):
+    """المقالات ذات الصلة بتتحسب في الخلفية (blog/related.py)"""
+    if update_fields and set(update_fields) <= {'views_count'}:
+        return
+    enqueue_unique('blog.related', post_id=instance.pk)
+    # القوايم اللي كان فيها المقال المحذوف نقصت بالـ cascade
+    for owner in getattr(instance, '_related_owners', ()):
+        enqueue_unique('blog.related', post_id=owner)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_related_owners(sender, instance, **kwargs):
+    instance._related_owners = list(
+        RelatedPost.objects.filter(related_id=instance.pk).values_list('post_id', flat=True)
+    )
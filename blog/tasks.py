@@ -0,0 +1,121 @@
+"""رفع صور البلوج على Cloudinary في الخلفية.
+
+الصور بتتحفظ الأول في MEDIA_ROOT المحلي للـ web process، والـ worker
+(run_worker) شغال على dyno تاني مابيشوفش الملفات دي، فالرفع مش شغلانة في
+طابور core/jobs.py: بيتعمل في thread جوه نفس الـ process اللي حفظ الصورة بعد
+الـ commit، بمحاولات محدودة. اللي فشل بيفضل من غير cloud_url وبيترفع مع أي
+حفظ جاي للمقال أو لصوره.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from .models import Post, PostImage
+
+# عدد الصور اللي بترتفع في نفس الوقت لمقال واحد
+CLOUDINARY_UPLOAD_THREADS = getattr(settings, 'CLOUDINARY_UPLOAD_THREADS', 4)
+# المقاسات اللي بتتعمل مرة واحدة وقت الرفع (eager) وتتخزن في image_variants،
+# كل مقاس بنسختين: بصيغة الأصل (تحت "400") وWebP (تحت "webp" → "400")
+CLOUDINARY_DERIVED_WIDTHS = getattr(settings, 'CLOUDINARY_DERIVED_WIDTHS', (400, 800, 1200))
+CLOUDINARY_UPLOAD_ATTEMPTS = 3
+CLOUDINARY_RETRY_DELAY = 5
+
+logger = logging.getLogger(__name__)
+
+# thread واحد بيرفع مقال ورا التاني، فمقالين مابيترفعوش مرتين في نفس الوقت
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cloudinary-upload')
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+def _upload(image):
+    """بيشتغل في thread من الـ pool، فمفيهوش أي استعلام داتابيز"""
+    transformations = [
+        (key, {'width': width, 'crop': 'limit', 'quality': 'auto', **extra})
+        for key, extra in ((None, {}), ('webp', {'format': 'webp'}))
+        for width in CLOUDINARY_DERIVED_WIDTHS
+    ]
+    result = cloudinary.uploader.upload(image, eager=[options for _, options in transformations])
+    variants = {'webp': {}}
+    # كلاود بيرجع الـ eager بنفس ترتيب الطلب
+    for (key, options), derived in zip(transformations, result.get('eager') or []):
+        if derived.get('secure_url'):
+            target = variants[key] if key else variants
+            target[str(options['width'])] = derived['secure_url']
+    return {
+        'cloud_url': result['secure_url'],
+        'image_variants': variants,
+        'image_width': result.get('width'),
+        'image_height': result.get('height'),
+    }
+
+
+def upload_post_images(post_id):
+    """بيرفع صورة المقال الرئيسية وكل صور المعرض اللي لسه مرفعتش مع بعض
+    في thread pool محدود، ويسجل الروابط بـ update() من غير save() (عشان الـ signals)"""
+    not_uploaded = Q(cloud_url__isnull=True) | Q(cloud_url='')
+    pending = [
+        (model, obj.pk, obj.image)
+        for model, objects in (
+            (Post, Post.objects.filter(pk=post_id)),
+            (PostImage, PostImage.objects.filter(post_id=post_id)),
+        )
+        for obj in objects.filter(not_uploaded).exclude(image='')
+    ]
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=CLOUDINARY_UPLOAD_THREADS) as pool:
+        futures = [(model, pk, pool.submit(_upload, image)) for model, pk, image in pending]
+
+    errors = []
+    for model, pk, future in futures:
+        try:
+            fields = future.result()
+        except Exception as e:
+            errors.append(e)
+            continue
+        model.objects.filter(pk=pk).update(**fields)
+
+    # اللي فشل بيفضل من غير cloud_url، والشغلانة بتتعاد وتكمل هو بس
+    if errors:
+        raise errors[0]
+
+
+def _run_upload(post_id):
+    with _queued_lock:
+        _queued.discard(post_id)
+    try:
+        for attempt in range(1, CLOUDINARY_UPLOAD_ATTEMPTS + 1):
+            try:
+                upload_post_images(post_id)
+                return
+            except Exception:
+                logger.exception('Cloudinary upload for post %s failed (attempt %s)', post_id, attempt)
+                if attempt < CLOUDINARY_UPLOAD_ATTEMPTS:
+                    time.sleep(CLOUDINARY_RETRY_DELAY * attempt)
+    finally:
+        # الـ thread ده مش request، فالاتصال مابيتقفلش لوحده
+        close_old_connections()
+
+
+def _submit_upload(post_id):
+    if getattr(settings, 'JOB_QUEUE_EAGER', False):
+        upload_post_images(post_id)
+        return
+    with _queued_lock:
+        if post_id in _queued:
+            return  # لسه مابدأش، وهيرفع كل الصور اللي مستنية مرة واحدة
+        _queued.add(post_id)
+    _executor.submit(_run_upload, post_id)
+
+
+def schedule_image_upload(post_id):
+    """بيرفع صور المقال اللي لسه مرفعتش بعد الـ commit، في نفس الـ process"""
+    transaction.on_commit(lambda: _submit_upload(post_id))
@@ -1,30 +1,40 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q, Count, Sum
+from django.db.models import Case, When
 from django.core.paginator import Paginator
 from django.contrib import messages
+from core.page_cache import cache_public_page, conditional_page
+from core.view_counters import post_views
+from .cache import BLOG_NAMESPACE
 from .models import Post, Category, Comment, PostVideo
+from .related import related_posts_for
+from .search import attach_snippets, search_post_ids
+from .sidebar import get_sidebar_blocks
 
+@cache_public_page(BLOG_NAMESPACE)
 def blog_list(request):
     """عرض قائمة المقالات مع البحث والفلترة"""
     posts_list = Post.objects.filter(status='published').select_related('author', 'category')
     
-    # البحث
+    # البحث (فهرس نصي مرتب بالأنسب، blog/search.py)
     search_query = request.GET.get('search', '')
+    matched_ids = []
     if search_query:
-        posts_list = posts_list.filter(
-            Q(title__icontains=search_query) |
-            Q(content__icontains=search_query) |
-            Q(excerpt__icontains=search_query)
-        )
+        matched_ids = search_post_ids(search_query)
+        posts_list = posts_list.filter(pk__in=matched_ids)
     
     # الفلترة حسب التصنيف
     category_slug = request.GET.get('category', '')
     if category_slug:
         posts_list = posts_list.filter(category__slug=category_slug)
     
-    # الترتيب
-    sort_by = request.GET.get('sort', 'latest')
-    if sort_by == 'popular':
+    # الترتيب (نتايج البحث افتراضيًا بالأنسب)
+    sort_by = request.GET.get('sort', 'relevance' if search_query else 'latest')
+    if sort_by == 'relevance' and matched_ids:
+        posts_list = posts_list.order_by(
+            Case(*[When(pk=pk, then=position) for position, pk in enumerate(matched_ids)])
+        )
+    elif sort_by == 'popular':
         posts_list = posts_list.order_by('-views_count')
     elif sort_by == 'oldest':
         posts_list = posts_list.order_by('created_at')
@@ -35,58 +45,42 @@ def blog_list(request):
     paginator = Paginator(posts_list, 9)
     page_number = request.GET.get('page')
     posts = paginator.get_page(page_number)
+    if search_query:
+        attach_snippets(posts, search_query)
     
-    # المقالات المميزة
-    featured_posts = Post.objects.filter(status='published', is_featured=True)[:3]
-    
-    # التصنيفات مع عدد المقالات
-    categories = Category.objects.annotate(
-        posts_count=Count('posts', filter=Q(posts__status='published'))
-    ).filter(posts_count__gt=0)
-    
-    # المقالات الأكثر قراءة
-    popular_posts = Post.objects.filter(status='published').order_by('-views_count')[:5]
-    
-    # مجموع المشاهدات ✅
-    total_views = Post.objects.filter(status='published').aggregate(
-        total=Sum('views_count')
-    )['total'] or 0
-
-    # ✅ جديد: أحدث الفيديوهات من كل المقالات المنشورة (لعرضها في الشريط الجانبي)
-    recent_videos = PostVideo.objects.filter(
-        post__status='published'
-    ).select_related('post').order_by('-id')[:4]
+    # المميز والتصنيفات والأكثر قراءة والفيديوهات من الكاش (blog/sidebar.py)
+    sidebar = get_sidebar_blocks()
 
     context = {
         'posts': posts,
-        'featured_posts': featured_posts,
-        'categories': categories,
-        'popular_posts': popular_posts,
         'search_query': search_query,
         'current_category': category_slug,
         'current_sort': sort_by,
-        'total_views': total_views,
-        'recent_videos': recent_videos,
+        **sidebar,
     }
     
     return render(request, 'blog/blog_list.html', context)
 
 
+def _post_metadata(request, slug):
+    """id وآخر تعديل للمقال بس، للـ ETag قبل ما المقال نفسه يتحمل"""
+    return Post.objects.filter(slug=slug, status='published').values_list('pk', 'updated_at').first()
+
+
+@conditional_page(_post_metadata, BLOG_NAMESPACE, counter=post_views)
+@cache_public_page(BLOG_NAMESPACE)
 def blog_detail(request, slug):
     """عرض تفاصيل مقال واحد"""
     post = get_object_or_404(Post, slug=slug, status='published')
     
     # زيادة عدد المشاهدات
-    post.increment_views()
+    post.increment_views(request)
     
     # التعليقات المعتمدة فقط
     comments = post.comments.filter(is_approved=True).order_by('-created_at')
     
-    # مقالات ذات صلة (من نفس التصنيف)
-    related_posts = Post.objects.filter(
-        status='published',
-        category=post.category
-    ).exclude(id=post.id)[:3]
+    # مقالات ذات صلة (محسوبة مسبقًا بالتشابه في المحتوى، blog/related.py)
+    related_posts = related_posts_for(post)
 
     # ✅ جديد: معرض الصور وفيديوهات المقال
     gallery_images = post.gallery_images.all()
@@ -117,11 +111,15 @@ def blog_detail(request, slug):
         'related_posts': related_posts,
         'gallery_images': gallery_images,
         'videos': videos,
+        # الصفحة بتتكاش، فالروابط الثابتة (canonical وJSON-LD والمشاركة) من الدومين
+        # الأساسي مش من رابط الطلب (اللي ممكن يكون فيه utm_ وغيره)
+        'canonical_url': f'{settings.CANONICAL_URL}{post.get_absolute_url()}',
     }
     
     return render(request, 'blog/blog_detail.html', context)
 
 
+@cache_public_page(BLOG_NAMESPACE)
 def category_posts(request, slug):
     """عرض مقالات تصنيف معين"""
     category = get_object_or_404(Category, slug=slug)
@@ -125,6 +125,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.page_cache.csrf_placeholder',
             ],
         },
     },
@@ -195,11 +196,23 @@ DEFAULT_PROTOCOL = 'https'
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 'shared': كاش واحد لكل الـ processes والـ dynos (أرقام إصدارات core/cache_versions.py،
+# كاش الصفحات، التقارير). Redis لو REDIS_URL موجود (محتاج باكدج redis)، وإلا جدول في
+# الداتابيز بيتعمل بـ createcachetable (في الـ Procfile)
+REDIS_URL = os.environ.get('REDIS_URL')
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
     },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
     'sitemap': {
         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
         'LOCATION': os.path.join(BASE_DIR, 'sitemap_cache'),
@@ -209,6 +222,18 @@ CACHES = {
 
 SITEMAP_CACHE_TIMEOUT = 3600
 
+# كل قد إيه عدادات المشاهدات المتجمعة في الكاش تتنقل للداتابيز (core/view_counters.py).
+# مع LocMemCache كل process بينقل بتاعه؛ أمر flush_view_counts محتاج كاش مشترك (Redis)
+VIEW_COUNTER_FLUSH_INTERVAL = 60
+
+# كاش الصفحات الكاملة للزوار (core/page_cache.py): النسخة طازة PAGE_CACHE_TIMEOUT ثانية،
+# وبعدها (أو بعد أي تعديل في المحتوى) بتتقدم قديمة لحد PAGE_CACHE_STALE لحد ما طلب واحد يجددها
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_STALE = 60 * 60
+
+# الشغلانات الخلفية (core/jobs.py) بتتنفذ من run_worker. True = تتنفذ فورًا بعد الـ commit (للتطوير بس)
+JOB_QUEUE_EAGER = False
+
 CORS_ALLOWED_ORIGINS = [
     'https://alagme.com',
     'https://www.alagme.com',
@@ -10,6 +10,8 @@ from django.views.generic import TemplateView
 from accounts import views as accounts_views
 
 from django.http import HttpResponse
+from django.core.cache import caches
+from blog.cache import sitemap_cache_key
 
 def indexnow_key(request):
     return HttpResponse("b52bd4ea55c149459d7c6e1f2ca39c98", content_type="text/plain")
@@ -35,7 +37,17 @@ sitemaps = {
 }
 
 def sitemap_view(request, **kwargs):
-    response = sitemap(request, sitemaps=sitemaps)
+    # الـ XML متخزن بمفتاح فيه إصدار الـ sitemap، وأي تعديل في مقال/سؤال بيزود الإصدار (blog/cache.py)
+    key = sitemap_cache_key(request.get_host(), request.GET.get('p', '1'))
+    content = caches['sitemap'].get(key)
+    if content is None:
+        response = sitemap(request, sitemaps=sitemaps)
+        response.render()
+        if response.status_code != 200:
+            return response
+        content = response.content
+        caches['sitemap'].set(key, content, settings.SITEMAP_CACHE_TIMEOUT)
+    response = HttpResponse(content, content_type='application/xml')
     response['X-Robots-Tag'] = 'index, follow'
     return response
 
@@ -1,12 +1,26 @@
 from django.contrib import admin
+from .deletion import schedule_deletion
+from .jobs import enqueue_unique
 from .models import (
     Country, Teacher, Student, StudentNote, Expense, Payment, TeacherSalaryRecord, MonthlyEvaluation,
-    Lesson, ScheduleRequest, TeacherComplaint,
+    Lesson, ScheduleRequest, TeacherComplaint, ArchivedLesson, LessonMonthlyAggregate,
+    DeletionTask, Job, IndexNowSubmission,
 )
 
 
+class DeferredDeleteMixin:
+    """الحذف من الأدمن بيتسجل كـ DeletionTask بدل ما الـ cascade كله يتعمل في الـ request"""
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj, request.user)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj, request.user)
+
+
 @admin.register(Country)
-class CountryAdmin(admin.ModelAdmin):
+class CountryAdmin(DeferredDeleteMixin, admin.ModelAdmin):
     list_display = ('name', 'flag_icon', 'is_active')
     list_editable = ('is_active',)
 
@@ -18,7 +32,7 @@ class SalaryRecordInline(admin.TabularInline):
 
 
 @admin.register(Teacher)
-class TeacherAdmin(admin.ModelAdmin):
+class TeacherAdmin(DeferredDeleteMixin, admin.ModelAdmin):
     list_display = ('name', 'phone', 'governorate', 'commission_percent', 'fixed_salary', 'calculated_salary', 'current_students_count', 'previous_students_count')
     search_fields = ('name', 'phone')
     inlines = [SalaryRecordInline]
@@ -36,7 +50,7 @@ class PaymentInline(admin.TabularInline):
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(DeferredDeleteMixin, admin.ModelAdmin):
     list_display = ('name', 'country', 'teacher', 'month', 'status', 'payment_status', 'enrollment_type', 'acquisition_source')
     list_filter = ('country', 'status', 'payment_status', 'teacher', 'enrollment_type', 'acquisition_source')
     search_fields = ('name', 'phone')
@@ -66,10 +80,16 @@ class ExpenseAdmin(admin.ModelAdmin):
 
 @admin.register(MonthlyEvaluation)
 class MonthlyEvaluationAdmin(admin.ModelAdmin):
-    list_display = ('student_name', 'month_label', 'teacher_name', 'template', 'created_at')
-    list_filter = ('template', 'month_label')
+    list_display = ('student_name', 'month_label', 'teacher_name', 'template', 'is_draft', 'created_at')
+    list_filter = ('template', 'month_label', 'is_draft')
     search_fields = ('student_name', 'teacher_name')
-    readonly_fields = ('public_token', 'created_at')
+    readonly_fields = ('public_token', 'created_at', 'updated_at')
+    actions = ['finalize_drafts']
+
+    def finalize_drafts(self, request, queryset):
+        from .evaluations import finalize_evaluations
+        finalize_evaluations(queryset)
+    finalize_drafts.short_description = "اعتماد المسودات المحددة"
 
 
 @admin.register(Lesson)
@@ -80,6 +100,21 @@ class LessonAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
+@admin.register(ArchivedLesson)
+class ArchivedLessonAdmin(admin.ModelAdmin):
+    list_display = ('student', 'teacher', 'scheduled_at', 'status', 'was_late', 'archived_at')
+    list_filter = ('status', 'teacher')
+    search_fields = ('student__name', 'teacher__name')
+    readonly_fields = ('original_id', 'created_at', 'archived_at')
+
+
+@admin.register(LessonMonthlyAggregate)
+class LessonMonthlyAggregateAdmin(admin.ModelAdmin):
+    list_display = ('teacher', 'student', 'year', 'month', 'total', 'completed', 'student_absent', 'teacher_absent', 'cancelled', 'late')
+    list_filter = ('year', 'month', 'teacher')
+    search_fields = ('student__name', 'teacher__name')
+
+
 @admin.register(ScheduleRequest)
 class ScheduleRequestAdmin(admin.ModelAdmin):
     list_display = ('student', 'teacher', 'request_type', 'status', 'created_at', 'reviewed_at')
@@ -93,3 +128,37 @@ class TeacherComplaintAdmin(admin.ModelAdmin):
     list_display = ('teacher', 'date', 'description')
     list_filter = ('teacher', 'date')
     search_fields = ('teacher__name', 'description')
+
+
+@admin.register(DeletionTask)
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = ('object_repr', 'model_label', 'status', 'deleted_rows', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'model_label')
+    readonly_fields = ('model_label', 'object_id', 'object_repr', 'status', 'deleted_rows', 'error', 'requested_by', 'created_at', 'started_at', 'progress_at', 'finished_at')
+    actions = ['retry_deletions']
+
+    def retry_deletions(self, request, queryset):
+        # الحذف بيكمل من مكان ما وقف، والـ handler بيتجاهل اللي شغال فعلًا
+        for pk in queryset.exclude(status='done').values_list('pk', flat=True):
+            enqueue_unique('core.deletion', task_id=pk)
+    retry_deletions.short_description = "إعادة محاولة الحذف"
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'run_after', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'finished_at', 'locked_at', 'locked_by', 'last_error')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        queryset.exclude(status='running').update(status='queued', attempts=0, run_after=timezone.now())
+    retry_jobs.short_description = "إعادة تشغيل الشغلانات المحددة"
+
+
+@admin.register(IndexNowSubmission)
+class IndexNowSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('submitted_at', 'url_count', 'status_code', 'succeeded')
+    list_filter = ('succeeded',)
+    readonly_fields = ('url_count', 'status_code', 'succeeded', 'error', 'submitted_at')
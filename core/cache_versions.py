@@ -0,0 +1,56 @@
+"""مفاتيح كاش بإصدارات لكل namespace بدل cache.clear().
+
+كل مجموعة كاش (قائمة المقالات، الـ sitemap، صفحات مقال معين...) ليها رقم
+إصدار متخزن في الكاش نفسه، وكل مفتاح فيها بيتبني من الرقم ده. لما محتوى
+المجموعة يتغير بنزود الرقم بس، فكل المفاتيح القديمة بتبطل تتقري (وبتخلص
+لوحدها بالـ timeout) من غير ما نمسح أي كاش تاني في الـ process.
+
+أول رقم لأي namespace هو الوقت بالمللي ثانية مش 1، فلو الرقم نفسه اتمسح من
+الكاش (eviction) أو كل process بدأ عداده لوحده، مفيش رقم بيتكرر لمحتوى
+مختلف (الـ ETag في core/page_cache.py معتمد على ده).
+
+الأرقام متخزنة في الكاش المشترك ('shared' في الإعدادات) مش في LocMem بتاع
+كل process، فالتعديل اللي حصل في process (أو في الـ worker) بيبطّل الكاش في
+الكل. المفاتيح نفسها ممكن تفضل في أي كاش: المفتاح القديم بيبطل يتقري في أي
+مكان أول ما الرقم يزيد.
+"""
+import time
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+SHARED_CACHE_ALIAS = 'shared'
+shared_cache = ConnectionProxy(caches, SHARED_CACHE_ALIAS)
+
+VERSION_KEY_PREFIX = 'cachever'
+
+
+def _version_key(namespace):
+    return f'{VERSION_KEY_PREFIX}:{namespace}'
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def get_version(namespace, cache=None):
+    cache = cache or shared_cache
+    return cache.get_or_set(_version_key(namespace), _initial_version, timeout=None)
+
+
+def bump_version(*namespaces, cache=None):
+    """بيبطّل كل المفاتيح المتخزنة تحت الـ namespaces دي"""
+    cache = cache or shared_cache
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # مفيش إصدار متخزن (أول مرة أو الكاش اتمسح): رقم جديد يبطّل القديم
+            cache.set(key, _initial_version(), timeout=None)
+
+
+def versioned_key(namespace, *parts, cache=None):
+    version = get_version(namespace, cache=cache)
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{namespace}:v{version}:{suffix}'
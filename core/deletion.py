@@ -0,0 +1,123 @@
+"""حذف الدول/المعلمات/الطلاب الكبيرة على دفعات في الخلفية.
+
+country.delete() العادي بيخلي Django يجمّع كل الطلاب والدفعات والحلقات
+والملاحظات والتقييمات وطلبات المواعيد في الميموري الأول (بسبب CASCADE)
+وبعدين يحذفهم في transaction واحدة، وده ممكن يعمل timeout أو يقفل الجداول.
+
+هنا الـ view بيعلّم الأب pending_deletion (فيختفي فورًا من كل الصفحات بسبب
+VisibleManager) ويسجل DeletionTask + شغلانة في الطابور، وبعدين run_worker
+(أو process_deletions) بيمشي على العلاقات من تحت لفوق: كل جدول فرعي بيتحذف
+على دفعات صغيرة كل دفعة في transaction لوحدها، وSET_NULL بيتعمل UPDATE على
+دفعات، والأب آخر حاجة.
+
+الحذف بيكمل من مكان ما وقف: كل دفعة بتحذف اللي لسه موجود بس، فالطلب اللي
+فشل أو اللي الـ worker بتاعه وقع وهو شغال (مفيش تقدم من DELETION_STALE_AFTER)
+بيتمسك تاني من الطابور (الشغلانة ليها كذا محاولة) أو من process_deletions أو
+من أكشن "إعادة المحاولة" في الأدمن.
+"""
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import DeletionTask
+
+
+DELETION_CHUNK_SIZE = 500
+# طلب "شغال" من غير ولا دفعة في المدة دي يعتبر worker بتاعه وقع
+DELETION_STALE_AFTER = timedelta(minutes=10)
+
+
+def claimable_tasks():
+    """الطلبات اللي ينفع تتنفذ: جديدة، أو فشلت، أو واقفة في النص"""
+    return DeletionTask.objects.filter(
+        Q(status__in=('pending', 'failed'))
+        | Q(status='running', progress_at__lt=timezone.now() - DELETION_STALE_AFTER)
+    )
+
+
+def schedule_deletion(obj, user=None):
+    """بيخفي العنصر فورًا ويسجل طلب حذفه. بيرجع الـ DeletionTask"""
+    model = type(obj)
+    with transaction.atomic():
+        model._base_manager.filter(pk=obj.pk).update(pending_deletion=True)
+        # طلاب الدولة بيتحذفوا معاها، فبيختفوا من قوايم الطلاب في نفس اللحظة
+        if model._meta.label_lower == 'core.country':
+            obj.students.update(pending_deletion=True)
+        task = DeletionTask.objects.create(
+            model_label=model._meta.label_lower,
+            object_id=obj.pk,
+            object_repr=str(obj)[:255],
+            requested_by=user if user is not None and user.is_authenticated else None,
+        )
+        enqueue('core.deletion', task_id=task.pk)
+    return task
+
+
+def _chunked_pks(queryset, chunk_size):
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+
+
+def _delete_subtree(model, lookup, chunk_size, on_progress, path=()):
+    """بيحذف كل صفوف model اللي بتطابق lookup، بعد ما يفضّي اللي بيشاور عليها"""
+    for rel in model._meta.related_objects:
+        if rel.many_to_many or rel.related_model in path:
+            continue
+        child = rel.related_model
+        child_lookup = {f'{rel.field.name}__{key}': value for key, value in lookup.items()}
+        if rel.on_delete is models.CASCADE:
+            _delete_subtree(child, child_lookup, chunk_size, on_progress, path + (model,))
+        elif rel.on_delete is models.SET_NULL:
+            rows = child._base_manager.filter(**child_lookup)
+            for pks in _chunked_pks(rows, chunk_size):
+                child._base_manager.filter(pk__in=pks).update(**{rel.field.name: None})
+        # PROTECT وغيره بيتسابوا للـ delete() العادي تحت عشان يرفع نفس الخطأ
+
+    rows = model._base_manager.filter(**lookup)
+    for pks in _chunked_pks(rows, chunk_size):
+        with transaction.atomic():
+            # delete() على pk__in بيشغّل الـ signals عادي، والفروع فاضية خلاص فالـ collector خفيف
+            deleted, _ = model._base_manager.filter(pk__in=pks).delete()
+        on_progress(deleted)
+
+
+def run_deletion_task(task, chunk_size=DELETION_CHUNK_SIZE):
+    """بينفذ طلب حذف واحد ويحدّث عداد التقدم بعد كل دفعة"""
+    now = timezone.now()
+    claimed = claimable_tasks().filter(pk=task.pk).update(
+        status='running', error='', progress_at=now,
+        started_at=Coalesce('started_at', models.Value(now, output_field=models.DateTimeField())),
+    )
+    if not claimed:
+        return False
+
+    def on_progress(count):
+        DeletionTask.objects.filter(pk=task.pk).update(
+            deleted_rows=models.F('deleted_rows') + count, progress_at=timezone.now(),
+        )
+
+    model = apps.get_model(task.model_label)
+    try:
+        _delete_subtree(model, {'pk': task.object_id}, chunk_size, on_progress)
+    except Exception as e:
+        DeletionTask.objects.filter(pk=task.pk).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+        raise
+    DeletionTask.objects.filter(pk=task.pk).update(status='done', finished_at=timezone.now())
+    return True
+
+
+def run_deletion_task_by_id(task_id):
+    """handler شغلانة 'core.deletion' في طابور run_worker"""
+    task = claimable_tasks().filter(pk=task_id).first()
+    if task is not None:
+        run_deletion_task(task)
@@ -0,0 +1,145 @@
+"""إنشاء التقييمات الشهرية بالجملة وتصديرها ZIP.
+
+بدل ما كل تقييم يتعمل لوحده والغياب يتكتب بإيد، بنعمل مسودات لكل الطلاب
+المقيدين لمعلمة (أو لكل المعلمات) عن شهر معين في transaction واحدة، وأرقام
+الغياب والحضور جاية من استعلام واحد مجمّع على الحلقات (GROUP BY student).
+"""
+import zipfile
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Lesson, LessonMonthlyAggregate, MonthlyEvaluation, Student
+from .reports import cache_evaluation_report, get_cached_report
+
+
+def lesson_stats_by_student(year, month, student_ids):
+    """إحصائيات حلقات الشهر لكل طالب في استعلام واحد مجمّع (+ ملخصات الأرشيف).
+
+    نفس منطق Lesson.effective_status: الحلقة المجدولة اللي وقتها فات ومحدش
+    سجلها بتتحسب غياب طالب. الفرق الوحيد إن الحلقة اللي شغالة دلوقتي حالًا
+    (بدأت ولسه مخلصتش) بتتحسب هنا غياب لو التقييم اتعمل في نفس اللحظة دي.
+    """
+    now = timezone.now()
+    rows = (
+        Lesson.objects
+        .filter(student_id__in=student_ids, scheduled_at__year=year, scheduled_at__month=month)
+        .values('student_id')
+        .annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            teacher_absent=Count('id', filter=Q(status='teacher_absent')),
+            student_absent=Count('id', filter=Q(status='student_absent') | Q(status='scheduled', scheduled_at__lt=now)),
+        )
+    )
+    stats = {row.pop('student_id'): row for row in rows}
+
+    # الشهور المؤرشفة (archive_lessons) حلقاتها مش في جدول Lesson، فبنكمل من الملخصات
+    archived_rows = (
+        LessonMonthlyAggregate.objects
+        .filter(student_id__in=student_ids, year=year, month=month)
+        .values('student_id')
+        .annotate(
+            total=Sum('total'), completed=Sum('completed'), cancelled=Sum('cancelled'),
+            teacher_absent=Sum('teacher_absent'), student_absent=Sum('student_absent'),
+        )
+    )
+    for row in archived_rows:
+        current = stats.setdefault(row.pop('student_id'), dict.fromkeys(row, 0))
+        for field, value in row.items():
+            current[field] += value or 0
+    return stats
+
+
+def _absences_label(stats):
+    """نسبة الحضور من الحلقات اللي الطالب كان مطلوب يحضرها بس (اتعملت أو غاب
+    فيها). غياب المعلمة والحلقات اللي لسه جاية مش حضور ولا غياب للطالب"""
+    attended = stats['completed']
+    absent = stats['student_absent']
+    held = attended + absent
+    if not held:
+        return 'لا توجد حلقات مسجلة هذا الشهر'
+    attendance_rate = round(attended / held * 100)
+    if not absent:
+        return f'لا يوجد غياب (حضر {attended} من {held} - نسبة الحضور {attendance_rate}%)'
+    return f'{absent} من {held} حلقة (نسبة الحضور {attendance_rate}%)'
+
+
+def create_draft_evaluations(year, month, month_label, teacher=None, template='teal_pink'):
+    """بيعمل مسودة تقييم لكل طالب مقيد (لمعلمة واحدة أو للكل) عن الشهر ده.
+    الطالب اللي عنده تقييم بنفس عنوان الشهر بيتخطى عشان مايتكررش.
+    بيرجع (عدد اللي اتعمل، عدد اللي اتخطى)"""
+    students = Student.objects.filter(status='active').select_related('teacher')
+    if teacher is not None:
+        students = students.filter(teacher=teacher)
+    else:
+        students = students.filter(teacher__isnull=False)
+    students = list(students)
+
+    student_ids = [s.id for s in students]
+    already_evaluated = set(
+        MonthlyEvaluation.objects.filter(student_id__in=student_ids, month_label=month_label)
+        .values_list('student_id', flat=True)
+    )
+    stats = lesson_stats_by_student(year, month, student_ids)
+    empty_stats = {'total': 0, 'completed': 0, 'cancelled': 0, 'teacher_absent': 0, 'student_absent': 0}
+
+    drafts = [
+        MonthlyEvaluation(
+            student=s,
+            student_name=s.name,
+            teacher_name=s.teacher.name if s.teacher else '',
+            package_name=s.package_name or '',
+            lessons_count=s.lessons_count,
+            month_label=month_label,
+            absences=_absences_label(stats.get(s.id, empty_stats)),
+            template=template,
+            is_draft=True,
+        )
+        for s in students if s.id not in already_evaluated
+    ]
+
+    with transaction.atomic():
+        MonthlyEvaluation.objects.bulk_create(drafts)
+
+    return len(drafts), len(already_evaluated)
+
+
+def finalize_evaluations(evaluations):
+    """بيعتمد المسودات اللي في الـ queryset فتبقى متاحة على الرابط العام.
+    المسودات مابتتخزنش في كاش التقارير، فمفيش كاش يتمسح. بيرجع العدد"""
+    return evaluations.filter(is_draft=True).update(is_draft=False, updated_at=timezone.now())
+
+
+class _ZipStream:
+    """ملف وهمي بيجمّع اللي zipfile بيكتبه عشان نبعته للمتصفح أول بأول
+    بدل ما الـ ZIP كله يتبني في الميموري"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_evaluations_zip(evaluations):
+    """generator بيطلع ZIP فيه تقرير HTML لكل تقييم (من كاش التقارير لو موجود)"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for evaluation in evaluations.iterator(chunk_size=200):
+            report = get_cached_report(evaluation.public_token) or cache_evaluation_report(evaluation)
+            filename = f'{evaluation.student_name} - {evaluation.month_label} ({evaluation.pk}).html'
+            archive.writestr(filename, report['content'])
+            yield stream.pop()
+    yield stream.pop()
@@ -0,0 +1,96 @@
+"""نسخ متجاوبة (responsive) من الصور الثابتة بـ Pillow.
+
+صور الآراء في الصفحة الرئيسية 1080×1080 وحوالي 100KB للواحدة، وبتتعرض في
+كارت عرضه ~300px. build_responsive_images بيعمل من كل صورة نسخ بعروض
+RESPONSIVE_WIDTHS بصيغتين (WebP + JPEG progressive للمتصفحات القديمة) في
+static/images/responsive/، ويكتب manifest.json فيه مقاس الصورة الأصلي
+وروابط كل نسخة. الـ template tag ‏{% responsive_image %} بيقرا الـ manifest
+ويطلع <picture> فيه srcset وsizes وwidth/height وloading=lazy، فالمتصفح
+بينزل أصغر نسخة تكفي الكارت بدل الأصل.
+
+صور البلوج مش بتعدي من هنا: بتترفع على كلاود والنسخ (WebP + العادية)
+بتتعمل وقت الرفع (blog/tasks.py) وتتخزن في image_variants.
+"""
+import json
+import os
+from functools import lru_cache
+from glob import glob
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+RESPONSIVE_WIDTHS = getattr(settings, 'RESPONSIVE_IMAGE_WIDTHS', (320, 480, 640, 960))
+RESPONSIVE_DIR = 'images/responsive'
+MANIFEST_NAME = 'manifest.json'
+# الصور اللي بتتعالج افتراضيًا (نسبة لـ static/)
+RESPONSIVE_SOURCES = ('images/review*.jpeg',)
+
+WEBP_QUALITY = 75
+JPEG_QUALITY = 78
+
+
+def _static_root():
+    return settings.STATICFILES_DIRS[0]
+
+
+def manifest_path():
+    return os.path.join(_static_root(), RESPONSIVE_DIR, MANIFEST_NAME)
+
+
+def build_variants(static_name, widths=RESPONSIVE_WIDTHS, force=False):
+    """بيعمل نسخ صورة واحدة ويرجع الـ entry بتاعها في الـ manifest"""
+    source = os.path.join(_static_root(), static_name)
+    stem = os.path.splitext(os.path.basename(static_name))[0]
+    output_dir = os.path.join(_static_root(), RESPONSIVE_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    width, height = image.size
+
+    # مفيش تكبير: العروض الأكبر من الأصل بتتشال، والأصل نفسه بيبقى آخر مقاس
+    targets = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+    entry = {'width': width, 'height': height, 'webp': {}, 'jpeg': {}}
+    source_mtime = os.path.getmtime(source)
+
+    for target in targets:
+        target_height = round(height * target / width)
+        resized = None
+        for fmt, ext, options in (
+            ('webp', 'webp', {'quality': WEBP_QUALITY, 'method': 6}),
+            ('jpeg', 'jpg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+        ):
+            name = f'{RESPONSIVE_DIR}/{stem}-{target}.{ext}'
+            path = os.path.join(_static_root(), name)
+            if force or not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+                if resized is None:
+                    resized = image.resize((target, target_height), Image.LANCZOS)
+                resized.save(path, fmt.upper(), **options)
+            entry[fmt][str(target)] = name
+    return entry
+
+
+def build_manifest(patterns=RESPONSIVE_SOURCES, widths=RESPONSIVE_WIDTHS, force=False):
+    """بيعالج كل الصور اللي بتطابق patterns ويكتب الـ manifest. بيرجعه"""
+    manifest = {}
+    root = _static_root()
+    os.makedirs(os.path.dirname(manifest_path()), exist_ok=True)
+    for pattern in patterns:
+        for source in sorted(glob(os.path.join(root, pattern))):
+            static_name = os.path.relpath(source, root).replace(os.sep, '/')
+            manifest[static_name] = build_variants(static_name, widths, force=force)
+
+    with open(manifest_path(), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    load_manifest.cache_clear()
+    return manifest
+
+
+@lru_cache(maxsize=1)
+def load_manifest():
+    """الـ manifest بيتقري مرة واحدة في عمر الـ process (الملف بيتغير مع الـ deploy بس)"""
+    try:
+        with open(manifest_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -1,11 +1,81 @@
+"""إرسال الروابط الجديدة/المتعدلة لـ IndexNow على دفعات.
+
+send_indexnow(url) مابقاش يبعت طلب HTTP: بيسجل الرابط في IndexNowURL (لو
+مش مستني أصلاً) وبيتأكد إن فيه شغلانة 'indexnow.flush' واحدة بس في الطابور
+بعد INDEXNOW_BATCH_WINDOW. لما الشغلانة تشتغل بتبعت كل الروابط المستنية في
+urlList واحدة (لحد 10,000 رابط في الطلب حسب البروتوكول) من session واحدة
+فيها connection pool وtimeouts، وبتسجل نتيجة كل طلب في IndexNowSubmission.
+فنشر 100 مقال أو اعتماد 300 سؤال مرة واحدة = طلب واحد بس.
+"""
+from datetime import timedelta
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from django.db import transaction
+
+from .jobs import enqueue_unique
+from .models import IndexNowSubmission, IndexNowURL
+
+INDEXNOW_ENDPOINT = "https://api.indexnow.org/indexnow"
+INDEXNOW_HOST = "alagme.com"
+INDEXNOW_KEY = "800e60e37753412893002525b148ce17"
+INDEXNOW_KEY_LOCATION = f"https://{INDEXNOW_HOST}/{INDEXNOW_KEY}.txt"
+
+INDEXNOW_MAX_URLS = 10000
+INDEXNOW_BATCH_WINDOW = timedelta(minutes=2)
+# (connect, read) بالثواني
+INDEXNOW_TIMEOUT = (5, 20)
+
+_session = None
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        _session = session
+    return _session
+
+
+def send_indexnow(*urls):
+    """بيحط الروابط في دفعة IndexNow الجاية (من غير أي طلب HTTP دلوقتي).
+    الأدمن بيبعت كل روابط التحديث بالجملة في نداء واحد"""
+    if not urls:
+        return
+    IndexNowURL.objects.bulk_create([IndexNowURL(url=url) for url in urls], ignore_conflicts=True)
+    enqueue_unique('indexnow.flush', delay=INDEXNOW_BATCH_WINDOW)
+
+
+def submit_pending_urls():
+    """handler شغلانة 'indexnow.flush': بيبعت كل الروابط المستنية على دفعات"""
+    while True:
+        pending = list(
+            IndexNowURL.objects.filter(submission__isnull=True)
+            .order_by('pk').values_list('pk', 'url')[:INDEXNOW_MAX_URLS]
+        )
+        if not pending:
+            return
 
-def send_indexnow(url):
-    data = {
-        "host": "alagme.com",
-        "key": "800e60e37753412893002525b148ce17",
-        "keyLocation": "https://alagme.com/800e60e37753412893002525b148ce17.txt",
-        "urlList": [url]
-    }
+        data = {
+            "host": INDEXNOW_HOST,
+            "key": INDEXNOW_KEY,
+            "keyLocation": INDEXNOW_KEY_LOCATION,
+            "urlList": [url for _, url in pending],
+        }
+        submission = IndexNowSubmission(url_count=len(pending))
+        try:
+            response = _get_session().post(INDEXNOW_ENDPOINT, json=data, timeout=INDEXNOW_TIMEOUT)
+            submission.status_code = response.status_code
+            response.raise_for_status()
+        except requests.RequestException as e:
+            # الروابط بتفضل مستنية، والشغلانة بتتعاد بالـ backoff بتاع الطابور
+            submission.error = str(e)[:1000]
+            submission.save()
+            raise
 
-    requests.post("https://api.indexnow.org/indexnow", json=data)
\ No newline at end of file
+        submission.succeeded = True
+        with transaction.atomic():
+            submission.save()
+            IndexNowURL.objects.filter(pk__in=[pk for pk, _ in pending]).update(submission=submission)
@@ -0,0 +1,183 @@
+"""طابور شغلانات بسيط متخزن في الداتابيز (جدول core.Job).
+
+أي حاجة بتكلم خدمة برا (IndexNow، FCM، SMTP) مابقتش تتنفذ جوه الـ request
+أو الـ signal: enqueue() بيسجل صف في Job في نفس الـ transaction
+(فلو الحفظ اترجع الشغلانة بتترجع معاه)، والـ worker (run_worker) بيمسك
+الشغلانات ويكلم الـ handler بتاعها.
+
+- المسك في transaction واحدة ورا قفل (advisory lock على PostgreSQL، وقفل
+  الكتابة على SQLite)، فعدّ الشغلانات الشغالة والمسك بيحصلوا مع بعض ومفيش
+  اتنين workers يتخطوا حد نفس النوع.
+- الفشل بيتعاد بـ backoff أُسّي لحد max_attempts وبعدها الحالة failed.
+- كل نوع ليه أقصى عدد شغلانات شغالة في نفس الوقت عبر كل الـ workers،
+  وكل نوع بيتمسك لوحده، فنوع مليان في أول الطابور مابيعطلش الباقيين.
+- الشغلانات اللي خلصت بتتمسح بعد JOB_RETENTION (والفاشلة بعد
+  FAILED_JOB_RETENTION) من prune_finished_jobs في run_worker.
+
+رفع صور Cloudinary مش هنا: الملفات في MEDIA_ROOT بتاع الـ web process والـ
+worker على dyno تاني، فبيترفع في نفس الـ process (blog/tasks.py).
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+# النوع: (الـ handler، أقصى عدد شغال في نفس الوقت، أقصى عدد محاولات)
+JOB_KINDS = {
+    'indexnow.flush': ('core.indexnow.submit_pending_urls', 1, 8),
+    'push.public': ('accounts.notifications.send_public_notification', 2, 3),
+    'mail.question_subscribers': ('qna.tasks.send_subscription_emails', 2, 3),
+    'mail.subscription_digest': ('qna.tasks.send_subscription_digest', 1, 5),
+    'mail.question_admins': ('qna.tasks.send_new_question_email', 2, 5),
+    'blog.related': ('blog.related.update_related_posts', 1, 3),
+    'qna.reconcile_likes': ('qna.votes.reconcile_likes', 1, 3),
+    'core.deletion': ('core.deletion.run_deletion_task_by_id', 1, 5),
+}
+
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 60 * 60
+# شغلانة "running" عدى عليها الوقت ده من غير ما تخلص = الـ worker بتاعها وقع
+STALE_LOCK_TIMEOUT = timedelta(minutes=15)
+JOB_RETENTION = timedelta(days=7)
+FAILED_JOB_RETENTION = timedelta(days=30)
+PRUNE_CHUNK_SIZE = 1000
+
+
+def enqueue(kind, delay=None, **payload):
+    """بيسجل شغلانة جديدة. الـ payload لازم يكون JSON (ids وروابط، مش objects)"""
+    handler, _, max_attempts = JOB_KINDS[kind]
+    if getattr(settings, 'JOB_QUEUE_EAGER', False):
+        # للتطوير بس: تنفيذ فوري من غير worker
+        transaction.on_commit(lambda: import_string(handler)(**payload))
+        return None
+    run_after = timezone.now() + delay if delay else timezone.now()
+    return Job.objects.create(kind=kind, payload=payload, max_attempts=max_attempts, run_after=run_after)
+
+
+def enqueue_unique(kind, delay=None, **payload):
+    """زي enqueue بس لو فيه شغلانة من نفس النوع وبنفس البيانات لسه مستنية مابيكررهاش"""
+    pending = Job.objects.filter(kind=kind, status='queued', **{f'payload__{key}': value for key, value in payload.items()})
+    if not getattr(settings, 'JOB_QUEUE_EAGER', False) and pending.exists():
+        return None
+    return enqueue(kind, delay=delay, **payload)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def release_stale_jobs():
+    """بيرجع للطابور أي شغلانة worker بتاعها وقع وهي شغالة"""
+    return Job.objects.filter(
+        status='running', locked_at__lt=timezone.now() - STALE_LOCK_TIMEOUT
+    ).update(status='queued', locked_at=None, locked_by='')
+
+
+# رقم ثابت لقفل الـ advisory على PostgreSQL اللي بيرتب مسك الشغلانات بين الـ workers
+CLAIM_LOCK_ID = 7301
+
+
+def _lock_claims():
+    """جوه transaction: worker واحد بس يعد ويمسك في نفس الوقت لحد الـ commit،
+    عشان العد بتاع _free_slots مايبقاش قديم والحد بتاع كل نوع يتكسر"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CLAIM_LOCK_ID])
+    else:
+        # SQLite: أي كتابة بتمسك قفل الكتابة على الداتابيز كلها لحد آخر الـ transaction
+        Job.objects.filter(pk=0).update(locked_by='')
+
+
+def _free_slots():
+    running = {kind: 0 for kind in JOB_KINDS}
+    for kind in Job.objects.filter(status='running').values_list('kind', flat=True):
+        running[kind] = running.get(kind, 0) + 1
+    return {kind: limit - running[kind] for kind, (_, limit, _) in JOB_KINDS.items() if limit > running[kind]}
+
+
+def claim_jobs(limit=10, worker=None):
+    """بيمسك لحد limit شغلانة جاهزة مع احترام حد كل نوع، وبيرجعها.
+    العد والمسك في transaction واحدة تحت _lock_claims"""
+    worker = worker or worker_name()
+    now = timezone.now()
+
+    with transaction.atomic():
+        _lock_claims()
+        slots = _free_slots()
+        if not slots:
+            return []
+
+        ready = Job.objects.filter(status='queued', run_after__lte=now)
+        waiting = set(ready.filter(kind__in=slots).values_list('kind', flat=True).distinct())
+        ready = ready.order_by('run_after', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            ready = ready.select_for_update(skip_locked=True)
+        # استعلام لكل نوع ليه شغلانات ومكان، وبعدين الأقدم من الكل
+        candidates = [
+            job
+            for kind in waiting
+            for job in ready.filter(kind=kind)[:min(slots[kind], limit)]
+        ]
+        candidates.sort(key=lambda job: (job.run_after, job.pk))
+        claimed = candidates[:limit]
+        Job.objects.filter(pk__in=[job.pk for job in claimed]).update(
+            status='running', locked_at=now, locked_by=worker
+        )
+
+    for job in claimed:
+        job.status, job.locked_at, job.locked_by = 'running', now, worker
+    return claimed
+
+
+def run_job(job):
+    """بينفذ شغلانة ممسوكة ويسجل نتيجتها (نجاح، إعادة بعد مدة، أو فشل نهائي)"""
+    attempts = job.attempts + 1
+    try:
+        handler = import_string(JOB_KINDS[job.kind][0])
+        handler(**job.payload)
+    except Exception as e:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        if attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status='failed', attempts=attempts, last_error=repr(e), finished_at=timezone.now(),
+                locked_at=None, locked_by='',
+            )
+            return False
+        Job.objects.filter(pk=job.pk).update(
+            status='queued', attempts=attempts, last_error=repr(e),
+            run_after=timezone.now() + retry_delay(attempts), locked_at=None, locked_by='',
+        )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status='done', attempts=attempts, finished_at=timezone.now(), locked_at=None, locked_by='',
+    )
+    return True
+
+
+def prune_finished_jobs(now=None):
+    """بيمسح الشغلانات الخلصانة القديمة على دفعات. بيرجع عدد اللي اتمسح"""
+    now = now or timezone.now()
+    old = Job.objects.filter(status='done', finished_at__lt=now - JOB_RETENTION) | Job.objects.filter(
+        status='failed', finished_at__lt=now - FAILED_JOB_RETENTION
+    )
+    pruned = 0
+    while True:
+        pks = list(old.values_list('pk', flat=True)[:PRUNE_CHUNK_SIZE])
+        if not pks:
+            return pruned
+        pruned += Job.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ArchivedLesson, Lesson, LessonMonthlyAggregate
+
+
+class Command(BaseCommand):
+    """
+    بينقل الحلقات القديمة من جدول Lesson لجدول ArchivedLesson على دفعات (chunks)،
+    وقبل ما ينقل كل دفعة بيضيف أرقامها لملخص الشهر في LessonMonthlyAggregate
+    (في نفس الـ transaction)، فالتقارير عن الشهور القديمة بتفضل مظبوطة وجدول
+    الحلقات الأساسي بيفضل فيه الشهور الأخيرة بس.
+
+    بيأرشف شهور كاملة بس: --older-than 6 معناها أي حلقة قبل أول الشهر اللي
+    كان من 6 شهور.
+
+    الاستخدام:
+        python manage.py archive_lessons --older-than 6
+        python manage.py archive_lessons --older-than 12 --chunk-size 500 --dry-run
+    """
+    help = 'ينقل الحلقات الأقدم من عدد شهور معين للأرشيف بعد حفظ ملخصاتها الشهرية'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, help='عدد الشهور اللي تفضل في الجدول الأساسي')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='عدد الحلقات في كل دفعة')
+        parser.add_argument('--dry-run', action='store_true', help='يعرض العدد بس من غير ما ينقل حاجة')
+
+    def handle(self, *args, **options):
+        months = max(options['older_than'], 1)
+        chunk_size = max(options['chunk_size'], 1)
+
+        today = timezone.localdate()
+        month_index = today.year * 12 + (today.month - 1) - months
+        cutoff = timezone.make_aware(datetime.combine(date(month_index // 12, month_index % 12 + 1, 1), time.min))
+
+        old_lessons = Lesson.objects.filter(scheduled_at__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f'هيتأرشف {old_lessons.count()} حلقة قبل {cutoff:%Y-%m-%d}.')
+            return
+
+        archived_count = 0
+        while True:
+            with transaction.atomic():
+                chunk = list(old_lessons.order_by('pk').select_for_update()[:chunk_size])
+                if not chunk:
+                    break
+                self._add_to_aggregates(chunk)
+                ArchivedLesson.objects.bulk_create([self._archived_copy(lesson) for lesson in chunk])
+                Lesson.objects.filter(pk__in=[lesson.pk for lesson in chunk]).delete()
+            archived_count += len(chunk)
+            self.stdout.write(f'... اتأرشف {archived_count} حلقة')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'تم أرشفة {archived_count} حلقة قبل {cutoff:%Y-%m-%d} وحفظ ملخصاتها الشهرية.'
+        ))
+
+    def _add_to_aggregates(self, lessons):
+        """نفس منطق Teacher.monthly_lesson_stats: الحلقة المجدولة اللي عدى وقتها = غياب تلقائي"""
+        counters = defaultdict(lambda: dict.fromkeys(LessonMonthlyAggregate.COUNTER_FIELDS, 0))
+        for lesson in lessons:
+            local_time = timezone.localtime(lesson.scheduled_at)
+            row = counters[(lesson.teacher_id, lesson.student_id, local_time.year, local_time.month)]
+            row['total'] += 1
+            eff = lesson.effective_status()
+            if eff in ('completed', 'student_absent', 'teacher_absent', 'cancelled'):
+                row[eff] += 1
+            if lesson.was_auto_defaulted():
+                row['unrecorded'] += 1
+            if lesson.was_late:
+                row['late'] += 1
+
+        for (teacher_id, student_id, year, month), row in counters.items():
+            aggregate, created = LessonMonthlyAggregate.objects.get_or_create(
+                teacher_id=teacher_id, student_id=student_id, year=year, month=month, defaults=row,
+            )
+            if not created:
+                LessonMonthlyAggregate.objects.filter(pk=aggregate.pk).update(
+                    **{field: F(field) + value for field, value in row.items()}
+                )
+
+    def _archived_copy(self, lesson):
+        return ArchivedLesson(
+            original_id=lesson.pk,
+            student_id=lesson.student_id,
+            teacher_id=lesson.teacher_id,
+            scheduled_at=lesson.scheduled_at,
+            duration_minutes=lesson.duration_minutes,
+            status=lesson.status,
+            status_recorded_at=lesson.status_recorded_at,
+            started_at=lesson.started_at,
+            auto_flagged=lesson.auto_flagged,
+            was_late=lesson.was_late,
+            notes=lesson.notes,
+            created_at=lesson.created_at,
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.images import RESPONSIVE_SOURCES, RESPONSIVE_WIDTHS, build_manifest
+
+
+class Command(BaseCommand):
+    """
+    بيعمل نسخ WebP/JPEG بعروض مختلفة من الصور الثابتة ويكتب manifest.json
+    اللي الـ tag ‏{% responsive_image %} بيقرا منه (core/images.py).
+
+    بيتشغل بعد إضافة أو تغيير أي صورة ثابتة وقبل collectstatic. النسخ
+    الموجودة والأحدث من الأصل مابتتعملش تاني إلا مع --force.
+
+    الاستخدام:
+        python manage.py build_responsive_images
+        python manage.py build_responsive_images --force
+        python manage.py build_responsive_images --pattern "images/banner*.jpg"
+    """
+    help = 'يعمل نسخ متجاوبة (WebP + JPEG بعروض مختلفة) من الصور الثابتة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pattern', action='append', dest='patterns',
+                            help='glob نسبة لـ static/ (ممكن يتكرر)')
+        parser.add_argument('--force', action='store_true', help='إعادة توليد كل النسخ')
+
+    def handle(self, *args, **options):
+        manifest = build_manifest(
+            patterns=options['patterns'] or RESPONSIVE_SOURCES,
+            widths=RESPONSIVE_WIDTHS,
+            force=options['force'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'تم تجهيز {len(manifest)} صورة.'))
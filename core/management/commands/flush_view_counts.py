@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.view_counters import flush_all, is_shared_cache
+
+
+class Command(BaseCommand):
+    """
+    بينقل عدادات المشاهدات المتجمعة في الكاش للداتابيز (core/view_counters.py).
+
+    كل process بيعمل ده لوحده كل VIEW_COUNTER_FLUSH_INTERVAL ثانية للـ pks
+    اللي شافها. الأمر ده للكاش المشترك (Redis) بس: بيلف على كل الصفوف ويلم
+    اللي process وقع قبل ما ينقله، ومع LocMemCache بيرفض لأن كاشه فاضي.
+
+    الاستخدام:
+        python manage.py flush_view_counts
+    """
+    help = 'ينقل عدادات المشاهدات المؤجلة من الكاش المشترك للداتابيز'
+
+    def handle(self, *args, **options):
+        if not is_shared_cache():
+            raise CommandError(
+                'كاش العدادات LocMemCache (لكل process لوحده)، فالأمر مش هيشوف أي مشاهدات. '
+                'النقل بيحصل من جوه الـ processes نفسها.'
+            )
+        flushed = flush_all(scan=True)
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث عدد المشاهدات لـ {flushed} عنصر.'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from core.deletion import DELETION_CHUNK_SIZE, claimable_tasks, run_deletion_task
+
+
+class Command(BaseCommand):
+    """
+    بينفذ طلبات الحذف اللي اتسجلت من صفحات حذف الدولة/المعلمة أو من الأدمن
+    (core/deletion.py). كل جدول بيتحذف على دفعات صغيرة، والتقدم بيتسجل في
+    DeletionTask.deleted_rows فيبان في الأدمن أول بأول. الطلبات اللي فشلت أو
+    وقفت في النص بتكمل من مكان ما وقفت.
+
+    المفروض يشتغل دوري (cron) أو بعد أي حذف كبير.
+
+    الاستخدام:
+        python manage.py process_deletions
+        python manage.py process_deletions --chunk-size 200
+    """
+    help = 'ينفذ عمليات الحذف المؤجلة (دول/معلمات/طلاب) على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DELETION_CHUNK_SIZE, help='عدد الصفوف في كل دفعة')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        tasks = list(claimable_tasks().order_by('created_at'))
+
+        if not tasks:
+            self.stdout.write('مفيش عمليات حذف مستنية.')
+            return
+
+        for task in tasks:
+            self.stdout.write(f'جاري حذف {task.object_repr} ...')
+            try:
+                if not run_deletion_task(task, chunk_size=chunk_size):
+                    continue  # worker تاني مسكها
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'فشل حذف {task.object_repr}: {e}'))
+                continue
+            task.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(f'تم حذف {task.object_repr} ({task.deleted_rows} صف).'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog.search import rebuild_post_index
+from qna.search import rebuild_question_index
+
+
+class Command(BaseCommand):
+    """
+    بيبني فهرس البحث (core/search.py) من الأول لكل المحتوى المنشور.
+    الحفظ العادي بيحدّث الفهرس لوحده، والمحتوى القديم بيتفهرس في الـ migrations
+    (blog/0005 وqna/0008)، فده محتاجينه بس لو قواعد التطبيع اتغيرت.
+
+    الاستخدام:
+        python manage.py rebuild_search_index
+    """
+    help = 'يعيد بناء فهرس البحث للمقالات والأسئلة'
+
+    def handle(self, *args, **options):
+        rebuild_post_index()
+        rebuild_question_index()
+        self.stdout.write(self.style.SUCCESS('تم تحديث فهرس البحث.'))
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim_jobs, prune_finished_jobs, release_stale_jobs, run_job, worker_name
+
+
+# كل قد إيه الـ worker بيمسح الشغلانات القديمة (core.jobs.prune_finished_jobs)
+PRUNE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    """
+    الـ worker بتاع طابور الشغلانات (core/jobs.py). بيفضل شغال يمسك
+    الشغلانات الجاهزة وينفذها، ولو الطابور فاضي بينام شوية ويرجع يشوف.
+    ممكن يشتغل منه أكتر من نسخة في نفس الوقت. كل PRUNE_INTERVAL ثانية بيمسح
+    الشغلانات القديمة اللي خلصت.
+
+    الاستخدام:
+        python manage.py run_worker
+        python manage.py run_worker --once          # يفضّي الطابور مرة ويخرج (cron)
+        python manage.py run_worker --sleep 5 --batch 20
+    """
+    help = 'ينفذ الشغلانات الخلفية (IndexNow، إشعارات، إيميلات، حذف...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='ينفذ الموجود دلوقتي ويخرج')
+        parser.add_argument('--sleep', type=float, default=2, help='ثواني الانتظار لما الطابور يفضى')
+        parser.add_argument('--batch', type=int, default=10, help='عدد الشغلانات اللي بتتمسك مرة واحدة')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        batch = max(options['batch'], 1)
+        done = failed = 0
+        next_prune = 0
+        self.stdout.write(f'الـ worker {worker} شغال...')
+
+        try:
+            while True:
+                close_old_connections()
+                release_stale_jobs()
+                if time.monotonic() >= next_prune:
+                    prune_finished_jobs()
+                    next_prune = time.monotonic() + PRUNE_INTERVAL
+                jobs = claim_jobs(limit=batch, worker=worker)
+
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                for job in jobs:
+                    if run_job(job):
+                        done += 1
+                    else:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f'فشلت {job.kind} #{job.pk} (هتتعاد لو لسه فيه محاولات)'))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'خلصت {done} شغلانة، وفشلت {failed}.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_lesson_started_at_alter_lesson_auto_flagged'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlyevaluation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='آخر تعديل'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_monthlyevaluation_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlyevaluation',
+            name='is_draft',
+            field=models.BooleanField(default=False, verbose_name='مسودة (اتعملت بالجملة ولسه محتاجة تكملة)'),
+        ),
+    ]
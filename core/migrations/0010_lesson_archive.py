@@ -0,0 +1,92 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_monthlyevaluation_is_draft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLesson',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True, verbose_name='رقم الحلقة الأصلي')),
+                ('scheduled_at', models.DateTimeField(verbose_name='موعد الحلقة')),
+                ('duration_minutes', models.PositiveIntegerField(default=30, verbose_name='مدة الحلقة (دقيقة)')),
+                ('status', models.CharField(choices=[('scheduled', 'مجدولة'), ('completed', 'تمت'), ('student_absent', 'الطالب غائب'), ('teacher_absent', 'المعلمة لم تتمكن من الحضور'), ('cancelled', 'أُلغيت'), ('unregistered', 'غير مسجلة')], max_length=20, verbose_name='الحالة')),
+                ('status_recorded_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت تسجيل الحالة')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت بدء الحلقة فعليًا')),
+                ('auto_flagged', models.BooleanField(default=False, verbose_name='اتحسبت غياب تلقائيًا من غير ما تتسجل')),
+                ('was_late', models.BooleanField(default=False, verbose_name='اتأخرت المعلمة في الحضور')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='ملاحظات على الحلقة')),
+                ('created_at', models.DateTimeField(verbose_name='تاريخ الإنشاء')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الأرشفة')),
+            ],
+            options={
+                'verbose_name': 'حلقة مؤرشفة',
+                'verbose_name_plural': 'الحلقات المؤرشفة',
+                'ordering': ['scheduled_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LessonMonthlyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='السنة')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='الشهر')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='عدد الحلقات')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='المكتملة')),
+                ('student_absent', models.PositiveIntegerField(default=0, verbose_name='غياب الطالب')),
+                ('unrecorded', models.PositiveIntegerField(default=0, verbose_name='غياب تلقائي (بدون تسجيل)')),
+                ('teacher_absent', models.PositiveIntegerField(default=0, verbose_name='غياب المعلمة')),
+                ('cancelled', models.PositiveIntegerField(default=0, verbose_name='الملغاة')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='التأخيرات')),
+            ],
+            options={
+                'verbose_name': 'ملخص حلقات شهري',
+                'verbose_name_plural': 'ملخصات الحلقات الشهرية',
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['teacher', 'scheduled_at'], name='core_lesson_teacher_d9a919_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['student', 'scheduled_at'], name='core_lesson_student_49244f_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedlesson',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_lessons', to='core.student', verbose_name='الطالب'),
+        ),
+        migrations.AddField(
+            model_name='archivedlesson',
+            name='teacher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_lessons', to='core.teacher', verbose_name='المعلمة'),
+        ),
+        migrations.AddField(
+            model_name='lessonmonthlyaggregate',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_aggregates', to='core.student', verbose_name='الطالب'),
+        ),
+        migrations.AddField(
+            model_name='lessonmonthlyaggregate',
+            name='teacher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_aggregates', to='core.teacher', verbose_name='المعلمة'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonmonthlyaggregate',
+            index=models.Index(fields=['teacher', 'year', 'month'], name='core_lesson_teacher_a7b908_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='lessonmonthlyaggregate',
+            unique_together={('teacher', 'student', 'year', 'month')},
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_lesson_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='جاري الحذف'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='جاري الحذف'),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='جاري الحذف'),
+        ),
+        migrations.CreateModel(
+            name='DeletionTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=50, verbose_name='النوع')),
+                ('object_id', models.PositiveIntegerField(verbose_name='رقم العنصر')),
+                ('object_repr', models.CharField(max_length=255, verbose_name='العنصر')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'جاري الحذف'), ('done', 'تم'), ('failed', 'فشل')], db_index=True, default='pending', max_length=10, verbose_name='الحالة')),
+                ('deleted_rows', models.PositiveIntegerField(default=0, verbose_name='عدد الصفوف اللي اتحذفت')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الطلب')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بداية التنفيذ')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='نهاية التنفيذ')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='طلبه')),
+            ],
+            options={
+                'verbose_name': 'عملية حذف في الخلفية',
+                'verbose_name_plural': 'عمليات الحذف في الخلفية',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
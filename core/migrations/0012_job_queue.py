@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_deferred_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(db_index=True, max_length=50, verbose_name='النوع')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='البيانات')),
+                ('status', models.CharField(choices=[('queued', 'في الطابور'), ('running', 'شغالة'), ('done', 'خلصت'), ('failed', 'فشلت')], default='queued', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='أقصى عدد محاولات')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تتنفذ بعد')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='اتمسكت في')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='الـ worker')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإضافة')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+            ],
+            options={
+                'verbose_name': 'شغلانة خلفية',
+                'verbose_name_plural': 'الشغلانات الخلفية',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='core_job_status_df1a33_idx'), models.Index(fields=['kind', 'status'], name='core_job_kind_5254e1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexNowSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_count', models.PositiveIntegerField(default=0, verbose_name='عدد الروابط')),
+                ('status_code', models.PositiveIntegerField(blank=True, null=True, verbose_name='كود الرد')),
+                ('succeeded', models.BooleanField(default=False, verbose_name='نجح')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True, verbose_name='وقت الإرسال')),
+            ],
+            options={
+                'verbose_name': 'إرسال IndexNow',
+                'verbose_name_plural': 'إرسالات IndexNow',
+                'ordering': ['-submitted_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexNowURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, verbose_name='الرابط')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, verbose_name='وقت الإضافة')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='urls', to='core.indexnowsubmission', verbose_name='اتبعت في')),
+            ],
+            options={
+                'verbose_name': 'رابط IndexNow',
+                'verbose_name_plural': 'روابط IndexNow',
+                'ordering': ['queued_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('submission__isnull', True)), fields=('url',), name='unique_pending_indexnow_url')],
+            },
+        ),
+    ]
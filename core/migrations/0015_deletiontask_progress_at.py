@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletiontask',
+            name='progress_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر تقدم'),
+        ),
+    ]
@@ -1,13 +1,26 @@
 import uuid
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
 
+class VisibleManager(models.Manager):
+    """بيخفي الصفوف اللي اتطلب حذفها ولسه الحذف شغال في الخلفية (core/deletion.py).
+    الـ worker نفسه بيشتغل بـ all_objects / _base_manager عشان يوصلها."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
 class Country(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="اسم الدولة")
     flag_icon = models.CharField(max_length=50, default='🏳️', verbose_name="أيقونة العلم")
     is_active = models.BooleanField(default=True, verbose_name="نشط")
+    pending_deletion = models.BooleanField(default=False, db_index=True, editable=False, verbose_name="جاري الحذف")
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "دولة"
@@ -17,6 +30,17 @@ class Country(models.Model):
     def __str__(self):
         return self.name
 
+    def validate_unique(self, exclude=None):
+        """التحقق الافتراضي بيستخدم objects (بيخفي اللي جاري حذفها)، والقيد في
+        الداتابيز على كل الصفوف، فالاسم بيتقارن بـ all_objects عشان الفورم يطلع
+        رسالة بدل IntegrityError"""
+        super().validate_unique(exclude=exclude)
+        if exclude and 'name' in exclude:
+            return
+        pending = Country.all_objects.filter(name=self.name, pending_deletion=True).exclude(pk=self.pk)
+        if pending.exists():
+            raise ValidationError({'name': 'فيه دولة بنفس الاسم لسه بتتمسح، جرّب تاني بعد ما الحذف يخلص.'})
+
 
 class Teacher(models.Model):
     name = models.CharField(max_length=255, verbose_name="اسم المعلمة")
@@ -25,6 +49,7 @@ class Teacher(models.Model):
     whatsapp = models.CharField(max_length=20, blank=True, null=True, verbose_name="واتساب")
     governorate = models.CharField(max_length=100, blank=True, null=True, verbose_name="المحافظة")
     hire_date = models.DateField(null=True, blank=True, verbose_name="تاريخ بداية العمل")
+    pending_deletion = models.BooleanField(default=False, db_index=True, editable=False, verbose_name="جاري الحذف")
 
     # حساب دخول المعلمة نفسها (مش أدمن، صلاحياته محدودة على بياناتها هي بس)
     user = models.OneToOneField(
@@ -42,6 +67,9 @@ class Teacher(models.Model):
         verbose_name="راتب مثبت (بدل النسبة)"
     )
 
+    objects = VisibleManager()
+    all_objects = models.Manager()
+
     class Meta:
         verbose_name = "معلمة"
         verbose_name_plural = "المعلمات"
@@ -95,6 +123,26 @@ class Teacher(models.Model):
         """هل اتصرفلها راتب عن الشهر ده قبل كده؟ (عشان نمنع صرف راتب نفس الشهر مرتين)"""
         return self.salary_records.filter(payout_date__year=year, payout_date__month=month).exists()
 
+    @staticmethod
+    def with_month_stats(queryset, year, month):
+        """للقوايم اللي بتنادي monthly_lesson_stats لكل معلمة: حلقات الشهر وملخصاته
+        المؤرشفة بيتجابوا لكل المعلمات في استعلامين (prefetch)، والشكاوى annotate،
+        بدل 3 استعلامات لكل معلمة"""
+        return queryset.prefetch_related(
+            models.Prefetch(
+                'lessons', queryset=Lesson.objects.filter(scheduled_at__year=year, scheduled_at__month=month),
+                to_attr=f'month_lessons_{year}_{month}',
+            ),
+            models.Prefetch(
+                'lesson_aggregates', queryset=LessonMonthlyAggregate.objects.filter(year=year, month=month),
+                to_attr=f'month_aggregates_{year}_{month}',
+            ),
+        ).annotate(**{
+            f'month_complaints_{year}_{month}': models.Count(
+                'complaints', filter=models.Q(complaints__date__year=year, complaints__date__month=month)
+            ),
+        })
+
     def lessons_for_period(self, year=None, month=None):
         now = timezone.now()
         year = year or now.year
@@ -104,13 +152,19 @@ class Teacher(models.Model):
     def monthly_lesson_stats(self, year=None, month=None):
         """إحصائيات الحضور والانضباط عن شهر واحد (افتراضيًا الشهر الحالي):
         عدد الحلقات، المكتملة، غياب الطالب (وضمنها اللي محدش سجلها فعتُبرت
-        غياب تلقائي)، غياب المعلمة، الملغاة، التأخيرات، ونسب الالتزام/الحضور/التسجيل"""
-        qs = self.lessons_for_period(year, month)
-        total = qs.count()
-        completed = student_absent = teacher_absent = cancelled = late = 0
+        غياب تلقائي)، غياب المعلمة، الملغاة، التأخيرات، ونسب الالتزام/الحضور/التسجيل.
+        الشهور اللي اتأرشفت (archive_lessons) بتتقري من LessonMonthlyAggregate"""
+        now = timezone.now()
+        year = year or now.year
+        month = month or now.month
+        qs = getattr(self, f'month_lessons_{year}_{month}', None)
+        if qs is None:
+            qs = self.lessons_for_period(year, month)
+        total = completed = student_absent = teacher_absent = cancelled = late = 0
         unrecorded = 0  # عدد الحلقات اللي محدش سجلها يدويًا (اتحسبت غياب تلقائي) - رقم فرعي داخل student_absent
 
         for lesson in qs:
+            total += 1
             eff = lesson.effective_status()
             if eff == 'completed':
                 completed += 1
@@ -125,6 +179,24 @@ class Teacher(models.Model):
             if lesson.was_late:
                 late += 1
 
+        aggregates = getattr(self, f'month_aggregates_{year}_{month}', None)
+        if aggregates is not None:
+            archived = {
+                field: sum(getattr(row, field) for row in aggregates)
+                for field in LessonMonthlyAggregate.COUNTER_FIELDS
+            }
+        else:
+            archived = self.lesson_aggregates.filter(year=year, month=month).aggregate(
+                **{field: models.Sum(field) for field in LessonMonthlyAggregate.COUNTER_FIELDS}
+            )
+        total += archived['total'] or 0
+        completed += archived['completed'] or 0
+        student_absent += archived['student_absent'] or 0
+        unrecorded += archived['unrecorded'] or 0
+        teacher_absent += archived['teacher_absent'] or 0
+        cancelled += archived['cancelled'] or 0
+        late += archived['late'] or 0
+
         countable = total - cancelled  # الملغاة مش بتتحاسب في نسبة الالتزام
         commitment_rate = round((completed / countable * 100), 1) if countable else 100.0
         attendance_rate = round(((countable - teacher_absent) / countable * 100), 1) if countable else 100.0
@@ -140,6 +212,8 @@ class Teacher(models.Model):
         }
 
     def complaints_count(self, year=None, month=None):
+        if hasattr(self, f'month_complaints_{year}_{month}'):
+            return getattr(self, f'month_complaints_{year}_{month}')
         qs = self.complaints.all()
         if year:
             qs = qs.filter(date__year=year)
@@ -213,6 +287,10 @@ class Student(models.Model):
         max_length=20, choices=SOURCE_CHOICES, blank=True, null=True,
         verbose_name="مصدر الطالب (لو جديد)"
     )
+    pending_deletion = models.BooleanField(default=False, db_index=True, editable=False, verbose_name="جاري الحذف")
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "طالب"
@@ -237,8 +315,13 @@ class Student(models.Model):
         return total or 0
 
     def lessons_completed_count(self):
-        """كام حلقة اتعملت فعلًا للطالب ده من كل حلقاته المسجلة في السيستم"""
-        return self.lessons.filter(status='completed').count()
+        """كام حلقة اتعملت فعلًا للطالب ده من كل حلقاته المسجلة في السيستم
+        (لو الاستعلام جايب completed_lessons كـ annotate بنستخدمه بدل count جديد)،
+        وضمنها الحلقات القديمة اللي اتأرشفت"""
+        if hasattr(self, 'completed_lessons'):
+            return self.completed_lessons
+        archived = self.lesson_aggregates.aggregate(total=models.Sum('completed'))['total'] or 0
+        return self.lessons.filter(status='completed').count() + archived
 
     def lessons_progress_label(self):
         """عدد الحلقات المطلوبة (من الباقة) مقابل اللي تمت فعلًا - '3 من 8' مثلًا"""
@@ -336,8 +419,10 @@ class MonthlyEvaluation(models.Model):
     month_rating = models.CharField(max_length=100, blank=True, null=True, verbose_name="مستوى الشهر")
 
     template = models.CharField(max_length=20, choices=TEMPLATE_CHOICES, default='teal_pink', verbose_name="شكل النموذج")
+    is_draft = models.BooleanField(default=False, verbose_name="مسودة (اتعملت بالجملة ولسه محتاجة تكملة)")
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تعديل")
 
     class Meta:
         verbose_name = "تقييم شهري"
@@ -378,6 +463,10 @@ class Lesson(models.Model):
         verbose_name = "حلقة"
         verbose_name_plural = "الحلقات"
         ordering = ['scheduled_at']
+        indexes = [
+            models.Index(fields=['teacher', 'scheduled_at']),
+            models.Index(fields=['student', 'scheduled_at']),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.scheduled_at:%Y-%m-%d %H:%M}"
@@ -425,6 +514,65 @@ class Lesson(models.Model):
         self.save(update_fields=['status', 'status_recorded_at', 'auto_flagged', 'was_late'])
 
 
+class ArchivedLesson(models.Model):
+    """نسخة من حلقة قديمة اتنقلت من جدول Lesson بأمر archive_lessons، عشان جدول
+    الحلقات الأساسي يفضل صغير وكل لوحات المتابعة اللي بتفلتر بالشهر تبقى سريعة.
+    الإحصائيات نفسها بتتقري من LessonMonthlyAggregate، ده للرجوع للتفاصيل بس"""
+    original_id = models.BigIntegerField(unique=True, verbose_name="رقم الحلقة الأصلي")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_lessons', verbose_name="الطالب")
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='archived_lessons', verbose_name="المعلمة")
+
+    scheduled_at = models.DateTimeField(verbose_name="موعد الحلقة")
+    duration_minutes = models.PositiveIntegerField(default=30, verbose_name="مدة الحلقة (دقيقة)")
+    status = models.CharField(max_length=20, choices=Lesson.STATUS_CHOICES, verbose_name="الحالة")
+    status_recorded_at = models.DateTimeField(null=True, blank=True, verbose_name="وقت تسجيل الحالة")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="وقت بدء الحلقة فعليًا")
+    auto_flagged = models.BooleanField(default=False, verbose_name="اتحسبت غياب تلقائيًا من غير ما تتسجل")
+    was_late = models.BooleanField(default=False, verbose_name="اتأخرت المعلمة في الحضور")
+    notes = models.TextField(blank=True, null=True, verbose_name="ملاحظات على الحلقة")
+    created_at = models.DateTimeField(verbose_name="تاريخ الإنشاء")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الأرشفة")
+
+    class Meta:
+        verbose_name = "حلقة مؤرشفة"
+        verbose_name_plural = "الحلقات المؤرشفة"
+        ordering = ['scheduled_at']
+
+    def __str__(self):
+        return f"{self.student.name} - {self.scheduled_at:%Y-%m-%d %H:%M} (أرشيف)"
+
+
+class LessonMonthlyAggregate(models.Model):
+    """ملخص حلقات شهر واحد لكل (معلمة، طالب) - بيتحسب وقت الأرشفة قبل ما الحلقات
+    تتنقل، وبيتقري منه أي تقرير عن شهر مؤرشف بدل جدول Lesson"""
+    COUNTER_FIELDS = ('total', 'completed', 'student_absent', 'unrecorded', 'teacher_absent', 'cancelled', 'late')
+
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='lesson_aggregates', verbose_name="المعلمة")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='lesson_aggregates', verbose_name="الطالب")
+    year = models.PositiveIntegerField(verbose_name="السنة")
+    month = models.PositiveSmallIntegerField(verbose_name="الشهر")
+
+    total = models.PositiveIntegerField(default=0, verbose_name="عدد الحلقات")
+    completed = models.PositiveIntegerField(default=0, verbose_name="المكتملة")
+    student_absent = models.PositiveIntegerField(default=0, verbose_name="غياب الطالب")
+    unrecorded = models.PositiveIntegerField(default=0, verbose_name="غياب تلقائي (بدون تسجيل)")
+    teacher_absent = models.PositiveIntegerField(default=0, verbose_name="غياب المعلمة")
+    cancelled = models.PositiveIntegerField(default=0, verbose_name="الملغاة")
+    late = models.PositiveIntegerField(default=0, verbose_name="التأخيرات")
+
+    class Meta:
+        verbose_name = "ملخص حلقات شهري"
+        verbose_name_plural = "ملخصات الحلقات الشهرية"
+        ordering = ['-year', '-month']
+        unique_together = ['teacher', 'student', 'year', 'month']
+        indexes = [
+            models.Index(fields=['teacher', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.teacher.name} - {self.student.name} - {self.month}/{self.year}"
+
+
 class ScheduleRequest(models.Model):
     """طلب إضافة موعد جديد أو تعديل موعد قائم - المعلمة تقترح والإدارة توافق"""
     REQUEST_TYPE_CHOICES = [
@@ -504,3 +652,132 @@ class TeacherComplaint(models.Model):
 
     def __str__(self):
         return f"شكوى - {self.teacher.name} - {self.date}"
+
+
+class DeletionTask(models.Model):
+    """طلب حذف دولة/معلمة/طالب بكل اللي تحته. الأب بيتخفى فورًا (pending_deletion)
+    والحذف الفعلي بيتم على دفعات من process_deletions بدل ما يتعمل جوه الـ request"""
+    STATUS_CHOICES = [
+        ('pending', 'في الانتظار'),
+        ('running', 'جاري الحذف'),
+        ('done', 'تم'),
+        ('failed', 'فشل'),
+    ]
+
+    model_label = models.CharField(max_length=50, verbose_name="النوع")
+    object_id = models.PositiveIntegerField(verbose_name="رقم العنصر")
+    object_repr = models.CharField(max_length=255, verbose_name="العنصر")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="الحالة")
+    deleted_rows = models.PositiveIntegerField(default=0, verbose_name="عدد الصفوف اللي اتحذفت")
+    error = models.TextField(blank=True, verbose_name="الخطأ")
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='+', verbose_name="طلبه"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الطلب")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="بداية التنفيذ")
+    # بيتحدث مع كل دفعة، فالعملية اللي وقفت (worker وقع) تبان وتتمسك تاني
+    progress_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر تقدم")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="نهاية التنفيذ")
+
+    class Meta:
+        verbose_name = "عملية حذف في الخلفية"
+        verbose_name_plural = "عمليات الحذف في الخلفية"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"حذف {self.object_repr} ({self.get_status_display()})"
+
+
+class Job(models.Model):
+    """شغلانة في طابور الخلفية (core/jobs.py): IndexNow، إشعارات FCM، إيميلات،
+    رفع صور... الـ request بيسجلها بس، وrun_worker هو اللي بينفذها"""
+    STATUS_CHOICES = [
+        ('queued', 'في الطابور'),
+        ('running', 'شغالة'),
+        ('done', 'خلصت'),
+        ('failed', 'فشلت'),
+    ]
+
+    kind = models.CharField(max_length=50, db_index=True, verbose_name="النوع")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="البيانات")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name="الحالة")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="عدد المحاولات")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="أقصى عدد محاولات")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="تتنفذ بعد")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="اتمسكت في")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="الـ worker")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإضافة")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ الانتهاء")
+
+    class Meta:
+        verbose_name = "شغلانة خلفية"
+        verbose_name_plural = "الشغلانات الخلفية"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['kind', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+
+
+class IndexNowSubmission(models.Model):
+    """نتيجة كل طلب اتبعت لـ IndexNow (دفعة روابط في urlList واحدة)"""
+    url_count = models.PositiveIntegerField(default=0, verbose_name="عدد الروابط")
+    status_code = models.PositiveIntegerField(null=True, blank=True, verbose_name="كود الرد")
+    succeeded = models.BooleanField(default=False, verbose_name="نجح")
+    error = models.TextField(blank=True, verbose_name="الخطأ")
+    submitted_at = models.DateTimeField(auto_now_add=True, verbose_name="وقت الإرسال")
+
+    class Meta:
+        verbose_name = "إرسال IndexNow"
+        verbose_name_plural = "إرسالات IndexNow"
+        ordering = ['-submitted_at']
+
+    def __str__(self):
+        return f"IndexNow {self.url_count} رابط - {self.status_code or self.error[:30]}"
+
+
+class IndexNowURL(models.Model):
+    """رابط مستني يتبعت لـ IndexNow. الرابط مايتكررش طول ما هو مستني (نفس الدفعة)"""
+    url = models.URLField(max_length=500, verbose_name="الرابط")
+    queued_at = models.DateTimeField(auto_now_add=True, verbose_name="وقت الإضافة")
+    submission = models.ForeignKey(
+        IndexNowSubmission, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='urls', verbose_name="اتبعت في"
+    )
+
+    class Meta:
+        verbose_name = "رابط IndexNow"
+        verbose_name_plural = "روابط IndexNow"
+        ordering = ['queued_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['url'], condition=models.Q(submission__isnull=True),
+                name='unique_pending_indexnow_url',
+            ),
+        ]
+
+    def __str__(self):
+        return self.url
+
+
+class SearchDocument(models.Model):
+    """النص المطبّع لعنصر واحد بيتبحث فيه (core/search.py). عمود الـ tsvector على
+    PostgreSQL وجدول FTS5 على SQLite بيتعملوا في الـ migration بره الـ ORM"""
+    kind = models.CharField(max_length=30, verbose_name="النوع")
+    object_id = models.PositiveIntegerField(verbose_name="رقم العنصر")
+    title = models.TextField(blank=True, verbose_name="العنوان (مطبّع)")
+    body = models.TextField(blank=True, verbose_name="النص (مطبّع)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تحديث")
+
+    class Meta:
+        verbose_name = "فهرس بحث"
+        verbose_name_plural = "فهرس البحث"
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
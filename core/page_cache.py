@@ -0,0 +1,198 @@
+"""كاش الصفحة كاملة للزوار (مش مسجلين دخول) على صفحات البلوج والأسئلة.
+
+أغلب زيارات البلوج والأسئلة من زوار ومحركات بحث، فالـ HTML بيتخزن مرة
+ويتقدم للكل من غير ما الطلب يوصل للـ ORM:
+
+- المفتاح = الـ host + المسار + الـ query string بعد ترتيبها وشيل الفاضي
+  وبارامترات التتبع (utm_* وfbclid...)، فـ ?sort=latest&page=2 و
+  ?page=2&sort=latest&utm_source=x نفس الصفحة.
+- الطلب بيعدي على الـ view عادي لو مش GET/HEAD، أو المستخدم مسجل دخول،
+  أو في رسائل (messages) مستنية تتعرض.
+- النسخ متخزنة في الكاش المشترك (shared_cache، core/cache_versions.py)، فكل
+  الـ processes بتشوف نفس النسخة ونفس القفل.
+- كل صفحة مربوطة بـ namespaces من core/cache_versions.py ('blog' أو 'qna'
+  مثلاً)، ورقم إصدارها متخزن جوه النسخة. لو المحتوى اتغير (الإصدار زاد)
+  أو عدى PAGE_CACHE_TIMEOUT، النسخة بتبقى "قديمة": طلب واحد بس بياخد قفل
+  ويرسم الصفحة من جديد، والباقي بيتقدملهم القديم لحد ما يخلص
+  (stale-while-revalidate) لحد PAGE_CACHE_STALE ثانية.
+- الـ CSRF token بيترسم في النسخة المتخزنة كـ placeholder (من
+  csrf_placeholder في الـ context processors)، وبيتبدل بتوكن الزائر نفسه
+  مع كل تقديم، فالفورمات والـ AJAX شغالين من الكاش.
+- النسخة بتترسم من الطلب بعد تطبيع الـ query string (نفس المفتاح)، فالروابط
+  اللي بتتبني من الطلب (canonical وog:url...) مابتشيلش utm_ لكل اللي بعده.
+- المشاهدات اللي الـ view سجلها (core/view_counters.py) بتتخزن مع النسخة
+  وبتتعد تاني مع كل زيارة من الكاش.
+
+conditional_page بيضيف ETag لصفحات المحتوى (مقال، سؤال) من استعلام صغير
+(id + تواريخ التعديل) + أرقام إصدارات الـ namespaces، ولو المتصفح أو الـ
+crawler معاه نفس النسخة بيرجع 304 قبل ما الـ view أو كاش الصفحة يشتغلوا خالص.
+مفيش Last-Modified: الصفحة بتتغير من غير ما تاريخ تعديلها يتغير (تعليق جديد،
+مقالات ذات صلة، رقم إصدار زاد)، فـ If-Modified-Since لوحده كان هيرجع 304 غلط.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.http import Http404, HttpResponse, QueryDict
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from .cache_versions import get_version, shared_cache as cache
+from .view_counters import recorded_views, replay_views
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+PAGE_CACHE_STALE = getattr(settings, 'PAGE_CACHE_STALE', 60 * 60)
+# أقصى وقت لرسم الصفحة قبل ما طلب تاني يقدر ياخد القفل
+PAGE_CACHE_LOCK_TIMEOUT = 30
+PAGE_CACHE_PREFIX = 'page'
+
+CSRF_PLACEHOLDER = 'PAGECACHECSRFTOKENPLACEHOLDER'
+TRACKING_PARAMS = ('fbclid', 'gclid', 'yclid', 'msclkid', '_ga')
+
+
+def csrf_placeholder(request):
+    """context processor: الصفحات اللي هتتخزن بتترسم بـ placeholder بدل التوكن"""
+    if getattr(request, '_page_cache_render', False):
+        return {'csrf_token': CSRF_PLACEHOLDER}
+    return {}
+
+
+def normalized_query(request):
+    params = sorted(
+        (key, value) for key, value in parse_qsl(request.META.get('QUERY_STRING', ''))
+        if value and not key.startswith('utm_') and key not in TRACKING_PARAMS
+    )
+    return urlencode(params)
+
+
+def _normalize_request(request):
+    """الـ view بيشوف نفس الـ query اللي في المفتاح، مش اللي جه من الزائر"""
+    query = normalized_query(request)
+    request.META['QUERY_STRING'] = query
+    request.GET = QueryDict(query)
+
+
+def page_cache_key(request):
+    raw = f'{request.get_host()}{request.path}?{normalized_query(request)}'
+    return f'{PAGE_CACHE_PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # len() مابيعلّمش الرسائل إنها اتقرت، فهتتعرض عادي في الـ view
+    return not len(get_messages(request))
+
+
+def _cacheable_response(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    session = getattr(request, 'session', None)
+    return not (session is not None and session.modified)
+
+
+def _build_response(request, entry, state):
+    content = entry['content']
+    if CSRF_PLACEHOLDER.encode() in content:
+        content = content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['X-Page-Cache'] = state
+    return response
+
+
+def cache_public_page(*namespaces):
+    """decorator للـ views العامة. namespaces = أسماء ثابتة في core/cache_versions"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request)
+            versions = [get_version(namespace) for namespace in namespaces]
+            entry = cache.get(key)
+
+            lock_key = f'{key}:lock'
+            fresh = entry is not None and entry['versions'] == versions and entry['expires'] > time.time()
+            locked = not fresh and cache.add(lock_key, 1, PAGE_CACHE_LOCK_TIMEOUT)
+            if entry is not None and not locked:
+                # طازة، أو في طلب تاني بيرسمها دلوقتي: نقدم اللي عندنا
+                replay_views(request, entry['views'])
+                return _build_response(request, entry, 'hit' if fresh else 'stale')
+
+            try:
+                request._page_cache_render = True
+                _normalize_request(request)
+                response = view_func(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+
+                if not _cacheable_response(request, response):
+                    # الصفحة اتمسحت أو اتحولت: النسخة القديمة ماينفعش تتقدم تاني
+                    cache.delete(key)
+                    if CSRF_PLACEHOLDER.encode() in getattr(response, 'content', b''):
+                        response.content = response.content.replace(
+                            CSRF_PLACEHOLDER.encode(), get_token(request).encode(),
+                        )
+                    return response
+
+                entry = {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'versions': versions,
+                    'expires': time.time() + PAGE_CACHE_TIMEOUT,
+                    'views': recorded_views(request),
+                }
+                cache.set(key, entry, PAGE_CACHE_TIMEOUT + PAGE_CACHE_STALE)
+                return _build_response(request, entry, 'miss')
+            except Http404:
+                cache.delete(key)
+                raise
+            finally:
+                request._page_cache_render = False
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
+
+
+def conditional_page(metadata_func, *namespaces, counter=None):
+    """decorator للـ 304. metadata_func(request, *args, **kwargs) بترجع
+    (pk, آخر تعديل) من استعلام واحد خفيف، أو None لو الصفحة مش موجودة.
+    counter (BufferedCounter) بيسجل المشاهدة حتى لو الرد كان 304"""
+    def metadata(request, *args, **kwargs):
+        if not hasattr(request, '_page_metadata'):
+            request._page_metadata = metadata_func(request, *args, **kwargs)
+        return request._page_metadata
+
+    def etag(request, *args, **kwargs):
+        # الرسائل لازم تترسم، والـ POST مالوش 304
+        if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+            return None
+        page = metadata(request, *args, **kwargs)
+        if page is None:
+            return None
+        pk, modified = page
+        versions = [get_version(namespace) for namespace in namespaces]
+        # الصفحة فيها توكن CSRF مربوط بالكوكي، وشكلها بيختلف للمسجل دخول
+        viewer = request.user.pk if request.user.is_authenticated else 0
+        csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        raw = f'{pk}:{modified.isoformat()}:{versions}:{viewer}:{csrf_cookie}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 304 and counter is not None:
+                counter.record(request._page_metadata[0], request)
+            return response
+        return wrapper
+    return decorator
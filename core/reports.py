@@ -0,0 +1,72 @@
+"""عرض تقارير التقييم الشهري العامة (رابط ولي الأمر) من الكاش.
+
+التقييم بيتاخد snapshot وقت إنشائه وبعدها نادرًا ما بيتعدل، وولي الأمر بيفتح
+الرابط كذا مرة وبيبعته لغيره. عشان كده الـ HTML (والـ PDF لو متاح) بيتخزن في
+الكاش بمفتاح public_token، ومعاه ETag محسوب من updated_at. أي فتح متكرر بيتخدم
+من الكاش من غير ما يلمس الداتابيز أو محرك القوالب، ولو المتصفح عنده نفس النسخة
+بيرجعله 304 على طول. أي تعديل/حذف للتقييم بيمسح الكاش من core/signals.py،
+والكاش هو المشترك (shared_cache) فالمسح بيوصل لكل الـ processes.
+المسودات (is_draft) مابتتخزنش ومابتتعرضش على الرابط العام لحد ما تتعتمد.
+"""
+import hashlib
+
+from django.template.loader import render_to_string
+from django.utils.http import http_date
+
+from .cache_versions import shared_cache as cache
+
+try:
+    from weasyprint import HTML as WeasyHTML
+    HAS_WEASYPRINT = True
+except (ImportError, OSError):
+    # WeasyPrint مش ضمن requirements (ومحتاج مكتبات نظام)، فالـ PDF من السيرفر اختياري
+    HAS_WEASYPRINT = False
+
+
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+REPORT_BROWSER_MAX_AGE = 60 * 60 * 24
+
+
+def report_cache_key(token, kind='html'):
+    return f'evaluation_report:{kind}:{token}'
+
+
+def _report_etag(evaluation):
+    raw = f'{evaluation.public_token}:{evaluation.updated_at.timestamp()}'
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_cached_report(token, kind='html'):
+    return cache.get(report_cache_key(token, kind))
+
+
+def cache_evaluation_report(evaluation):
+    """بيرندر صفحة التقرير مرة واحدة ويخزنها (HTML + الـ validators بتوعه)"""
+    report = {
+        'etag': _report_etag(evaluation),
+        'last_modified': http_date(evaluation.updated_at.timestamp()),
+        'content': render_to_string('core/evaluation_public.html', {
+            'evaluation': evaluation,
+            'pdf_available': HAS_WEASYPRINT,
+        }),
+    }
+    if not evaluation.is_draft:
+        cache.set(report_cache_key(evaluation.public_token), report, REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def cache_evaluation_pdf(token, html_report):
+    """بيحول نفس الـ HTML المتخزن لـ PDF (لو WeasyPrint متسطب) ويخزنه بنفس الـ ETag"""
+    if not HAS_WEASYPRINT:
+        return None
+    report = {
+        'etag': html_report['etag'],
+        'last_modified': html_report['last_modified'],
+        'content': WeasyHTML(string=html_report['content']).write_pdf(),
+    }
+    cache.set(report_cache_key(token, 'pdf'), report, REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def invalidate_evaluation_report(token):
+    cache.delete_many([report_cache_key(token), report_cache_key(token, 'pdf')])
@@ -0,0 +1,156 @@
+"""بحث نصي مفهرس بالعربي (المقالات، وأي محتوى تاني يتسجل بنفس الطريقة).
+
+كل عنصر بيتبحث فيه ليه صف في SearchDocument فيه عنوانه ونصه بعد التطبيع
+(شيل التشكيل والتطويل، توحيد الألف والياء والتاء المربوطة، وشيل "ال" من أول
+الكلمة)، والصف ده بيتحدث مع كل حفظ. المطابقة والترتيب بيتعملوا في الداتابيز:
+
+- PostgreSQL: عمود tsvector محسوب (GENERATED) عليه GIN index، والترتيب بـ ts_rank.
+- SQLite: جدول FTS5 (core_searchdocument_fts) بيتحدث بـ triggers، والترتيب بـ bm25.
+- أي داتابيز تانية (أو SQLite من غير FTS5): icontains على النص المطبّع.
+
+الـ snippet المظلل بيتعمل في بايثون على النص الأصلي (بالتشكيل) لنتايج الصفحة
+بس، فشكله واحد على الداتابيزين.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import SearchDocument
+
+SEARCH_RESULTS_LIMIT = 500
+FTS_TABLE = 'core_searchdocument_fts'
+
+_DIACRITICS = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_CHAR_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+_WORD = re.compile(r'\w+')
+_ARTICLES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+
+
+def normalize_arabic(text):
+    """تطبيع على مستوى الحروف بس (نفس الطول تقريبًا، من غير شيل كلمات)"""
+    return _DIACRITICS.sub('', text or '').translate(_CHAR_MAP).lower()
+
+
+def _strip_article(word):
+    for article in _ARTICLES:
+        if word.startswith(article) and len(word) - len(article) >= 2:
+            return word[len(article):]
+    return word
+
+
+def search_tokens(text):
+    return [_strip_article(word) for word in _WORD.findall(normalize_arabic(text))]
+
+
+def index_text(text):
+    return ' '.join(search_tokens(text))
+
+
+# كلمات شائعة مالهاش وزن في التشابه (blog/related.py وqna/duplicates.py)، بعد التطبيع
+STOPWORDS = frozenset(search_tokens(
+    'في من على الى إلى عن مع هذا هذه ذلك تلك التي الذي الذين او أو ثم قد لا لم لن ما ماذا '
+    'كان كانت يكون هو هي هم انت أنت نحن كل بعد قبل حتى اذا إذا ان أن إن بين عند غير '
+    'لكن بل كما لقد اي أي يا و ف ب ل هل كيف لماذا متى اين أين'
+))
+
+
+def index_document(kind, object_id, title, body):
+    SearchDocument.objects.update_or_create(
+        kind=kind, object_id=object_id,
+        defaults={'title': index_text(title), 'body': index_text(body)},
+    )
+
+
+def remove_document(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def _fts5_available():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def search(kind, query, limit=SEARCH_RESULTS_LIMIT):
+    """ids العناصر اللي بتطابق كل كلمات البحث، مرتبة من الأنسب للأقل"""
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            "SELECT object_id FROM core_searchdocument "
+            "WHERE kind = %s AND search_vector @@ to_tsquery('simple', %s) "
+            "ORDER BY ts_rank(search_vector, to_tsquery('simple', %s)) DESC, object_id DESC LIMIT %s"
+        )
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        params = [kind, tsquery, tsquery, limit]
+    elif connection.vendor == 'sqlite' and _fts5_available():
+        sql = (
+            f"SELECT d.object_id FROM {FTS_TABLE} f JOIN core_searchdocument d ON d.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND d.kind = %s "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), d.object_id DESC LIMIT %s"
+        )
+        params = [' '.join(f'"{token}"*' for token in tokens), kind, limit]
+    else:
+        documents = SearchDocument.objects.filter(kind=kind)
+        for token in tokens:
+            documents = documents.filter(body__icontains=token) | documents.filter(title__icontains=token)
+        return list(documents.order_by('-object_id').values_list('object_id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _normalized_with_positions(text):
+    """النص المطبّع + مكان كل حرف فيه في النص الأصلي (التشكيل بيتشال فالأماكن بتتزحلق)"""
+    chars, positions = [], []
+    for index, char in enumerate(text):
+        normalized = normalize_arabic(char)
+        for out in normalized:
+            chars.append(out)
+            positions.append(index)
+    return ''.join(chars), positions
+
+
+def highlight(text, query, length=220):
+    """مقطع من النص حوالين أول كلمة مطابقة، والكلمات المطابقة بين <mark>"""
+    text = text or ''
+    tokens = sorted(set(search_tokens(query)), key=len, reverse=True)
+    normalized, positions = _normalized_with_positions(text)
+
+    spans = []
+    if tokens:
+        pattern = re.compile('|'.join(re.escape(token) for token in tokens))
+        for match in pattern.finditer(normalized):
+            start = positions[match.start()]
+            end = positions[match.end() - 1] + 1
+            # التشكيل اللي بعد آخر حرف تبع الكلمة برضه
+            while end < len(text) and _DIACRITICS.match(text[end]):
+                end += 1
+            spans.append((start, end))
+
+    if spans:
+        window_start = max(0, spans[0][0] - length // 3)
+    else:
+        window_start = 0
+    window_end = min(len(text), window_start + length)
+
+    parts = ['…' if window_start else '']
+    cursor = window_start
+    for start, end in spans:
+        if start < cursor or start >= window_end:
+            continue
+        parts.append(escape(text[cursor:start]))
+        parts.append(f'<mark>{escape(text[start:end])}</mark>')
+        cursor = end
+    parts.append(escape(text[cursor:window_end]))
+    if window_end < len(text):
+        parts.append('…')
+    return mark_safe(''.join(parts))
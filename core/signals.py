@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import MonthlyEvaluation
+from .reports import invalidate_evaluation_report
+
+
+@receiver(post_save, sender=MonthlyEvaluation)
+@receiver(post_delete, sender=MonthlyEvaluation)
+def clear_evaluation_report_cache(sender, instance, **kwargs):
+    """أي تعديل أو حذف للتقييم يمسح نسخته المتخزنة عشان الرابط العام يعرض الجديد"""
+    invalidate_evaluation_report(instance.public_token)
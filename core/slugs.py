@@ -0,0 +1,49 @@
+"""توليد slug فريد بعدد استعلامات ثابت (للمقالات والأسئلة).
+
+بدل لف filter(slug=...).exists() مع عداد بيزيد (استعلام لكل رقم متاخد)،
+unique_slug بيجيب كل الـ slugs اللي بتبدأ بنفس البداية في استعلام واحد
+ويختار أول رقم فاضي في بايثون. ولو طلبين خدوا نفس الرقم في نفس اللحظة،
+save_with_unique_slug بيمسك الـ IntegrityError ويعيد الاختيار والحفظ.
+"""
+from django.db import IntegrityError, transaction
+
+# مساحة محجوزة في آخر الـ slug للاحقة "-N"
+SUFFIX_ROOM = 6
+SLUG_SAVE_ATTEMPTS = 3
+
+
+def unique_slug(instance, base, field='slug'):
+    """أول slug فاضي من base و base-1 و base-2 ... (استعلام واحد)"""
+    model = type(instance)
+    max_length = model._meta.get_field(field).max_length
+    stem = base[:max_length]
+
+    taken = model._base_manager.filter(**{f'{field}__startswith': stem[:max_length - SUFFIX_ROOM]})
+    if instance.pk is not None:
+        taken = taken.exclude(pk=instance.pk)
+    taken = set(taken.values_list(field, flat=True))
+
+    if stem not in taken:
+        return stem
+    counter = 1
+    while True:
+        suffix = f'-{counter}'
+        candidate = f'{stem[:max_length - len(suffix)]}{suffix}'
+        if candidate not in taken:
+            return candidate
+        counter += 1
+
+
+def save_with_unique_slug(instance, base, save, field='slug'):
+    """بيحط slug فريد ويشغّل save()، ولو حد سبقنا على نفس الـ slug بيعيد المحاولة"""
+    for attempt in range(SLUG_SAVE_ATTEMPTS):
+        setattr(instance, field, unique_slug(instance, base, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            slug_taken = type(instance)._base_manager.filter(
+                **{field: getattr(instance, field)}
+            ).exclude(pk=instance.pk).exists()
+            if not slug_taken or attempt == SLUG_SAVE_ATTEMPTS - 1:
+                raise
@@ -0,0 +1,78 @@
+"""tags بتطلع <picture> متجاوبة (srcset + sizes + width/height + loading=lazy).
+
+- responsive_image: صورة ثابتة من static/ ونسخها في الـ manifest (core/images.py).
+- post_image: صورة مقال/معرض من النسخ اللي اتعملت وقت الرفع على كلاود (image_variants).
+
+الاستخدام:
+    {% load responsive_images %}
+    {% responsive_image 'images/review1.jpeg' alt='رأي طالب' sizes='(max-width: 600px) 100vw, 300px' %}
+    {% post_image post alt=post.title sizes='(max-width: 900px) 100vw, 400px' css_class='post-image' %}
+"""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.images import load_manifest
+
+register = template.Library()
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for width, url in sorted(urls, key=lambda item: int(item[0])))
+
+
+def _render(src, alt, sizes, css_class, loading, width=None, height=None,
+            webp_srcset='', srcset='', attrs=None):
+    if not (width and height):
+        width = height = None
+    attributes = {
+        'src': src,
+        'srcset': srcset,
+        'sizes': sizes if (srcset or webp_srcset) else '',
+        'alt': alt,
+        'class': css_class,
+        'width': width or '',
+        'height': height or '',
+        'loading': loading,
+        'decoding': 'async',
+        **(attrs or {}),
+    }
+    img = format_html(
+        '<img{}>',
+        format_html_join('', ' {}="{}"', ((key, value) for key, value in attributes.items() if value != '')),
+    )
+    if not webp_srcset:
+        return img
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>', webp_srcset, sizes, img,
+    )
+
+
+@register.simple_tag
+def responsive_image(name, alt='', sizes='100vw', css_class='', loading='lazy', **attrs):
+    """صورة ثابتة: لو مش في الـ manifest (لسه build_responsive_images ماتشغلش) بترجع الأصل"""
+    entry = load_manifest().get(name)
+    if not entry:
+        return _render(static(name), alt, sizes, css_class, loading, attrs=attrs)
+
+    jpeg = [(width, static(path)) for width, path in entry['jpeg'].items()]
+    webp = [(width, static(path)) for width, path in entry['webp'].items()]
+    # الـ src الاحتياطي = أكبر نسخة JPEG (مش الأصل) للمتصفحات اللي مابتفهمش srcset
+    fallback = max(jpeg, key=lambda item: int(item[0]))[1] if jpeg else static(name)
+    return _render(
+        fallback, alt, sizes, css_class, loading, entry['width'], entry['height'],
+        webp_srcset=_srcset(webp), srcset=_srcset(jpeg), attrs=attrs,
+    )
+
+
+@register.simple_tag
+def post_image(obj, alt='', sizes='100vw', css_class='', loading='lazy', width=800, **attrs):
+    """صورة Post أو PostImage. width = المقاس اللي يتحط في src للمتصفحات القديمة"""
+    variants = obj.image_variants or {}
+    sized = [(key, url) for key, url in variants.items() if key.isdigit()]
+    webp = list((variants.get('webp') or {}).items())
+    src = variants.get(str(width)) or obj.display_url
+    return _render(
+        src, alt, sizes, css_class, loading, obj.image_width, obj.image_height,
+        webp_srcset=_srcset(webp), srcset=_srcset(sized), attrs=attrs,
+    )
@@ -1,3 +1,336 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from . import deletion, jobs
+from .cache_versions import bump_version
+from .deletion import DELETION_STALE_AFTER, run_deletion_task, run_deletion_task_by_id, schedule_deletion
+from .jobs import (
+    JOB_RETENTION, STALE_LOCK_TIMEOUT, claim_jobs, enqueue, enqueue_unique, prune_finished_jobs,
+    release_stale_jobs, run_job,
+)
+from .models import Country, DeletionTask, Job, Lesson, Payment, Student, StudentNote, Teacher
+from .page_cache import CSRF_PLACEHOLDER, cache_public_page, conditional_page
+from .timeline import CURSOR_SALT, build_student_timeline, decode_cursor, encode_cursor
+
+
+def _failing_handler(**payload):
+    raise RuntimeError('boom')
+
+
+def _noop_handler(**payload):
+    pass
+
+
+TEST_JOB_KINDS = {
+    'test.busy': ('core.tests._noop_handler', 1, 3),
+    'test.other': ('core.tests._noop_handler', 2, 3),
+    'test.failing': ('core.tests._failing_handler', 1, 2),
+}
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+@mock.patch.dict(jobs.JOB_KINDS, TEST_JOB_KINDS, clear=True)
+class JobQueueTests(TestCase):
+    """طابور الشغلانات (core/jobs.py): المسك بحد كل نوع، الإعادة، والتنضيف"""
+
+    def _make_ready(self):
+        Job.objects.update(run_after=timezone.now() - timedelta(minutes=1))
+
+    def test_claim_respects_per_kind_limit(self):
+        for _ in range(5):
+            enqueue('test.busy')
+        self._make_ready()
+        claimed = claim_jobs(limit=10, worker='w1')
+        self.assertEqual([job.kind for job in claimed], ['test.busy'])
+        self.assertEqual(claim_jobs(limit=10, worker='w2'), [])
+        self.assertEqual(Job.objects.get(pk=claimed[0].pk).locked_by, 'w1')
+
+    def test_saturated_kind_does_not_starve_others(self):
+        for _ in range(30):
+            enqueue('test.busy')
+        self._make_ready()
+        enqueue('test.other')
+        enqueue('test.other')
+        kinds = sorted(job.kind for job in claim_jobs(limit=3, worker='w'))
+        self.assertEqual(kinds, ['test.busy', 'test.other', 'test.other'])
+
+    def test_claim_skips_future_jobs(self):
+        enqueue('test.other', delay=timedelta(hours=1))
+        self.assertEqual(claim_jobs(worker='w'), [])
+
+    def test_enqueue_unique_skips_duplicate_payload(self):
+        self.assertIsNotNone(enqueue_unique('test.other', post_id=1))
+        self.assertIsNone(enqueue_unique('test.other', post_id=1))
+        self.assertIsNotNone(enqueue_unique('test.other', post_id=2))
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        enqueue('test.failing', answer=1)
+        self._make_ready()
+        [job] = claim_jobs(worker='w')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        self._make_ready()
+        [job] = claim_jobs(worker='w')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_success_marks_done(self):
+        enqueue('test.other')
+        self._make_ready()
+        [job] = claim_jobs(worker='w')
+        self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.locked_by, '')
+
+    def test_release_stale_jobs(self):
+        enqueue('test.busy')
+        self._make_ready()
+        [job] = claim_jobs(worker='w')
+        self.assertEqual(release_stale_jobs(), 0)
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - STALE_LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(release_stale_jobs(), 1)
+        self.assertEqual(len(claim_jobs(worker='w2')), 1)
+
+    def test_prune_finished_jobs(self):
+        for _ in range(3):
+            enqueue('test.other')
+        old = timezone.now() - JOB_RETENTION - timedelta(minutes=1)
+        Job.objects.update(status='done', finished_at=old)
+        recent = Job.objects.first()
+        Job.objects.filter(pk=recent.pk).update(finished_at=timezone.now())
+        queued = enqueue('test.other')
+        self.assertEqual(prune_finished_jobs(), 2)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, queued.pk})
+
+
+class StudentTimelineTests(TestCase):
+    """الخط الزمني بالـ keyset cursor (core/timeline.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = Teacher.objects.create(name='T')
+        cls.student = Student.objects.create(name='S', teacher=teacher, country=Country.objects.create(name='مصر'))
+        now = timezone.now()
+        for i in range(7):
+            StudentNote.objects.create(student=cls.student, note_text=f'note {i}')
+            Payment.objects.create(student=cls.student, amount=10, date=date.today() - timedelta(days=i))
+            # حلقتين بنفس الوقت بالظبط عشان الترتيب بالـ pk يتختبر
+            Lesson.objects.create(student=cls.student, teacher=teacher, scheduled_at=now - timedelta(days=i))
+            Lesson.objects.create(student=cls.student, teacher=teacher, scheduled_at=now - timedelta(days=i))
+
+    def _walk(self, page_size):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = build_student_timeline(self.student, cursor=cursor, page_size=page_size)
+            seen += [(entry.kind, entry.obj.pk) for entry in page]
+            pages += 1
+            if cursor is None:
+                return seen, pages
+
+    def test_pages_cover_every_entry_once_in_order(self):
+        seen, pages = self._walk(page_size=5)
+        self.assertEqual(len(seen), 28)
+        self.assertEqual(len(set(seen)), 28)
+        self.assertEqual(pages, 6)
+
+        full, _ = build_student_timeline(self.student, page_size=100)
+        self.assertEqual(seen, [(entry.kind, entry.obj.pk) for entry in full])
+        keys = [entry.sort_key() for entry in full]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_cursor_is_signed(self):
+        _, cursor = build_student_timeline(self.student, page_size=5)
+        positions = decode_cursor(cursor)
+        self.assertTrue(positions)
+
+        forged = signing.dumps({'lesson': ['2000-01-01T00:00:00+00:00', 1]}, salt='other-salt', compress=True)
+        self.assertEqual(decode_cursor(forged), {})
+        self.assertEqual(decode_cursor(cursor[:-2] + 'xx'), {})
+        self.assertEqual(decode_cursor('garbage'), {})
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        first, _ = build_student_timeline(self.student, page_size=5)
+        page, _ = build_student_timeline(self.student, cursor='garbage', page_size=5)
+        self.assertEqual([entry.obj.pk for entry in page], [entry.obj.pk for entry in first])
+
+    def test_malformed_positions_are_ignored(self):
+        cursor = signing.dumps({'lesson': 'not-a-pair'}, salt=CURSOR_SALT, compress=True)
+        self.assertEqual(decode_cursor(cursor), {})
+        self.assertEqual(decode_cursor(encode_cursor({'note': ['2024-01-01T00:00:00+00:00', '5']})),
+                         {'note': ('2024-01-01T00:00:00+00:00', 5)})
+
+
+class ChunkedDeletionTests(TestCase):
+    """الحذف على دفعات في الخلفية (core/deletion.py)"""
+
+    def setUp(self):
+        self.teacher = Teacher.objects.create(name='T')
+        self.country = Country.objects.create(name='مصر')
+        self.other = Country.objects.create(name='السعودية')
+        for i in range(5):
+            student = Student.objects.create(name=f'S{i}', teacher=self.teacher, country=self.country)
+            for day in range(3):
+                Lesson.objects.create(student=student, teacher=self.teacher, scheduled_at=timezone.now() + timedelta(days=day))
+            Payment.objects.create(student=student, amount=10)
+        self.kept = Student.objects.create(name='K', teacher=self.teacher, country=self.other)
+        Lesson.objects.create(student=self.kept, teacher=self.teacher, scheduled_at=timezone.now())
+
+    def test_schedule_hides_immediately(self):
+        task = schedule_deletion(self.country)
+        self.assertEqual(task.status, 'pending')
+        self.assertFalse(Country.objects.filter(pk=self.country.pk).exists())
+        self.assertTrue(Country.all_objects.filter(pk=self.country.pk).exists())
+        self.assertEqual(Student.objects.filter(country=self.country).count(), 0)
+
+    def test_deletes_subtree_in_chunks(self):
+        task = schedule_deletion(self.country)
+        self.assertTrue(run_deletion_task(task, chunk_size=2))
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'done')
+        self.assertEqual(task.deleted_rows, 1 + 5 + 15 + 5)
+        self.assertFalse(Country.all_objects.filter(pk=self.country.pk).exists())
+        self.assertEqual(Lesson.objects.count(), 1)
+        self.assertTrue(Student.objects.filter(pk=self.kept.pk).exists())
+        # مرة تانية مابتعملش حاجة
+        self.assertFalse(run_deletion_task(task))
+
+    def test_failed_task_resumes_where_it_stopped(self):
+        task = schedule_deletion(self.country)
+        chunks = deletion._chunked_pks
+        calls = []
+
+        def flaky(queryset, chunk_size):
+            for pks in chunks(queryset, chunk_size):
+                calls.append(pks)
+                if len(calls) == 3:
+                    raise RuntimeError('connection lost')
+                yield pks
+
+        with mock.patch.object(deletion, '_chunked_pks', flaky):
+            with self.assertRaises(RuntimeError):
+                run_deletion_task(task, chunk_size=2)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        partial = task.deleted_rows
+        self.assertGreater(partial, 0)
+
+        run_deletion_task_by_id(task.pk)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'done')
+        self.assertEqual(task.deleted_rows, 1 + 5 + 15 + 5)
+        self.assertFalse(Country.all_objects.filter(pk=self.country.pk).exists())
+
+    def test_stale_running_task_is_reclaimed(self):
+        task = schedule_deletion(self.country)
+        DeletionTask.objects.filter(pk=task.pk).update(status='running', progress_at=timezone.now())
+        self.assertFalse(run_deletion_task(task))
+
+        DeletionTask.objects.filter(pk=task.pk).update(
+            progress_at=timezone.now() - DELETION_STALE_AFTER - timedelta(seconds=1)
+        )
+        self.assertTrue(run_deletion_task(task))
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'done')
+
+
+class PageCacheTests(TestCase):
+    """كاش الصفحة كاملة للزوار (core/page_cache.py)"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.renders = []
+
+        @cache_public_page('blog')
+        def view(request):
+            self.renders.append(request.GET.urlencode())
+            return HttpResponse(f'page {request.get_full_path()} {CSRF_PLACEHOLDER}')
+        self.view = view
+
+    def _get(self, path, user=None):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        return self.view(request)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self._get('/posts/?page=2')['X-Page-Cache'], 'miss')
+        response = self._get('/posts/?page=2')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(len(self.renders), 1)
+        # كل زائر بياخد توكن CSRF بتاعه مكان الـ placeholder
+        self.assertNotIn(CSRF_PLACEHOLDER.encode(), response.content)
+
+    def test_tracking_params_share_the_entry(self):
+        self._get('/posts/?sort=latest&page=2&utm_source=x&fbclid=y')
+        response = self._get('/posts/?page=2&sort=latest&empty=')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(self.renders, ['page=2&sort=latest'])
+        self.assertNotIn(b'utm_', response.content)
+        self.assertNotIn(b'fbclid', response.content)
+
+    def test_logged_in_users_bypass_the_cache(self):
+        user = get_user_model().objects.create_user(username='u', password='x')
+        self._get('/posts/')
+        response = self._get('/posts/', user=user)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(len(self.renders), 2)
+
+    def test_version_bump_makes_the_entry_stale(self):
+        self._get('/posts/')
+        bump_version('blog')
+        self.assertEqual(self._get('/posts/')['X-Page-Cache'], 'miss')
+        self.assertEqual(len(self.renders), 2)
+
+
+class ConditionalPageTests(TestCase):
+    """الـ 304 بالـ ETag لصفحات المحتوى (core/page_cache.py)"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.modified = timezone.now()
+
+        @conditional_page(lambda request, pk: (pk, self.modified), 'blog')
+        def view(request, pk):
+            return HttpResponse(f'post {pk}')
+        self.view = view
+
+    def _get(self, **headers):
+        request = self.factory.get('/post/1/', **headers)
+        request.user = AnonymousUser()
+        request.COOKIES['csrftoken'] = 'abc'
+        return self.view(request, pk=1)
+
+    def test_matching_etag_returns_304(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        bump_version('blog')
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since_alone_is_ignored(self):
+        response = self._get(HTTP_IF_MODIFIED_SINCE='Sun, 01 Jan 2090 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_the_csrf_cookie(self):
+        etag = self._get()['ETag']
+        request = self.factory.get('/post/1/', HTTP_IF_NONE_MATCH=etag)
+        request.user = AnonymousUser()
+        request.COOKIES['csrftoken'] = 'other'
+        self.assertEqual(self.view(request, pk=1).status_code, 200)
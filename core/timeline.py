@@ -0,0 +1,106 @@
+"""الخط الزمني الموحد لملف الطالب (ملاحظات + دفعات + حلقات + تقييمات).
+
+بدل ما صفحة الطالب تحمّل كل الملاحظات وكل الدفعات مرة واحدة، كل مصدر بيتقري
+بـ keyset query مستقلة (أحدث N عنصر بعد آخر عنصر اتعرض من المصدر ده بالذات)،
+وبعدين بندمج النتايج في ترتيب واحد بـ heapq.merge. موقع كل مصدر بيتحفظ في
+cursor واحد موقّع بيتبعت في الرابط، فكل صفحة = استعلام واحد لكل مصدر بس مهما
+كان عمر الطالب في المنصة.
+"""
+import heapq
+from datetime import datetime, time
+
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+
+TIMELINE_PAGE_SIZE = 20
+CURSOR_SALT = 'core.student_timeline'
+
+# (نوع العنصر، اسم الـ related_name على Student، حقل الترتيب)
+# الترتيب هنا بيفصل بين العناصر اللي ليها نفس الوقت بالظبط
+TIMELINE_SOURCES = (
+    ('note', 'notes_timeline', 'created_at'),
+    ('payment', 'payments', 'date'),
+    ('lesson', 'lessons', 'scheduled_at'),
+    ('evaluation', 'evaluations', 'created_at'),
+)
+
+
+class TimelineEntry:
+    __slots__ = ('kind', 'obj', 'timestamp', 'rank')
+
+    def __init__(self, kind, obj, timestamp, rank):
+        self.kind = kind
+        self.obj = obj
+        self.timestamp = timestamp
+        self.rank = rank
+
+    def sort_key(self):
+        return (self.timestamp, self.rank, self.obj.pk)
+
+
+def _as_datetime(value):
+    """الدفعات متسجلة بتاريخ بس (DateField)، فبنحولها لبداية اليوم عشان تتقارن مع الباقي"""
+    if isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def _serialize(value):
+    return value.isoformat()
+
+
+def encode_cursor(positions):
+    return signing.dumps(positions, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(raw):
+    """cursor بايظ أو متلاعب فيه = نرجع لأول صفحة بدل ما الصفحة تقع"""
+    if not raw:
+        return {}
+    try:
+        positions = signing.loads(raw, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return {}
+    try:
+        return {kind: (str(value), int(pk)) for kind, (value, pk) in positions.items()}
+    except (TypeError, ValueError, AttributeError):
+        return {}
+
+
+def _source_rows(student, related_name, field, position, limit):
+    qs = getattr(student, related_name).all()
+    if position is not None:
+        raw_value, pk = position
+        # القيمة متخزنة في الـ cursor كنص ISO، والحقل نفسه بيرجعها لنوعها (date أو datetime)
+        value = qs.model._meta.get_field(field).to_python(raw_value)
+        qs = qs.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    return list(qs.order_by(f'-{field}', '-pk')[:limit])
+
+
+def build_student_timeline(student, cursor=None, page_size=TIMELINE_PAGE_SIZE):
+    """بيرجع (العناصر، cursor الصفحة اللي بعدها أو None لو مفيش أقدم)"""
+    positions = decode_cursor(cursor)
+
+    streams = []
+    for rank, (kind, related_name, field) in enumerate(TIMELINE_SOURCES):
+        rows = _source_rows(student, related_name, field, positions.get(kind), page_size + 1)
+        streams.append([
+            TimelineEntry(kind, row, _as_datetime(getattr(row, field)), rank)
+            for row in rows
+        ])
+
+    merged = list(heapq.merge(*streams, key=TimelineEntry.sort_key, reverse=True))
+    page = merged[:page_size]
+
+    if len(merged) <= page_size:
+        return page, None
+
+    # كل مصدر بيكمل من بعد آخر عنصر ظهر منه فعلاً في الصفحة دي
+    next_positions = {kind: [value, pk] for kind, (value, pk) in positions.items()}
+    fields = {kind: field for kind, _, field in TIMELINE_SOURCES}
+    for entry in page:
+        next_positions[entry.kind] = [_serialize(getattr(entry.obj, fields[entry.kind])), entry.obj.pk]
+
+    return page, encode_cursor(next_positions)
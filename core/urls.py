@@ -85,7 +85,12 @@ urlpatterns = [
     # نموذج تقييم ومتابعة الأداء الشهري
     path('evaluations/', views.evaluations_list, name='evaluations_list'),
     path('add-evaluation/', views.add_evaluation, name='add_evaluation'),
+    path('evaluations/batch/', views.batch_evaluations, name='batch_evaluations'),
+    path('evaluations/export/', views.export_evaluations_zip, name='export_evaluations_zip'),
     path('evaluation/<int:evaluation_id>/', views.evaluation_detail, name='evaluation_detail'),
+    path('evaluations/finalize/', views.finalize_month_evaluations, name='finalize_month_evaluations'),
+    path('evaluation/<int:evaluation_id>/finalize/', views.finalize_evaluation, name='finalize_evaluation'),
     path('evaluation/<int:evaluation_id>/delete/', views.delete_evaluation, name='delete_evaluation'),
     path('report/<uuid:token>/', views.public_evaluation, name='public_evaluation'),
+    path('report/<uuid:token>/pdf/', views.public_evaluation_pdf, name='public_evaluation_pdf'),
 ]
@@ -0,0 +1,252 @@
+"""عدادات المشاهدات المؤجلة (buffered view counters).
+
+بدل ما كل فتح لصفحة يعمل save() كامل على الصف (ومعاه الـ signals وأي
+كاش/IndexNow مربوط بيها)، المشاهدة بتتزود في الكاش بس (cache.incr)، وكل
+فترة الأرقام المتجمعة بتتنقل للداتابيز في UPDATE واحد بـ F() + Case/When
+من غير ما تعدي على save() أو الـ signals.
+
+النقل بيحصل من حتتين:
+  - thread خلفي في كل process كل VIEW_COUNTER_FLUSH_INTERVAL ثانية (ضروري
+    مع LocMemCache لأن كل process ليه كاش لوحده). بيعدي بس على الـ pks اللي
+    اتشافت في الـ process ده من آخر نقل (الـ dirty set)، مش على الجدول كله.
+  - أمر flush_view_counts (cron) لو الكاش مشترك (Redis)، وده بيلف على كل
+    الصفوف عشان يلم اللي process وقع قبل ما ينقله. على LocMemCache بيرفض
+    يشتغل لأنه هيشوف كاش فاضي بتاعه هو.
+
+كل عداد بيتمسك (claim) قبل ما يتكتب: decr بنفس الرقم اللي اتقرا، ولو الناتج
+طلع سالب يبقى flush تاني سبقنا (process تاني مع كاش مشترك) فبنرجع الفرق ونكتب
+اللي مسكناه بس، فالمشاهدة مابتتعدش مرتين ولا بتضيع. ده محتاج كاش الـ decr فيه
+atomic وبينزل تحت الصفر (LocMem وRedis، مش Memcached).
+
+زيارات البوتات (محركات البحث، معاينات الروابط، السكربتات) مابتتعدش، وطلبات
+HEAD كمان، عشان الرقم يبقى زوار حقيقيين بس.
+"""
+import atexit
+import logging
+import re
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, When
+
+logger = logging.getLogger(__name__)
+
+COUNTER_KEY_PREFIX = 'viewcount'
+
+BOT_USER_AGENT_RE = re.compile(
+    r'bot|crawl|spider|slurp|mediapartners|facebookexternalhit|whatsapp|telegram|preview|'
+    r'headless|lighthouse|pingdom|uptime|monitor|curl|wget|python-|java/|go-http|okhttp|scrapy',
+    re.IGNORECASE,
+)
+
+
+def is_bot(request):
+    """User-Agent فاضي أو معروف إنه بوت"""
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    return not user_agent or bool(BOT_USER_AGENT_RE.search(user_agent))
+
+
+def _counter_cache():
+    return caches[getattr(settings, 'VIEW_COUNTER_CACHE', 'default')]
+
+
+def is_shared_cache():
+    """الكاش اللي فيه العدادات بيتشاف من كل الـ processes؟"""
+    return not isinstance(_counter_cache(), LocMemCache)
+
+
+class BufferedCounter:
+    """عداد لحقل رقمي واحد في موديل واحد (مثلاً blog.Post.views_count)"""
+
+    # أقصى عدد مفاتيح في get_many واحد لما flush بيلف على الجدول كله
+    SCAN_CHUNK_SIZE = 1000
+
+    def __init__(self, model_label, field='views_count'):
+        self.model_label = model_label
+        self.field = field
+        # الـ pks اللي ليها مشاهدات مستنية في الـ process ده
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def key(self, pk):
+        return f'{COUNTER_KEY_PREFIX}:{self.model_label}:{self.field}:{pk}'
+
+    def hit(self, pk, amount=1):
+        """بيزود العداد في الكاش بس، من غير أي كتابة في الداتابيز"""
+        cache = _counter_cache()
+        key = self.key(pk)
+        if not cache.add(key, amount, timeout=None):
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                # المفتاح اتمسح بين add و incr (flush أو eviction)
+                cache.add(key, amount, timeout=None)
+        with self._dirty_lock:
+            self._dirty.add(pk)
+        _ensure_flusher()
+
+    def record(self, pk, request=None):
+        """مشاهدة جاية من طلب: بتتعد لو GET ومن غير بوت. بيرجع اللي لسه في الكاش
+        عشان يتزود على الرقم المتسجل في الصفحة (من غير أي كتابة في الداتابيز)"""
+        if request is not None:
+            # كاش الصفحات (core/page_cache.py) بيعيد تسجيلها مع كل زيارة من الكاش
+            request.__dict__.setdefault('_recorded_views', []).append((self.model_label, self.field, pk))
+        if request is None or (request.method == 'GET' and not is_bot(request)):
+            self.hit(pk)
+        return self.pending(pk)
+
+    def pending(self, pk):
+        """المشاهدات اللي لسه في الكاش ومااتنقلتش للداتابيز. العداد ممكن ينزل
+        تحت الصفر لحظيًا وflush بيمسك (_claim)، والصفحة مابتعرضش رقم أقل من المتخزن"""
+        return max(_counter_cache().get(self.key(pk)) or 0, 0)
+
+    def _take_dirty(self):
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def _mark_dirty(self, pks):
+        with self._dirty_lock:
+            self._dirty.update(pks)
+
+    def _claim(self, cache, pk, value):
+        """بيطرح value من العداد ويرجع اللي اتمسك فعلًا (ممكن أقل لو flush تاني
+        سبقنا) واللي فاضل بعده"""
+        key = self.key(pk)
+        try:
+            remaining = cache.decr(key, value)
+        except ValueError:
+            return 0, 0
+        # قبل الـ decr كان فيه remaining + value
+        claimed = min(value, max(remaining + value, 0))
+        if claimed < value:
+            remaining = cache.incr(key, value - claimed)
+        return claimed, remaining
+
+    def flush(self, pks=None):
+        """بينقل المتجمع للـ pks اللي في الـ dirty set (أو pks لو اتبعتت) في
+        UPDATE واحد. بيرجع عدد الصفوف"""
+        if pks is None:
+            pks = self._take_dirty()
+        pks = list(pks)
+        if not pks:
+            return 0
+
+        cache = _counter_cache()
+        values = cache.get_many([self.key(pk) for pk in pks])
+        deltas, leftover = {}, set()
+        for pk in pks:
+            value = values.get(self.key(pk)) or 0
+            if value <= 0:
+                continue
+            claimed, remaining = self._claim(cache, pk, value)
+            if claimed:
+                deltas[pk] = claimed
+            if remaining > 0:
+                # مشاهدات جت بين القراية والمسك: تتنقل المرة الجاية
+                leftover.add(pk)
+        self._mark_dirty(leftover)
+        if not deltas:
+            return 0
+
+        model = self.model
+        try:
+            with transaction.atomic():
+                model._base_manager.filter(pk__in=deltas).update(**{
+                    self.field: Case(
+                        *[When(pk=pk, then=F(self.field) + delta) for pk, delta in deltas.items()],
+                        default=F(self.field),
+                        output_field=model._meta.get_field(self.field),
+                    )
+                })
+        except Exception:
+            # الكتابة فشلت: اللي اتمسك يرجع للكاش عشان مايضيعش
+            for pk, delta in deltas.items():
+                self.hit(pk, delta)
+            raise
+        return len(deltas)
+
+    def flush_table(self):
+        """بيلف على كل صفوف الجدول (للأمر مع كاش مشترك بس)"""
+        flushed = 0
+        pks = self.model._base_manager.order_by('pk').values_list('pk', flat=True)
+        chunk = []
+        for pk in pks.iterator(chunk_size=self.SCAN_CHUNK_SIZE):
+            chunk.append(pk)
+            if len(chunk) >= self.SCAN_CHUNK_SIZE:
+                flushed += self.flush(chunk)
+                chunk = []
+        return flushed + self.flush(chunk)
+
+
+post_views = BufferedCounter('blog.Post')
+question_views = BufferedCounter('qna.PublicQuestion', 'view_count')
+
+COUNTERS = [post_views, question_views]
+
+
+def recorded_views(request):
+    """(model, field, pk) لكل مشاهدة اتسجلت في الطلب ده"""
+    return list(getattr(request, '_recorded_views', []))
+
+
+def replay_views(request, views):
+    """بيسجل نفس المشاهدات لطلب اتقدم من كاش الصفحات"""
+    counters = {(counter.model_label, counter.field): counter for counter in COUNTERS}
+    for model_label, field, pk in views:
+        counter = counters.get((model_label, field))
+        if counter is not None:
+            counter.record(pk, request)
+
+
+def flush_all(scan=False):
+    """scan=True: كل صفوف الجداول بدل الـ dirty sets (كاش مشترك بس)"""
+    flushed = 0
+    for counter in COUNTERS:
+        try:
+            flushed += counter.flush_table() if scan else counter.flush()
+        except Exception:
+            logger.exception('فشل نقل عداد %s', counter.model_label)
+    return flushed
+
+
+_flusher_lock = threading.Lock()
+_flusher = None
+
+
+def _flush_loop(interval, stop_event):
+    # الـ thread ده مش request، فمحدش بيقفل اتصاله بالداتابيز غيره: اتصال
+    # اتقطع أو عدى عليه CONN_MAX_AGE كان هيفضل يفشل كل مرة لحد ما الـ process يموت
+    while not stop_event.wait(interval):
+        close_old_connections()
+        try:
+            flush_all()
+        except Exception:
+            logger.exception('فشل نقل عدادات المشاهدات')
+            connection.close()
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher():
+    """بيشغل thread النقل مرة واحدة لكل process (أول مشاهدة بس)"""
+    global _flusher
+    interval = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 60)
+    if _flusher is not None or not interval:
+        return
+    with _flusher_lock:
+        if _flusher is not None:
+            return
+        stop_event = threading.Event()
+        thread = threading.Thread(target=_flush_loop, args=(interval, stop_event), name='view-counter-flush', daemon=True)
+        thread.start()
+        _flusher = (thread, stop_event)
+        atexit.register(flush_all)
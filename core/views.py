@@ -10,16 +10,29 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 from django.contrib.auth.hashers import make_password
-from django.db.models import Q, Sum
+from django.core.exceptions import ValidationError
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import parse_http_date_safe
+from django.views.decorators.http import require_safe
 from functools import wraps
+from urllib.parse import quote, urlencode
 import json
 import calendar
 import secrets
 
 from .models import (
     Teacher, Student, Country, StudentNote, Expense, Payment, TeacherSalaryRecord, MonthlyEvaluation,
-    Lesson, ScheduleRequest, TeacherComplaint,
+    Lesson, ScheduleRequest, TeacherComplaint, LessonMonthlyAggregate,
 )
+from .deletion import schedule_deletion
+from .evaluations import create_draft_evaluations, finalize_evaluations, stream_evaluations_zip
+from .reports import (
+    HAS_WEASYPRINT, REPORT_BROWSER_MAX_AGE, cache_evaluation_pdf, cache_evaluation_report, get_cached_report,
+)
+from .timeline import build_student_timeline
 
 
 def teacher_login_required(view_func):
@@ -46,11 +59,22 @@ ARABIC_MONTHS = {
 # صفحات الموقع العامة
 # =======================
 def home(request):
+    # الصور بتتعرض بـ {% responsive_image %} من النسخ المتجاوبة (build_responsive_images)
     reviews = [
-        'review1.jpeg', 'review2.jpeg', 'review3.jpeg', 'review4.jpeg',
-        'review5.jpeg', 'review6.jpeg', 'review7.jpeg', 'review8.jpeg',
-        'review9.jpeg', 'review10.jpeg', 'review11.jpeg', 'review12.jpeg',
-        'review13.jpeg', 'review14.jpeg'
+        ('images/review1.jpeg', 'رأي طالب عن تجربته في تحفيظ القرآن'),
+        ('images/review2.jpeg', 'تقييم ولي أمر لجودة التعليم'),
+        ('images/review3.jpeg', 'شهادة طالبة عن تحسن مستواها'),
+        ('images/review4.jpeg', 'رأي إيجابي عن المعلمات'),
+        ('images/review5.jpeg', 'تجربة ناجحة في التحفيظ'),
+        ('images/review6.jpeg', 'تقييم خمس نجوم'),
+        ('images/review7.jpeg', 'شكر من ولي أمر'),
+        ('images/review8.jpeg', 'رأي عن المواعيد المرنة'),
+        ('images/review9.jpeg', 'تجربة في تصحيح التلاوة'),
+        ('images/review10.jpeg', 'تقييم الدعم الفني'),
+        ('images/review11.jpeg', 'فعالية البرامج التعليمية'),
+        ('images/review12.jpeg', 'تطور سريع للطالب'),
+        ('images/review13.jpeg', 'رأي ولي أمر عن متابعة المعلمة'),
+        ('images/review14.jpeg', 'تقييم طالب لحلقات التجويد'),
     ]
     return render(request, 'core/home.html', {'reviews': reviews})
 
@@ -316,9 +340,24 @@ def edit_student(request, student_id):
 # =======================
 # ملف طالب فردي + سجل الملاحظات
 # =======================
+def _with_completed_lessons(students):
+    """عدد الحلقات المكتملة (الحالية + المؤرشفة) في نفس الاستعلام بدل استعلامين لكل
+    طالب من lessons_progress_label (Student.lessons_completed_count بيقرا completed_lessons)"""
+    archived_completed = LessonMonthlyAggregate.objects.filter(student=OuterRef('pk')).values('student').annotate(
+        total=Sum('completed')
+    ).values('total')
+    return students.annotate(
+        completed_lessons=Count('lessons', filter=Q(lessons__status='completed'))
+        + Coalesce(Subquery(archived_completed), 0)
+    )
+
+
 @staff_member_required
 def student_detail(request, student_id):
-    student = get_object_or_404(Student, pk=student_id)
+    student = get_object_or_404(
+        _with_completed_lessons(Student.objects.select_related('country', 'teacher')),
+        pk=student_id,
+    )
 
     if request.method == 'POST':
         note_text = request.POST.get('note_text', '').strip()
@@ -331,14 +370,12 @@ def student_detail(request, student_id):
             messages.success(request, 'تم إضافة الملاحظة.')
         return redirect('student_detail', student_id=student.id)
 
-    notes = student.notes_timeline.all()
-    payments = student.payments.all()
-    lessons = student.lessons.all()[:30]
+    timeline, next_cursor = build_student_timeline(student, cursor=request.GET.get('cursor'))
     context = {
         'student': student,
-        'notes': notes,
-        'payments': payments,
-        'lessons': lessons,
+        'timeline': timeline,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
     }
     return render(request, 'core/student_detail.html', context)
 
@@ -468,9 +505,9 @@ def delete_teacher(request, teacher_id):
     teacher = get_object_or_404(Teacher, pk=teacher_id)
 
     if request.method == 'POST':
-        name = teacher.name
-        teacher.delete()
-        messages.success(request, f'تم حذف المعلمة "{name}".')
+        # الحذف الفعلي بكل اللي تحته بيتم على دفعات في الخلفية (process_deletions)
+        schedule_deletion(teacher, request.user)
+        messages.success(request, f'تم حذف المعلمة "{teacher.name}"، وبياناتها بتتمسح في الخلفية.')
         return redirect('teachers_list')
 
     return render(request, 'core/delete_teacher.html', {'teacher': teacher})
@@ -554,12 +591,16 @@ def add_country(request):
         if not name:
             messages.error(request, 'من فضلك أدخلي اسم الدولة.')
         else:
-            Country.objects.create(
-                name=name,
-                flag_icon=request.POST.get('flag_icon', '🏳️').strip() or '🏳️',
-            )
-            messages.success(request, 'تم إضافة الدولة بنجاح.')
-            return redirect('countries_list')
+            country = Country(name=name, flag_icon=request.POST.get('flag_icon', '🏳️').strip() or '🏳️')
+            try:
+                # الاسم unique على كل الصفوف، حتى اللي بتتمسح في الخلفية
+                country.validate_unique()
+            except ValidationError as e:
+                messages.error(request, ' '.join(e.message_dict.get('name', e.messages)))
+            else:
+                country.save()
+                messages.success(request, 'تم إضافة الدولة بنجاح.')
+                return redirect('countries_list')
 
     return render(request, 'core/add_country.html')
 
@@ -571,10 +612,14 @@ def edit_country(request, country_id):
     if request.method == 'POST':
         country.name = request.POST.get('name', '').strip()
         country.flag_icon = request.POST.get('flag_icon', '🏳️').strip() or '🏳️'
-        country.save()
-
-        messages.success(request, 'تم تحديث بيانات الدولة.')
-        return redirect('countries_list')
+        try:
+            country.validate_unique()
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.message_dict.get('name', e.messages)))
+        else:
+            country.save()
+            messages.success(request, 'تم تحديث بيانات الدولة.')
+            return redirect('countries_list')
 
     return render(request, 'core/edit_country.html', {'country': country})
 
@@ -584,9 +629,9 @@ def delete_country(request, country_id):
     country = get_object_or_404(Country, pk=country_id)
 
     if request.method == 'POST':
-        name = country.name
-        country.delete()
-        messages.success(request, f'تم حذف الدولة "{name}".')
+        # الحذف الفعلي بكل اللي تحته بيتم على دفعات في الخلفية (process_deletions)
+        schedule_deletion(country, request.user)
+        messages.success(request, f'تم حذف الدولة "{country.name}"، وبياناتها بتتمسح في الخلفية.')
         return redirect('countries_list')
 
     return render(request, 'core/delete_country.html', {'country': country})
@@ -1041,7 +1086,7 @@ def lessons_dashboard(request):
                 due_now.append(lesson)
 
     teacher_rows = []
-    for t in Teacher.objects.all():
+    for t in Teacher.with_month_stats(Teacher.objects.all(), now.year, now.month):
         s = t.monthly_lesson_stats(year=now.year, month=now.month)
         teacher_rows.append({'teacher': t, 'stats': s})
 
@@ -1465,7 +1510,7 @@ def teacher_register_schedule(request):
 
     students_progress = [
         {'student': s, 'progress': s.lessons_progress_label(), 'upcoming': s.lessons.filter(status='scheduled', scheduled_at__gte=timezone.now()).order_by('scheduled_at')}
-        for s in students
+        for s in _with_completed_lessons(students)
     ]
 
     context = {
@@ -1485,10 +1530,17 @@ def evaluations_list(request):
     evaluations = MonthlyEvaluation.objects.select_related('student').all()
 
     q = request.GET.get('q', '').strip()
+    month_label = request.GET.get('month_label', '').strip()
     if q:
         evaluations = evaluations.filter(student_name__icontains=q)
+    if month_label:
+        evaluations = evaluations.filter(month_label=month_label)
 
-    return render(request, 'core/evaluations_list.html', {'evaluations': evaluations, 'search': q})
+    return render(request, 'core/evaluations_list.html', {
+        'evaluations': evaluations,
+        'search': q,
+        'selected_month_label': month_label,
+    })
 
 
 @staff_member_required
@@ -1566,6 +1618,63 @@ def add_evaluation(request):
     return render(request, 'core/add_evaluation.html', context)
 
 
+@staff_member_required
+def batch_evaluations(request):
+    """مسودات تقييم لكل طلاب معلمة (أو كل المعلمات) عن شهر كامل مرة واحدة،
+    بالغياب والحضور محسوبين من سجل الحلقات بدل ما يتكتبوا بإيد"""
+    now = timezone.now()
+    teachers = Teacher.objects.all()
+
+    if request.method == 'POST':
+        year = _to_int_or_none(request.POST.get('year')) or now.year
+        month = _to_int_or_none(request.POST.get('month')) or now.month
+        if month not in ARABIC_MONTHS:
+            month = now.month
+        teacher_id = request.POST.get('teacher') or None
+        teacher = get_object_or_404(Teacher, pk=teacher_id) if teacher_id else None
+        month_label = f"{ARABIC_MONTHS[month]} {year}"
+
+        created_count, skipped_count = create_draft_evaluations(
+            year, month, month_label,
+            teacher=teacher,
+            template=request.POST.get('template', 'teal_pink'),
+        )
+        messages.success(
+            request,
+            f'تم إنشاء {created_count} مسودة تقييم لشهر {month_label}'
+            + (f' (وتم تخطي {skipped_count} طالب عندهم تقييم للشهر ده بالفعل).' if skipped_count else '.')
+        )
+        return redirect(f"{reverse('evaluations_list')}?{urlencode({'month_label': month_label})}")
+
+    context = {
+        'teachers': teachers,
+        'arabic_months': ARABIC_MONTHS,
+        'stat_year': now.year,
+        'stat_month': now.month,
+        'stat_years_range': sorted({now.year - 1, now.year, now.year + 1}, reverse=True),
+        'template_choices': MonthlyEvaluation.TEMPLATE_CHOICES,
+    }
+    return render(request, 'core/batch_evaluations.html', context)
+
+
+@staff_member_required
+def export_evaluations_zip(request):
+    """تحميل تقارير شهر كامل (أو معلمة واحدة) كملف ZIP بيتبعت أول بأول"""
+    evaluations = MonthlyEvaluation.objects.order_by('student_name', 'pk')
+
+    month_label = request.GET.get('month_label', '').strip()
+    teacher_id = request.GET.get('teacher', '').strip()
+    if month_label:
+        evaluations = evaluations.filter(month_label=month_label)
+    if teacher_id:
+        evaluations = evaluations.filter(student__teacher_id=teacher_id)
+
+    response = StreamingHttpResponse(stream_evaluations_zip(evaluations), content_type='application/zip')
+    filename = f"evaluations-{month_label or 'all'}.zip"
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return response
+
+
 @staff_member_required
 def evaluation_detail(request, evaluation_id):
     evaluation = get_object_or_404(MonthlyEvaluation, pk=evaluation_id)
@@ -1573,6 +1682,25 @@ def evaluation_detail(request, evaluation_id):
     return render(request, 'core/evaluation_detail.html', {'evaluation': evaluation, 'public_url': public_url})
 
 
+@staff_member_required
+def finalize_evaluation(request, evaluation_id):
+    """اعتماد مسودة اتعملت بالجملة بعد مراجعتها، فرابط ولي الأمر يشتغل"""
+    if request.method == 'POST':
+        if finalize_evaluations(MonthlyEvaluation.objects.filter(pk=evaluation_id)):
+            messages.success(request, 'تم اعتماد التقييم، والرابط العام بقى شغال.')
+    return redirect('evaluation_detail', evaluation_id=evaluation_id)
+
+
+@staff_member_required
+def finalize_month_evaluations(request):
+    """اعتماد كل مسودات شهر مرة واحدة"""
+    month_label = request.POST.get('month_label', '').strip()
+    if request.method == 'POST' and month_label:
+        count = finalize_evaluations(MonthlyEvaluation.objects.filter(month_label=month_label))
+        messages.success(request, f'تم اعتماد {count} مسودة لشهر {month_label}.')
+    return redirect(f"{reverse('evaluations_list')}?{urlencode({'month_label': month_label})}")
+
+
 @staff_member_required
 def delete_evaluation(request, evaluation_id):
     evaluation = get_object_or_404(MonthlyEvaluation, pk=evaluation_id)
@@ -1584,7 +1712,44 @@ def delete_evaluation(request, evaluation_id):
     return redirect('evaluations_list')
 
 
+def _cached_report_response(request, report, content_type):
+    """رد جاهز من الكاش مع ETag/Last-Modified - ولو المتصفح عنده نفس النسخة يرجع 304"""
+    response = get_conditional_response(
+        request, etag=report['etag'], last_modified=parse_http_date_safe(report['last_modified']),
+    )
+    if response is None:
+        response = HttpResponse(report['content'], content_type=content_type)
+    response['ETag'] = report['etag']
+    response['Last-Modified'] = report['last_modified']
+    patch_cache_control(response, public=True, max_age=REPORT_BROWSER_MAX_AGE)
+    return response
+
+
+def _get_or_cache_report(token):
+    report = get_cached_report(token)
+    if report is None:
+        # المسودة لسه مااتراجعتش، فمش بتتعرض لولي الأمر
+        evaluation = get_object_or_404(MonthlyEvaluation, public_token=token, is_draft=False)
+        report = cache_evaluation_report(evaluation)
+    return report
+
+
+@require_safe
 def public_evaluation(request, token):
-    """صفحة عامة بدون تسجيل دخول - عشان تُبعت كلينك لولي الأمر مباشرة"""
-    evaluation = get_object_or_404(MonthlyEvaluation, public_token=token)
-    return render(request, 'core/evaluation_public.html', {'evaluation': evaluation})
\ No newline at end of file
+    """صفحة عامة بدون تسجيل دخول - عشان تُبعت كلينك لولي الأمر مباشرة.
+    بتتخدم من الكاش (core/reports.py) فالفتح المتكرر مش بيلمس الداتابيز"""
+    return _cached_report_response(request, _get_or_cache_report(token), 'text/html; charset=utf-8')
+
+
+@require_safe
+def public_evaluation_pdf(request, token):
+    """نسخة PDF من نفس التقرير - لو WeasyPrint مش متسطب بنرجع لصفحة الطباعة العادية"""
+    if not HAS_WEASYPRINT:
+        return redirect('public_evaluation', token=token)
+
+    report = get_cached_report(token, 'pdf')
+    if report is None:
+        report = cache_evaluation_pdf(token, _get_or_cache_report(token))
+    response = _cached_report_response(request, report, 'application/pdf')
+    response['Content-Disposition'] = f'inline; filename="evaluation-{token}.pdf"'
+    return response
\ No newline at end of file
@@ -1,8 +1,13 @@
+from collections import Counter
+
 from django.contrib import admin
-from django.utils.html import format_html
 from django.db import transaction
-from accounts.notifications import send_public_notification
+from django.utils.html import format_html
+from core.indexnow import send_indexnow
+from core.jobs import enqueue
 from .models import *
+from .cache import invalidate_listing
+from .stats import apply_stats_delta, questions_contribution, refresh_question_flags
 
 
 @admin.register(QuestionCategory)
@@ -25,26 +30,41 @@ class PublicQuestionAdmin(admin.ModelAdmin):
             old_status = PublicQuestion.objects.get(pk=obj.pk).status
             super().save_model(request, obj, form, change)
             if old_status != 'approved' and obj.status == 'approved':
-                transaction.on_commit(lambda: send_public_notification(
+                enqueue(
+                    'push.public',
                     title=f'❓ سؤال جديد: {obj.title[:50]}',
                     message=obj.question_text[:100],
                     url=f'https://alagme.com/questions/question/{obj.slug}/'
-                ))
+                )
         else:
             super().save_model(request, obj, form, change)
 
     def mark_approved(self, request, queryset):
-        for question in queryset.exclude(status='approved'):
-            question.status = 'approved'
-            question.save()
+        # transaction واحدة: يا كلهم يتعتمدوا بأرقامهم يا مفيش
+        with transaction.atomic():
+            for question in queryset.exclude(status='approved'):
+                question.status = 'approved'
+                question.save()
     mark_approved.short_description = "اعتماد الأسئلة المحددة"
 
+    def _withdraw(self, queryset, status):
+        """update من غير signals، فمساهمة الأسئلة في الأرقام بتتشال هنا
+        (المرفوض والسبام مش داخلين في أي رقم)"""
+        with transaction.atomic():
+            before = questions_contribution(queryset)
+            withdrawn = list(queryset.filter(status='approved').values_list('slug', flat=True))
+            queryset.update(status=status)
+            apply_stats_delta(Counter(), before)
+            # الأسئلة اللي كانت منشورة بقت 404، فبتتبلغ لـ IndexNow عشان تخرج من النتايج
+            send_indexnow(*[f'https://alagme.com/questions/question/{slug}/' for slug in withdrawn])
+        invalidate_listing()
+
     def mark_rejected(self, request, queryset):
-        queryset.update(status='rejected')
+        self._withdraw(queryset, 'rejected')
     mark_rejected.short_description = "رفض الأسئلة المحددة"
 
     def mark_spam(self, request, queryset):
-        queryset.update(status='spam')
+        self._withdraw(queryset, 'spam')
     mark_spam.short_description = "تحديد كـ سبام"
 
 
@@ -60,11 +80,12 @@ class QuestionAnswerAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         if is_new:
             question = obj.question
-            transaction.on_commit(lambda: send_public_notification(
+            enqueue(
+                'push.public',
                 title=f'✅ تمت الإجابة: {question.title[:50]}',
                 message=obj.answer_text[:100],
                 url=f'https://alagme.com/questions/question/{question.slug}/'
-            ))
+            )
 
 
 @admin.register(CommunityAnswer)
@@ -84,10 +105,18 @@ class CommunityAnswerAdmin(admin.ModelAdmin):
 
     def verify_answers(self, request, queryset):
         queryset.update(is_verified=True)
+        invalidate_listing()
     verify_answers.short_description = "التحقق من الإجابات المحددة"
 
     def mark_as_spam(self, request, queryset):
-        queryset.update(is_spam=True)
+        with transaction.atomic():
+            answers = queryset.filter(is_spam=False)
+            question_ids = set(answers.values_list('question_id', flat=True))
+            count = answers.update(is_spam=True)
+            apply_stats_delta(Counter(), Counter(community_answers=count))
+            # عدد إجابات المجتمع على الأسئلة نفسها (وحالة "مجاب عليه")
+            refresh_question_flags(*question_ids)
+        invalidate_listing()
     mark_as_spam.short_description = "تحديد كـ غير مرغوب"
 
 
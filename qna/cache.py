@@ -0,0 +1,26 @@
+"""namespaces الكاش بتاعة الأسئلة (core/cache_versions.py).
+
+- 'qna': صفحات الأسئلة المتكاشة كاملة (core/page_cache.py)، القايمة وصفحة
+  كل سؤال (فيها أسئلة تانية في "أسئلة ذات صلة").
+- 'qna:question:<id>': أجزاء صفحة سؤال واحد (الـ JSON-LD مثلاً)، بتتبطل مع
+  أي حفظ أو حذف للسؤال أو لإجابة عليه.
+"""
+from core.cache_versions import bump_version, versioned_key
+
+QNA_NAMESPACE = 'qna'
+
+
+def question_namespace(question_id):
+    return f'{QNA_NAMESPACE}:question:{question_id}'
+
+
+def question_cache_key(question_id, *parts):
+    return versioned_key(question_namespace(question_id), *parts)
+
+
+def invalidate_listing():
+    bump_version(QNA_NAMESPACE)
+
+
+def invalidate_question(question_id):
+    bump_version(QNA_NAMESPACE, question_namespace(question_id))
@@ -0,0 +1,115 @@
+"""اكتشاف الأسئلة المكررة (أو شبه المكررة) بـ MinHash + LSH.
+
+نص السؤال (العنوان + التفاصيل) بيتحول لمجموعة shingles: الكلمات بعد
+التطبيع العربي وشيل الكلمات الشائعة، وكل كلمتين ورا بعض. البصمة =
+MINHASH_SIZE رقم (أصغر hash للمجموعة تحت كل دالة hash)، ونسبة الأرقام
+المتطابقة بين بصمتين تقدير لتشابه Jaccard بين السؤالين.
+
+البصمة بتتقسم LSH_BANDS حتة، وكل حتة بتتحول لـ bucket متخزن في
+QuestionBucket عليه index. سؤالين تشابههم ≥ ~30% غالبًا بيتقابلوا في bucket
+واحد على الأقل، فالبحث عن المكرر = استعلام واحد على (band, bucket) + استعلام
+للبصمات عشان التقدير الدقيق، من غير ما نلف على كل الأسئلة.
+"""
+import hashlib
+import random
+import zlib
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.search import STOPWORDS, search_tokens
+
+from .models import PublicQuestion, QuestionBucket, QuestionSignature
+
+MINHASH_SIZE = 64
+LSH_BANDS = 32
+LSH_ROWS = MINHASH_SIZE // LSH_BANDS
+DUPLICATE_THRESHOLD = 0.4
+# اقتراحات صفحة "اطرح سؤالاً" أوسع شوية: الزائر لسه بيكتب والنص ناقص
+SUGGESTION_THRESHOLD = 0.3
+# السؤال بيتعلّم "متكرر" لو ليه العدد ده من الأسئلة الشبيهة أو أكتر
+FREQUENT_MIN_DUPLICATES = 2
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# المعاملات ثابتة (seed ثابت) عشان البصمات المتخزنة تفضل صالحة بين الـ processes
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_SIZE)]
+
+
+def shingles(title, text):
+    words = [
+        token for token in search_tokens(f'{title} {text}')
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+    return set(words) | {f'{first} {second}' for first, second in zip(words, words[1:])}
+
+
+def minhash(shingle_set):
+    if not shingle_set:
+        return []
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set]
+    return [min((a * h + b) % _PRIME & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def bands(signature):
+    """(band, bucket) لكل حتة من البصمة"""
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+        yield band, digest
+
+
+def similarity(first, second):
+    if not first or not second:
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / MINHASH_SIZE
+
+
+def index_question(question):
+    """بيحسب بصمة السؤال ويحدّث الـ buckets بتاعته"""
+    signature = minhash(shingles(question.title, question.question_text))
+    with transaction.atomic():
+        QuestionSignature.objects.update_or_create(question=question, defaults={'minhash': signature})
+        QuestionBucket.objects.filter(question=question).delete()
+        QuestionBucket.objects.bulk_create([
+            QuestionBucket(question=question, band=band, bucket=bucket) for band, bucket in bands(signature)
+        ])
+
+
+def find_duplicates(title, text, exclude_pk=None, statuses=('approved', 'pending'), limit=10,
+                    threshold=DUPLICATE_THRESHOLD):
+    """[(التشابه، id السؤال)] للأسئلة اللي تشابهها ≥ threshold، الأعلى الأول"""
+    signature = minhash(shingles(title, text))
+    if not signature:
+        return []
+
+    lookup = Q()
+    for band, bucket in bands(signature):
+        lookup |= Q(band=band, bucket=bucket)
+    candidates = QuestionBucket.objects.filter(lookup, question__status__in=statuses)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(question_id=exclude_pk)
+    candidate_ids = list(
+        candidates.values('question_id').annotate(hits=Count('pk'))
+        .order_by('-hits').values_list('question_id', flat=True)[:limit * 5]
+    )
+    if not candidate_ids:
+        return []
+
+    scored = [
+        (similarity(signature, other), pk)
+        for pk, other in QuestionSignature.objects.filter(question_id__in=candidate_ids).values_list('question_id', 'minhash')
+    ]
+    scored = [(score, pk) for score, pk in scored if score >= threshold]
+    scored.sort(key=lambda item: (-item[0], -item[1]))
+    return scored[:limit]
+
+
+def rebuild_duplicate_index():
+    """بيعيد حساب البصمات لكل الأسئلة. بيرجع العدد"""
+    count = 0
+    for question in PublicQuestion.objects.only('pk', 'title', 'question_text').iterator(chunk_size=200):
+        index_question(question)
+        count += 1
+    return count
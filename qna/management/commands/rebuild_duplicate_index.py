@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from qna.duplicates import rebuild_duplicate_index
+
+
+class Command(BaseCommand):
+    """
+    بيعيد حساب بصمات MinHash وجدول الـ LSH لكل الأسئلة (qna/duplicates.py).
+    حفظ السؤال بيحدّث بصمته لوحده، والأسئلة القديمة بتتبصم في qna/0009، فده
+    محتاجينه بس لو طريقة حساب البصمة اتغيرت.
+
+    الاستخدام:
+        python manage.py rebuild_duplicate_index
+    """
+    help = 'يعيد بناء فهرس اكتشاف الأسئلة المكررة'
+
+    def handle(self, *args, **options):
+        count = rebuild_duplicate_index()
+        self.stdout.write(self.style.SUCCESS(f'تم حساب بصمات {count} سؤال.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from qna.votes import reconcile_likes
+
+
+class Command(BaseCommand):
+    """
+    بيظبط عمود likes في الإجابات الرسمية وإجابات المجتمع من جداول الأصوات
+    (qna/votes.py). الشغلانة 'qna.reconcile_likes' بتعمل ده لوحدها للإجابات
+    اللي جالها أصوات جديدة، والأمر ده بيعدي على كل الإجابات (cron أو بعد أي
+    تعديل على الأصوات من برا الأدمن).
+
+    الاستخدام:
+        python manage.py reconcile_likes
+    """
+    help = 'يظبط عدد الإعجابات على الإجابات من جداول الأصوات'
+
+    def handle(self, *args, **options):
+        changed = reconcile_likes()
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث عدد الإعجابات لـ {changed} إجابة.'))
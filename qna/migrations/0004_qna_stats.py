@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0003_alter_uservote_options_communityanswer_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QnAStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_questions', models.PositiveIntegerField(default=0, verbose_name='الأسئلة المعتمدة')),
+                ('answered_count', models.PositiveIntegerField(default=0, verbose_name='الأسئلة المجاب عليها')),
+                ('featured_count', models.PositiveIntegerField(default=0, verbose_name='أسئلة بإجابة مميزة')),
+                ('community_answers_count', models.PositiveIntegerField(default=0, verbose_name='إجابات المجتمع')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات الأسئلة',
+                'verbose_name_plural': 'إحصائيات الأسئلة',
+            },
+        ),
+        migrations.AddField(
+            model_name='questioncategory',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الأسئلة'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:28
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_answer_flags(apps, schema_editor):
+    """نفس qna.stats.refresh_question_flags على كل الأسئلة الموجودة"""
+    PublicQuestion = apps.get_model('qna', 'PublicQuestion')
+    QuestionAnswer = apps.get_model('qna', 'QuestionAnswer')
+    CommunityAnswer = apps.get_model('qna', 'CommunityAnswer')
+    community = CommunityAnswer.objects.filter(question=OuterRef('pk'), is_spam=False)
+    PublicQuestion.objects.update(
+        has_official_answer=Exists(QuestionAnswer.objects.filter(question=OuterRef('pk'))),
+        has_featured_answer=Exists(QuestionAnswer.objects.filter(question=OuterRef('pk'), is_featured=True)),
+        community_answer_count=Coalesce(
+            Subquery(community.order_by().values('question').annotate(n=Count('pk')).values('n')), 0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0004_qna_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicquestion',
+            name='community_answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد إجابات المجتمع'),
+        ),
+        migrations.AddField(
+            model_name='publicquestion',
+            name='has_featured_answer',
+            field=models.BooleanField(default=False, editable=False, verbose_name='له إجابة مميزة'),
+        ),
+        migrations.AddField(
+            model_name='publicquestion',
+            name='has_official_answer',
+            field=models.BooleanField(default=False, editable=False, verbose_name='له إجابة رسمية'),
+        ),
+        migrations.AddIndex(
+            model_name='publicquestion',
+            index=models.Index(fields=['status', 'has_featured_answer', '-created_at'], name='qna_q_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicquestion',
+            index=models.Index(fields=['status', 'has_official_answer', 'community_answer_count', '-created_at'], name='qna_q_answered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicquestion',
+            index=models.Index(fields=['status', 'is_frequent', '-created_at'], name='qna_q_frequent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicquestion',
+            index=models.Index(fields=['status', '-view_count', '-created_at'], name='qna_q_most_viewed_idx'),
+        ),
+        migrations.RunPython(fill_answer_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0005_answer_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='qna.publicquestion')),
+                ('minhash', models.JSONField(default=list, verbose_name='البصمة')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'بصمة سؤال',
+                'verbose_name_plural': 'بصمات الأسئلة',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.CharField(max_length=16)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='qna.publicquestion')),
+            ],
+            options={
+                'verbose_name': 'LSH bucket',
+                'verbose_name_plural': 'LSH buckets',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='qna_lsh_band_bucket_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:43
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_existing_as_notified(apps, schema_editor):
+    """الإجابات القديمة اتبعتت بالإيميل الفردي قبل الـ digest، فماتتبعتش تاني"""
+    QuestionSubscription = apps.get_model('qna', 'QuestionSubscription')
+    QuestionSubscription.objects.update(last_notified_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0006_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionsubscription',
+            name='last_notified_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر تنبيه'),
+        ),
+        migrations.RunPython(mark_existing_as_notified, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+from core.search import index_text
+
+QUESTION_KIND = 'qna.question'
+
+
+def fill_question_index(apps, schema_editor):
+    """نفس qna.search.rebuild_question_index للأسئلة المعتمدة الموجودة، عشان
+    البحث في الأسئلة مايعتمدش على إن كل سؤال يتحفظ تاني بعد الفهرس"""
+    PublicQuestion = apps.get_model('qna', 'PublicQuestion')
+    QuestionAnswer = apps.get_model('qna', 'QuestionAnswer')
+    CommunityAnswer = apps.get_model('qna', 'CommunityAnswer')
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+
+    official = {}
+    for question_id, text in QuestionAnswer.objects.filter(question__status='approved').values_list('question_id', 'answer_text'):
+        official.setdefault(question_id, text)
+    community = defaultdict(list)
+    answers = CommunityAnswer.objects.filter(question__status='approved', is_spam=False)
+    for question_id, text in answers.values_list('question_id', 'answer_text'):
+        community[question_id].append(text)
+
+    documents = []
+    questions = PublicQuestion.objects.filter(status='approved').values_list('pk', 'title', 'question_text')
+    for pk, title, text in questions.iterator(chunk_size=200):
+        body = ' '.join(filter(None, [text, official.get(pk), *community[pk]]))
+        documents.append(SearchDocument(kind=QUESTION_KIND, object_id=pk, title=index_text(title), body=index_text(body)))
+    SearchDocument.objects.bulk_create(
+        documents, batch_size=200,
+        update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['title', 'body', 'updated_at'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0007_subscription_digest'),
+        ('core', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_question_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from qna.duplicates import bands, minhash, shingles
+
+
+def fill_duplicate_index(apps, schema_editor):
+    """نفس qna.duplicates.rebuild_duplicate_index للأسئلة الموجودة، عشان
+    "أسئلة مشابهة" وفحص التكرار يشوفوها من أول يوم"""
+    PublicQuestion = apps.get_model('qna', 'PublicQuestion')
+    QuestionSignature = apps.get_model('qna', 'QuestionSignature')
+    QuestionBucket = apps.get_model('qna', 'QuestionBucket')
+
+    indexed = set(QuestionSignature.objects.values_list('question_id', flat=True))
+    signatures, buckets = [], []
+    questions = PublicQuestion.objects.exclude(pk__in=indexed).values_list('pk', 'title', 'question_text')
+    for pk, title, text in questions.iterator(chunk_size=200):
+        signature = minhash(shingles(title, text))
+        signatures.append(QuestionSignature(question_id=pk, minhash=signature))
+        buckets.extend(QuestionBucket(question_id=pk, band=band, bucket=bucket) for band, bucket in bands(signature))
+    QuestionSignature.objects.bulk_create(signatures, batch_size=500)
+    QuestionBucket.objects.bulk_create(buckets, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0008_backfill_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_duplicate_index, migrations.RunPython.noop),
+    ]
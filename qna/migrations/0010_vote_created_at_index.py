@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qna', '0009_backfill_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communityanswervote',
+            index=models.Index(fields=['created_at'], name='qna_communi_created_b9028e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uservote',
+            index=models.Index(fields=['created_at'], name='qna_uservot_created_8ec32d_idx'),
+        ),
+    ]
@@ -6,6 +6,9 @@ from django.utils.text import slugify
 from unidecode import unidecode
 import re
 
+from core.slugs import save_with_unique_slug
+from core.view_counters import question_views
+
 class QuestionCategory(models.Model):
     """فئات الأسئلة لتنظيم المحتوى"""
     name = models.CharField(max_length=100, verbose_name="اسم الفئة")
@@ -13,6 +16,8 @@ class QuestionCategory(models.Model):
     icon = models.CharField(max_length=50, blank=True, verbose_name="الأيقونة")
     description = models.TextField(blank=True, verbose_name="الوصف")
     order = models.PositiveIntegerField(default=0, verbose_name="الترتيب")
+    # عدد الأسئلة المعتمدة (بيتحدث من qna/stats.py مع كل تغيير في الأسئلة)
+    question_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="عدد الأسئلة")
     
     class Meta:
         verbose_name = "فئة الأسئلة"
@@ -23,7 +28,24 @@ class QuestionCategory(models.Model):
         return self.name
     
     def get_questions_count(self):
-        return self.publicquestion_set.filter(status='approved').count()
+        return self.question_count
+    get_questions_count.short_description = "عدد الأسئلة"
+
+
+class QnAStats(models.Model):
+    """أرقام صفحة الأسئلة (صف واحد بس، pk=1) بتتحدث من الـ signals (qna/stats.py)"""
+    total_questions = models.PositiveIntegerField(default=0, verbose_name="الأسئلة المعتمدة")
+    answered_count = models.PositiveIntegerField(default=0, verbose_name="الأسئلة المجاب عليها")
+    featured_count = models.PositiveIntegerField(default=0, verbose_name="أسئلة بإجابة مميزة")
+    community_answers_count = models.PositiveIntegerField(default=0, verbose_name="إجابات المجتمع")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تحديث")
+
+    class Meta:
+        verbose_name = "إحصائيات الأسئلة"
+        verbose_name_plural = "إحصائيات الأسئلة"
+
+    def __str__(self):
+        return f"{self.total_questions} سؤال / {self.answered_count} مجاب"
 
 class PublicQuestion(models.Model):
     """النموذج الرئيسي للسؤال مع كل الحماية"""
@@ -84,6 +106,11 @@ class PublicQuestion(models.Model):
     view_count = models.PositiveIntegerField(default=0, verbose_name="عدد المشاهدات")
     is_frequent = models.BooleanField(default=False, verbose_name="سؤال متكرر")
     
+    # حالة الإجابات (بتتحدث من signals الإجابات، qna/stats.py) عشان الفلترة تستخدم index
+    has_official_answer = models.BooleanField(default=False, editable=False, verbose_name="له إجابة رسمية")
+    has_featured_answer = models.BooleanField(default=False, editable=False, verbose_name="له إجابة مميزة")
+    community_answer_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="عدد إجابات المجتمع")
+    
     # SEO
     slug = models.SlugField(
         max_length=250, 
@@ -108,50 +135,76 @@ class PublicQuestion(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['slug']),
+            # فلاتر صفحة الأسئلة: مميزة / غير مجاب ومجاب / متكرر، والترتيب بالأكثر مشاهدة
+            models.Index(fields=['status', 'has_featured_answer', '-created_at'], name='qna_q_featured_idx'),
+            models.Index(
+                fields=['status', 'has_official_answer', 'community_answer_count', '-created_at'],
+                name='qna_q_answered_idx',
+            ),
+            models.Index(fields=['status', 'is_frequent', '-created_at'], name='qna_q_frequent_idx'),
+            models.Index(fields=['status', '-view_count', '-created_at'], name='qna_q_most_viewed_idx'),
         ]
     
     def __str__(self):
         return f"{self.title[:50]}... - {self.visitor_name}"
     
     def save(self, *args, **kwargs):
-        # إنشاء slug فريد يدعم العربية
-        if not self.slug:
-            # إنشاء slug من العنوان مع استبدال المسافات بشرطات
-            arabic_slug = self.title.strip().replace(' ', '-')
-            # إزالة أي أحرف غير مرغوبة
-            arabic_slug = re.sub(r'[^\w\-]', '', arabic_slug)
-            self.slug = arabic_slug
-        
-        # التحقق من عدم تكرار الـ slug
-        original_slug = self.slug
-        counter = 1
-        while PublicQuestion.objects.filter(slug=self.slug).exclude(id=self.id).exists():
-            self.slug = f'{original_slug}-{counter}'
-            counter += 1
-        
         # إنشاء meta description تلقائي
         if not self.meta_description and self.question_text:
             self.meta_description = self.question_text[:155] + "..."
         
-        super().save(*args, **kwargs)
+        # إنشاء slug فريد يدعم العربية (للسؤال الجديد بس، core/slugs.py)
+        if self._state.adding or not self.slug:
+            if self.slug:
+                arabic_slug = self.slug
+            else:
+                # إنشاء slug من العنوان مع استبدال المسافات بشرطات
+                arabic_slug = self.title.strip().replace(' ', '-')
+                # إزالة أي أحرف غير مرغوبة
+                arabic_slug = re.sub(r'[^\w\-]', '', arabic_slug)
+            save_with_unique_slug(self, arabic_slug, lambda: super(PublicQuestion, self).save(*args, **kwargs))
+        else:
+            super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('qna:question_detail', kwargs={'slug': self.slug})
     
-    def has_official_answer(self):
-        """تحقق مما إذا كان للسؤال إجابة رسمية من المعلم"""
-        return hasattr(self, 'official_answer')
-    
     def get_community_answers(self):
         """الحصول على إجابات المجتمع (غير الرسمية)"""
         return self.answers.filter(is_official=False)
     
-    def increment_views(self):
-        """زيادة عداد المشاهدات"""
-        self.view_count = models.F('view_count') + 1
-        self.save(update_fields=['view_count'])
-        self.refresh_from_db()
+    def increment_views(self, request=None):
+        """زيادة عداد المشاهدات في الكاش بس (core.view_counters)، والرقم
+        المعروض = المتسجل في الداتابيز + اللي لسه ماتنقلش"""
+        self.view_count += question_views.record(self.pk, request)
+
+class QuestionSignature(models.Model):
+    """بصمة MinHash لنص السؤال (qna/duplicates.py)"""
+    question = models.OneToOneField(
+        PublicQuestion, on_delete=models.CASCADE, primary_key=True, related_name='signature'
+    )
+    minhash = models.JSONField(default=list, verbose_name="البصمة")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "بصمة سؤال"
+        verbose_name_plural = "بصمات الأسئلة"
+
+
+class QuestionBucket(models.Model):
+    """جدول الـ LSH: كل سؤال ليه صف لكل band، والأسئلة المتشابهة بتقع في نفس الـ bucket"""
+    question = models.ForeignKey(PublicQuestion, on_delete=models.CASCADE, related_name='lsh_buckets')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.CharField(max_length=16)
+
+    class Meta:
+        verbose_name = "LSH bucket"
+        verbose_name_plural = "LSH buckets"
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='qna_lsh_band_bucket_idx'),
+        ]
+
 
 class QuestionAnswer(models.Model):
     """إجابة المعلم أو المشرف"""
@@ -296,6 +349,8 @@ class UserVote(models.Model):
         verbose_name_plural = "التصويتات الرسمية"
         unique_together = ['answer', 'ip_address']
         ordering = ['-created_at']
+        # الظبط الدوري للإعجابات بيدور على الأصوات الجديدة بس (qna/votes.py)
+        indexes = [models.Index(fields=['created_at'])]
     
     def __str__(self):
         return f"تصويت على: {self.answer.question.title[:30]}"
@@ -316,6 +371,8 @@ class CommunityAnswerVote(models.Model):
         verbose_name_plural = "التصويتات المجتمعية"
         unique_together = ['answer', 'ip_address']
         ordering = ['-created_at']
+        # الظبط الدوري للإعجابات بيدور على الأصوات الجديدة بس (qna/votes.py)
+        indexes = [models.Index(fields=['created_at'])]
     
     def __str__(self):
         return f"تصويت على إجابة مجتمعية"
@@ -394,6 +451,8 @@ class QuestionSubscription(models.Model):
     )
     is_active = models.BooleanField(default=True, verbose_name="نشط")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الاشتراك")
+    # آخر digest اتبعت للمشترك ده (qna/tasks.py)، الإجابات الأحدث منه بس هي الجديدة
+    last_notified_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر تنبيه")
     
     class Meta:
         verbose_name = "اشتراك"
@@ -0,0 +1,53 @@
+"""فهرسة الأسئلة المعتمدة في البحث العام (core/search.py).
+
+مستند السؤال = العنوان + نص السؤال + الإجابة الرسمية + إجابات المجتمع
+(غير السبام)، فالبحث بيلاقي السؤال لو الكلمة في أي إجابة عليه، والعنوان
+وزنه أعلى في الترتيب.
+"""
+from core.search import highlight, index_document, remove_document, search
+
+from .models import CommunityAnswer, PublicQuestion, QuestionAnswer
+
+QUESTION_KIND = 'qna.question'
+
+
+def question_body_text(question):
+    parts = [question.question_text]
+    official = QuestionAnswer.objects.filter(question=question).values_list('answer_text', flat=True).first()
+    if official:
+        parts.append(official)
+    parts.extend(
+        CommunityAnswer.objects.filter(question=question, is_spam=False).values_list('answer_text', flat=True)
+    )
+    return ' '.join(filter(None, parts))
+
+
+def update_question_index(question):
+    """المعتمد بس هو اللي بيظهر في البحث"""
+    if question.status != 'approved':
+        remove_document(QUESTION_KIND, question.pk)
+        return
+    index_document(QUESTION_KIND, question.pk, question.title, question_body_text(question))
+
+
+def update_question_index_by_id(question_id):
+    question = PublicQuestion.objects.filter(pk=question_id).first()
+    if question is None:
+        remove_document(QUESTION_KIND, question_id)
+    else:
+        update_question_index(question)
+
+
+def rebuild_question_index():
+    for question in PublicQuestion.objects.filter(status='approved').iterator(chunk_size=200):
+        update_question_index(question)
+
+
+def search_question_ids(query):
+    return search(QUESTION_KIND, query)
+
+
+def attach_snippets(questions, query):
+    """بيضيف question.search_snippet (مقطع مظلل من نص السؤال) للأسئلة اللي هتتعرض في الصفحة بس"""
+    for question in questions:
+        question.search_snippet = highlight(question.question_text, query)
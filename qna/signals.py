@@ -1,9 +1,23 @@
-from django.db.models.signals import pre_save, post_save
+from collections import Counter
+
+from django.db.models import QuerySet
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import PublicQuestion
-from accounts.notifications import send_public_notification
-from django.db import transaction
-from core.indexnow import send_indexnow  # 👈 ضيف ده
+from .models import (
+    CommunityAnswer, CommunityAnswerVote, PublicQuestion, QuestionAnswer, QuestionCategory, UserVote,
+)
+from .cache import invalidate_question, question_namespace
+from .duplicates import index_question
+from .votes import VOTE_MODELS, sync_likes
+from .search import QUESTION_KIND, update_question_index, update_question_index_by_id
+from .stats import (
+    QNA_STATS_NAMESPACE, apply_stats_delta, instance_contribution, questions_contribution, refresh_question_flags,
+)
+from core.cache_versions import bump_version
+from core.search import remove_document
+from core.indexnow import send_indexnow
+from core.jobs import enqueue
+from blog.cache import invalidate_sitemap
 
 
 @receiver(pre_save, sender=PublicQuestion)
@@ -12,10 +26,14 @@ def cache_old_status(sender, instance, **kwargs):
         try:
             old = PublicQuestion.objects.get(pk=instance.pk)
             instance._old_status = old.status
+            # مساهمته في أرقام الصفحة قبل الحفظ (qna/stats.py)
+            instance._old_stats = instance_contribution(old)
         except PublicQuestion.DoesNotExist:
             instance._old_status = None
+            instance._old_stats = Counter()
     else:
         instance._old_status = None
+        instance._old_stats = Counter()
 
 
 @receiver(post_save, sender=PublicQuestion)
@@ -29,11 +47,163 @@ def notify_question_approved(sender, instance, created, **kwargs):
         
         url = f'https://alagme.com/questions/question/{instance.slug}/'
 
-        transaction.on_commit(lambda: send_public_notification(
-            title=f'❓ سؤال جديد: {instance.title[:50]}',
-            message=instance.question_text[:100],
-            url=url
-        ))
+        # الشغلانات بتتسجل في نفس الـ transaction، فمش هتتنفذ غير بعد الحفظ الفعلي
+        enqueue('push.public', title=f'❓ سؤال جديد: {instance.title[:50]}', message=instance.question_text[:100], url=url)
+
+        # 🔥 IndexNow (دفعة واحدة لكل الأسئلة اللي اتعتمدت مع بعض)
+        send_indexnow(url)
+
+
+@receiver(post_save, sender=PublicQuestion)
+def refresh_sitemap_on_status_change(sender, instance, created, **kwargs):
+    """الـ sitemap فيه الأسئلة المعتمدة بس، فبيتبطل لما سؤال يدخل أو يخرج منها"""
+    old_status = getattr(instance, '_old_status', None)
+    if (created and instance.status == 'approved') or (old_status and old_status != instance.status):
+        invalidate_sitemap()
+
+
+@receiver(post_save, sender=QuestionAnswer)
+@receiver(post_save, sender=CommunityAnswer)
+@receiver(post_delete, sender=QuestionAnswer)
+@receiver(post_delete, sender=CommunityAnswer)
+def refresh_answer_flags(sender, instance, update_fields=None, origin=None, **kwargs):
+    """has_official_answer / has_featured_answer / community_answer_count على السؤال
+    (والسؤال القديم لو الإجابة اتنقلت)"""
+    if update_fields and not set(update_fields) & STATS_FIELDS[sender]:
+        return
+    if _deleting_questions(origin):
+        # السؤال نفسه بيتمسح وremove_question_stats بيشيل مساهمته كلها
+        return
+    old_question_id = getattr(instance, '_old_question_id', None)
+    refresh_question_flags(*{instance.question_id, old_question_id} - {None})
+
+
+def _deleting_questions(origin):
+    """الحذف ده جاي cascade من مسح سؤال (أو أسئلة)؟"""
+    if isinstance(origin, QuerySet):
+        return origin.model is PublicQuestion
+    return isinstance(origin, PublicQuestion)
+
+
+# الحقول اللي بتأثر في أرقام صفحة الأسئلة (qna/stats.py) لكل موديل
+STATS_FIELDS = {
+    PublicQuestion: {'status', 'category'},
+    QuestionAnswer: {'question', 'is_featured'},
+    CommunityAnswer: {'question', 'is_spam'},
+}
+
+
+@receiver(post_save, sender=PublicQuestion)
+def update_question_stats(sender, instance, update_fields=None, **kwargs):
+    """فرق مساهمة السؤال قبل وبعد الحفظ. المشاهدات وغيرها مابيغيروش الأرقام"""
+    if update_fields and not set(update_fields) & STATS_FIELDS[sender]:
+        return
+    after = questions_contribution(PublicQuestion.objects.filter(pk=instance.pk))
+    apply_stats_delta(after, getattr(instance, '_old_stats', Counter()))
+
+
+@receiver(pre_delete, sender=PublicQuestion)
+def cache_question_stats_before_delete(sender, instance, **kwargs):
+    """من الداتابيز مش من الـ instance: الحالة اللي في الميموري ممكن تكون
+    أقدم من refresh_question_flags"""
+    instance._stats_before_delete = questions_contribution(PublicQuestion.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=PublicQuestion)
+def remove_question_stats(sender, instance, **kwargs):
+    before = getattr(instance, '_stats_before_delete', None)
+    apply_stats_delta(Counter(), instance_contribution(instance) if before is None else before)
+
+
+@receiver(pre_save, sender=CommunityAnswer)
+def cache_old_answer_state(sender, instance, update_fields=None, **kwargs):
+    instance._old_question_id = instance._old_counted = None
+    if instance.pk and not (update_fields and not set(update_fields) & STATS_FIELDS[sender]):
+        old = CommunityAnswer.objects.filter(pk=instance.pk).values_list('question_id', 'is_spam').first()
+        if old is not None:
+            instance._old_question_id, old_is_spam = old
+            instance._old_counted = not old_is_spam
+
+
+@receiver(post_save, sender=CommunityAnswer)
+def update_community_answers_count(sender, instance, update_fields=None, **kwargs):
+    """عدد إجابات المجتمع (غير السبام) على كل الأسئلة"""
+    if update_fields and not set(update_fields) & STATS_FIELDS[sender]:
+        return
+    apply_stats_delta(
+        Counter(community_answers=int(not instance.is_spam)),
+        Counter(community_answers=int(bool(instance._old_counted))),
+    )
+
+
+@receiver(post_delete, sender=CommunityAnswer)
+def remove_community_answer_stats(sender, instance, **kwargs):
+    apply_stats_delta(Counter(), Counter(community_answers=int(not instance.is_spam)))
+
+
+@receiver(post_save, sender=QuestionCategory)
+@receiver(post_delete, sender=QuestionCategory)
+def refresh_qna_categories(sender, instance, **kwargs):
+    """اسم الفئة أو أيقونتها اتغيرت: الكاش بس (الأعداد زي ما هي)"""
+    bump_version(QNA_STATS_NAMESPACE)
+
+
+@receiver(post_save, sender=PublicQuestion)
+def index_question_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'view_count', 'is_frequent'}:
+        return
+    update_question_index(instance)
+
+
+@receiver(post_delete, sender=PublicQuestion)
+def remove_question_from_search(sender, instance, **kwargs):
+    remove_document(QUESTION_KIND, instance.pk)
+
+
+@receiver(post_save, sender=QuestionAnswer)
+@receiver(post_save, sender=CommunityAnswer)
+@receiver(post_delete, sender=QuestionAnswer)
+@receiver(post_delete, sender=CommunityAnswer)
+def reindex_question_on_answer_change(sender, instance, update_fields=None, **kwargs):
+    """نص الإجابات جزء من مستند السؤال"""
+    if update_fields and set(update_fields) <= {'likes', 'is_verified', 'is_featured'}:
+        return
+    update_question_index_by_id(instance.question_id)
+
+
+@receiver(post_save, sender=PublicQuestion)
+def index_question_signature(sender, instance, created, update_fields=None, **kwargs):
+    """بصمة اكتشاف التكرار (qna/duplicates.py) بتتغير مع النص بس"""
+    if not created and update_fields and not set(update_fields) & {'title', 'question_text'}:
+        return
+    index_question(instance)
+
+
+@receiver(post_save, sender=PublicQuestion)
+@receiver(post_delete, sender=PublicQuestion)
+def invalidate_question_cache(sender, instance, **kwargs):
+    """الصفحات العامة فيها المعتمد بس، فسؤال جديد في المراجعة أو مرفوض مابيبطّلش
+    كاش الأسئلة كله (namespace 'qna')، إلا لو كان معتمد أو بقى معتمد"""
+    # _old_status بيفضل على الـ instance من آخر حفظ، فالحذف بيبص على الحالة الحالية بس
+    old_status = getattr(instance, '_old_status', None) if kwargs.get('signal') is post_save else None
+    if 'approved' in (instance.status, old_status):
+        invalidate_question(instance.pk)
+    else:
+        bump_version(question_namespace(instance.pk))
+
+
+@receiver(post_save, sender=QuestionAnswer)
+@receiver(post_save, sender=CommunityAnswer)
+@receiver(post_delete, sender=QuestionAnswer)
+@receiver(post_delete, sender=CommunityAnswer)
+def invalidate_question_cache_on_answer_change(sender, instance, **kwargs):
+    """نص الإجابات وعددها جوه هيكل الـ JSON-LD المتكاش"""
+    invalidate_question(instance.question_id)
+
 
-        # 🔥 IndexNow (بعد الحفظ الفعلي)
-        transaction.on_commit(lambda: send_indexnow(url))
\ No newline at end of file
+@receiver(post_delete, sender=UserVote)
+@receiver(post_delete, sender=CommunityAnswerVote)
+def sync_likes_on_vote_delete(sender, instance, **kwargs):
+    """الظبط الدوري بيعدي على الأصوات الجديدة بس، فمسح صوت بيظبط إجابته هنا"""
+    answer_model = next(model for model, vote_model in VOTE_MODELS.items() if vote_model is sender)
+    sync_likes(answer_model, instance.answer_id)
@@ -0,0 +1,164 @@
+"""أرقام صفحة الأسئلة وحالة إجابات كل سؤال محسوبين مسبقًا بدل ما يتعدوا مع كل زيارة.
+
+كل سؤال عليه has_official_answer وhas_featured_answer وcommunity_answer_count
+بيتحدثوا بـ UPDATE واحد (refresh_question_flags) مع أي حفظ أو حذف لإجابة،
+فالقوايم والفلاتر بتقراهم كأعمدة عادية عليها indexes بدل EXISTS لكل صف.
+
+عدد الأسئلة المعتمدة والمجاب عليها وأسئلة الإجابة المميزة وإجابات المجتمع
+متخزنين في صف واحد (QnAStats)، وعدد أسئلة كل فئة في QuestionCategory.question_count.
+مفيش إعادة حساب مع كل حفظ: كل سؤال "بيساهم" في الأرقام حسب حالته
+(question_contribution)، والـ signals والأدمن بيحسبوا المساهمة قبل التغيير
+وبعده ويكتبوا الفرق بس (apply_stats_delta) بـ F() في نفس الـ transaction،
+فلو الحفظ اترجع الفرق بيترجع معاه. الكاش بيتبطّل بعد الـ commit، والصفحة
+بتقرا الأرقام من الكاش (أو من الصفين دول لو الكاش فاضي). refresh_stats بيعيد
+الحساب كله من الأول (أول مرة، أو لو الأرقام بعدت عن الجداول لأي سبب).
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from core.cache_versions import bump_version, versioned_key
+
+from .models import CommunityAnswer, PublicQuestion, QnAStats, QuestionAnswer, QuestionCategory
+
+QNA_STATS_NAMESPACE = 'qna:stats'
+QNA_STATS_TIMEOUT = 60 * 60
+
+# أعمدة السؤال اللي بتحدد مساهمته في الأرقام (بنفس ترتيب question_contribution)
+QUESTION_STATS_COLUMNS = (
+    'status', 'category_id', 'has_official_answer', 'has_featured_answer', 'community_answer_count',
+)
+# مفتاح الفرق: عمود QnAStats
+STATS_COLUMNS = {
+    'total': 'total_questions',
+    'answered': 'answered_count',
+    'featured': 'featured_count',
+    'community_answers': 'community_answers_count',
+}
+
+
+def question_contribution(status, category_id, has_official_answer, has_featured_answer, community_answer_count):
+    """السؤال ده بيزود إيه في الأرقام (المعتمد بس اللي بيتعد). الفئة مفتاحها ('category', id)"""
+    contribution = Counter()
+    if status != 'approved':
+        return contribution
+    contribution['total'] = 1
+    contribution['answered'] = int(has_official_answer or community_answer_count > 0)
+    contribution['featured'] = int(has_featured_answer)
+    if category_id:
+        contribution[('category', category_id)] = 1
+    return contribution
+
+
+def instance_contribution(question):
+    return question_contribution(*(getattr(question, column) for column in QUESTION_STATS_COLUMNS))
+
+
+def questions_contribution(questions):
+    """مجموع مساهمة queryset أسئلة، من الداتابيز (استعلام واحد)"""
+    total = Counter()
+    for row in questions.values_list(*QUESTION_STATS_COLUMNS):
+        total.update(question_contribution(*row))
+    return total
+
+
+def _bump_stats_version():
+    bump_version(QNA_STATS_NAMESPACE)
+
+
+def apply_stats_delta(after, before=None):
+    """بيكتب الفرق بين المساهمتين في QnAStats وفي الفئات (UPDATE بـ F() لكل
+    صف اتغير)، وبيبطّل الكاش بعد الـ commit. لو صف QnAStats لسه مااتعملش
+    بيحسب كله من الأول"""
+    delta = Counter(after)
+    delta.subtract(before or Counter())
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta:
+        return
+
+    updates = {
+        column: Greatest(F(column) + delta[key], 0)
+        for key, column in STATS_COLUMNS.items() if key in delta
+    }
+    if updates and not QnAStats.objects.filter(pk=1).update(**updates):
+        refresh_stats()
+        return
+    for key, value in delta.items():
+        if isinstance(key, tuple):
+            QuestionCategory.objects.filter(pk=key[1]).update(question_count=Greatest(F('question_count') + value, 0))
+    # bump = incr واحد في الكاش، فمفيش داعي نجمعه لكل transaction
+    transaction.on_commit(_bump_stats_version)
+
+
+def refresh_question_flags(*question_ids):
+    """بيحسب حالة الإجابات من الجداول نفسها ويكتبها في UPDATE واحد، وبيطبق
+    فرق "المجاب عليها" و"المميزة" على الأرقام.
+    من غير ids = كل الأسئلة وإعادة حساب كاملة (لو حد عدّل الداتابيز بإيده)"""
+    community = CommunityAnswer.objects.filter(question=OuterRef('pk'), is_spam=False)
+    questions = PublicQuestion.objects.all()
+    if question_ids:
+        questions = questions.filter(pk__in=question_ids)
+        before = questions_contribution(questions)
+    updated = questions.update(
+        has_official_answer=Exists(QuestionAnswer.objects.filter(question=OuterRef('pk'))),
+        has_featured_answer=Exists(QuestionAnswer.objects.filter(question=OuterRef('pk'), is_featured=True)),
+        community_answer_count=Coalesce(
+            Subquery(community.order_by().values('question').annotate(n=Count('pk')).values('n')), 0,
+        ),
+    )
+    if question_ids:
+        apply_stats_delta(questions_contribution(questions), before)
+    else:
+        refresh_stats()
+    return updated
+
+
+def refresh_stats():
+    """بيعيد حساب كل الأرقام من الأول (3 استعلامات + تحديث الفئات اللي اتغيرت) ويبطّل الكاش"""
+    approved = PublicQuestion.objects.filter(status='approved')
+    totals = approved.aggregate(
+        total=Count('pk'),
+        answered=Count('pk', filter=Q(has_official_answer=True) | Q(community_answer_count__gt=0)),
+        featured=Count('pk', filter=Q(has_featured_answer=True)),
+    )
+    QnAStats.objects.update_or_create(pk=1, defaults={
+        'total_questions': totals['total'],
+        'answered_count': totals['answered'],
+        'featured_count': totals['featured'],
+        'community_answers_count': CommunityAnswer.objects.filter(is_spam=False).count(),
+    })
+
+    counts = dict(approved.filter(category__isnull=False).values_list('category').annotate(n=Count('pk')))
+    changed = []
+    for category in QuestionCategory.objects.only('pk', 'question_count'):
+        count = counts.get(category.pk, 0)
+        if category.question_count != count:
+            category.question_count = count
+            changed.append(category)
+    QuestionCategory.objects.bulk_update(changed, ['question_count'])
+
+    bump_version(QNA_STATS_NAMESPACE)
+
+
+def get_stats():
+    """الأرقام + الفئات اللي فيها أسئلة، من الكاش"""
+    key = versioned_key(QNA_STATS_NAMESPACE, 'summary')
+    stats = cache.get(key)
+    if stats is None:
+        row = QnAStats.objects.filter(pk=1).first()
+        if row is None:
+            refresh_stats()
+            row = QnAStats.objects.get(pk=1)
+            key = versioned_key(QNA_STATS_NAMESPACE, 'summary')
+        stats = {
+            'total_questions': row.total_questions,
+            'answered_count': row.answered_count,
+            'featured_count': row.featured_count,
+            'community_answers_count': row.community_answers_count,
+            'categories': list(QuestionCategory.objects.filter(question_count__gt=0)),
+        }
+        cache.set(key, stats, QNA_STATS_TIMEOUT)
+    return stats
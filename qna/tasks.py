@@ -0,0 +1,140 @@
+"""handlers الشغلانات الخلفية بتاعة الأسئلة (بتتنفذ من run_worker، core/jobs.py)"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection, send_mail, send_mass_mail
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CommunityAnswer, PublicQuestion, QuestionSubscription
+
+# الإجابات اللي بتيجي في الفترة دي بتتجمع في إيميل واحد لكل مشترك
+SUBSCRIPTION_DIGEST_WINDOW = timedelta(minutes=15)
+SUBSCRIPTION_MAIL_BATCH = 50
+
+
+def send_subscription_digest():
+    """handler شغلانة 'mail.subscription_digest': إيميل واحد لكل مشترك فيه كل
+    الإجابات الجديدة على كل الأسئلة اللي مشترك فيها من آخر digest اتبعتله.
+
+    - الاشتراكات بـ select_related('user', 'question') في استعلام واحد،
+      والإجابات الجديدة لكل الأسئلة في استعلام تاني.
+    - المشترك بنفس الإيميل في كذا سؤال بيوصله إيميل واحد بس.
+    - الإرسال على اتصال SMTP واحد، على دفعات SUBSCRIPTION_MAIL_BATCH، وكل
+      دفعة بتتعلّم (last_notified_at) بعد ما تتبعت، فلو الـ SMTP وقع في
+      النص الشغلانة بتتعاد للي فاضلين بس.
+    - الإجابات لحد started_at بس، وهو نفسه اللي بيتسجل في last_notified_at،
+      فالإجابة اللي بتيجي أثناء الإرسال بتروح في الـ digest الجاي مش بتضيع.
+    """
+    started_at = timezone.now()
+    since = Coalesce('last_notified_at', 'created_at')
+    subscriptions = list(
+        QuestionSubscription.objects.filter(is_active=True)
+        .annotate(since=since)
+        .filter(Exists(CommunityAnswer.objects.filter(
+            question=OuterRef('question'), is_spam=False,
+            created_at__gt=OuterRef('since'), created_at__lte=started_at,
+        )))
+        .select_related('user', 'question')
+    )
+    if not subscriptions:
+        return
+
+    answers_by_question = defaultdict(list)
+    for answer in CommunityAnswer.objects.filter(
+        question_id__in={subscription.question_id for subscription in subscriptions},
+        is_spam=False,
+        created_at__gt=min(subscription.since for subscription in subscriptions),
+        created_at__lte=started_at,
+    ).select_related('answered_by').order_by('created_at'):
+        answers_by_question[answer.question_id].append(answer)
+
+    # إيميل واحد لكل مستلم: [(الاشتراك، الإجابات الجديدة)]
+    digests = defaultdict(list)
+    for subscription in subscriptions:
+        email = subscription.user.email if subscription.user else subscription.email
+        new_answers = [
+            answer for answer in answers_by_question[subscription.question_id]
+            if answer.created_at > subscription.since
+            # إجابة المشترك نفسه مش "جديدة" بالنسبة له
+            and not (subscription.user_id and answer.answered_by_id == subscription.user_id)
+        ]
+        if email and new_answers:
+            digests[email.lower()].append((subscription, new_answers))
+
+    recipients = list(digests.items())
+    with get_connection() as connection:
+        for start in range(0, len(recipients), SUBSCRIPTION_MAIL_BATCH):
+            batch = recipients[start:start + SUBSCRIPTION_MAIL_BATCH]
+            send_mass_mail(
+                [(*_digest_message(items), settings.DEFAULT_FROM_EMAIL, [email]) for email, items in batch],
+                connection=connection,
+            )
+            QuestionSubscription.objects.filter(
+                pk__in=[subscription.pk for _, items in batch for subscription, _ in items]
+            ).update(last_notified_at=started_at)
+
+    # اللي اتفلتر (إيميل فاضي أو إجاباته هو بس) بيتعلّم برضه عشان مايتحسبش تاني
+    QuestionSubscription.objects.filter(
+        Q(last_notified_at__isnull=True) | Q(last_notified_at__lt=started_at),
+        pk__in=[subscription.pk for subscription in subscriptions],
+    ).update(last_notified_at=started_at)
+
+
+def _digest_message(items):
+    """(الموضوع، النص) لإيميل مشترك واحد"""
+    if len(items) == 1:
+        subscription, answers = items[0]
+        subject = f'🆕 إجابة جديدة: {subscription.question.title[:50]}'
+    else:
+        subject = f'🆕 إجابات جديدة على {len(items)} أسئلة مشترك فيها'
+
+    sections = []
+    for subscription, answers in items:
+        question = subscription.question
+        latest = answers[-1]
+        more = f'\n(و{len(answers) - 1} إجابات تانية)' if len(answers) > 1 else ''
+        sections.append(f"""
+السؤال: {question.title}
+
+أحدث إجابة:
+{latest.answer_text[:200]}...{more}
+
+اضغط هنا لقراءة الإجابات: {settings.CANONICAL_URL}{question.get_absolute_url()}
+""")
+    return subject, 'إجابات جديدة على الأسئلة اللي مشترك فيها:\n' + '\n----------\n'.join(sections)
+
+
+def send_subscription_emails(**payload):
+    """شغلانات 'mail.question_subscribers' القديمة (اتسجلت قبل الـ digest) بتبعت الـ digest"""
+    send_subscription_digest()
+
+
+def send_new_question_email(question_id, review_url):
+    """إيميل للأدمنز (settings.ADMINS) إن فيه سؤال جديد مستني مراجعة"""
+    if not getattr(settings, 'ADMINS', None):
+        return
+    question = PublicQuestion.objects.select_related('category').filter(pk=question_id).first()
+    if question is None:
+        return
+
+    subject = f'📧 سؤال جديد يحتاج مراجعة: {question.title[:50]}'
+    message = f"""
+سؤال جديد يحتاج مراجعة:
+
+العنوان: {question.title}
+من: {question.visitor_name}
+البريد: {question.visitor_email or 'غير متوفر'}
+الهاتف: {question.visitor_phone or 'غير متوفر'}
+الفئة: {question.category.name if question.category else 'غير محدد'}
+
+نص السؤال:
+{question.question_text[:300]}...
+
+للمراجعة والموافقة: {review_url}
+    """
+    admin_emails = [email for name, email in settings.ADMINS]
+    # من غير fail_silently: لو الـ SMTP وقع الشغلانة بتتعاد
+    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, admin_emails)
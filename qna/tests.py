@@ -1,3 +1,292 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache_versions import get_version
+from core.models import Job
+
+from .cache import QNA_NAMESPACE
+from .duplicates import LSH_BANDS, MINHASH_SIZE, find_duplicates, minhash, shingles, similarity
+from .models import (
+    CommunityAnswer, CommunityAnswerVote, PublicQuestion, QnAStats, QuestionAnswer, QuestionBucket, QuestionCategory, QuestionSignature,
+    QuestionSubscription, UserVote,
+)
+from .stats import refresh_stats
+from .tasks import send_subscription_digest
+from .votes import attach_likes, like_answer, reconcile_likes, record_vote
+
+
+def _question(title, status='approved', **fields):
+    return PublicQuestion.objects.create(
+        title=title, question_text=f'{title} - تفاصيل السؤال بالكامل', visitor_name='زائر', status=status, **fields,
+    )
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+@mock.patch('core.indexnow.enqueue_unique')
+class StatsDeltaTests(TestCase):
+    """أرقام صفحة الأسئلة بتتحدث بالفرق (qna/stats.py)، ولازم تفضل زي إعادة الحساب الكاملة"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user(username='admin', password='x', is_staff=True)
+        cls.category = QuestionCategory.objects.create(name='صلاة', slug='salah')
+
+    def _snapshot(self):
+        row = QnAStats.objects.get(pk=1)
+        return (
+            row.total_questions, row.answered_count, row.featured_count, row.community_answers_count,
+            QuestionCategory.objects.get(pk=self.category.pk).question_count,
+        )
+
+    def assertMatchesFullRecompute(self):
+        incremental = self._snapshot()
+        refresh_stats()
+        self.assertEqual(incremental, self._snapshot())
+        return incremental
+
+    def test_deltas_follow_question_and_answer_changes(self, _):
+        refresh_stats()
+        first = _question('سؤال عن الصلاة', category=self.category)
+        second = _question('سؤال عن الصيام')
+        pending = _question('سؤال في المراجعة', status='pending', category=self.category)
+        self.assertEqual(self.assertMatchesFullRecompute(), (2, 0, 0, 0, 1))
+
+        QuestionAnswer.objects.create(question=first, answer_text='إجابة رسمية', answered_by=self.admin, is_featured=True)
+        CommunityAnswer.objects.create(question=second, answer_text='إجابة من المجتمع', visitor_name='عضو')
+        # أول إجابة على سؤال في المراجعة بتعتمده (CommunityAnswer.save)
+        CommunityAnswer.objects.create(question=pending, answer_text='إجابة على سؤال لسه', visitor_name='عضو')
+        self.assertEqual(self.assertMatchesFullRecompute(), (3, 3, 1, 2, 2))
+
+        second.status = 'rejected'
+        second.save()
+        self.assertEqual(self.assertMatchesFullRecompute(), (2, 2, 1, 2, 2))
+
+        first.delete()
+        self.assertEqual(self.assertMatchesFullRecompute(), (1, 1, 0, 2, 1))
+
+    def test_spam_and_deleted_answers(self, _):
+        refresh_stats()
+        question = _question('سؤال عن الزكاة')
+        answer = CommunityAnswer.objects.create(question=question, answer_text='إجابة', visitor_name='عضو')
+        self.assertEqual(self.assertMatchesFullRecompute(), (1, 1, 0, 1, 0))
+
+        answer.is_spam = True
+        answer.save()
+        self.assertEqual(self.assertMatchesFullRecompute(), (1, 0, 0, 0, 0))
+
+        answer.delete()
+        self.assertEqual(self.assertMatchesFullRecompute(), (1, 0, 0, 0, 0))
+
+    def test_rolled_back_save_leaves_stats_untouched(self, _):
+        refresh_stats()
+        question = _question('سؤال عن الحج', category=self.category)
+        before = self._snapshot()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            question.status = 'rejected'
+            question.save()
+            raise RuntimeError
+        self.assertEqual(self._snapshot(), before)
+
+    def test_only_approved_questions_invalidate_the_listing(self, _):
+        version = get_version(QNA_NAMESPACE)
+        question = _question('سؤال جديد', status='pending')
+        question.title = 'سؤال جديد بعد التعديل'
+        question.save()
+        self.assertEqual(get_version(QNA_NAMESPACE), version)
+
+        question.status = 'approved'
+        question.save()
+        self.assertNotEqual(get_version(QNA_NAMESPACE), version)
+
+        version = get_version(QNA_NAMESPACE)
+        question.status = 'rejected'
+        question.save()
+        self.assertNotEqual(get_version(QNA_NAMESPACE), version)
+
+        version = get_version(QNA_NAMESPACE)
+        question.delete()
+        self.assertEqual(get_version(QNA_NAMESPACE), version)
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+@mock.patch('core.indexnow.enqueue_unique')
+class DuplicateDetectionTests(TestCase):
+    """اكتشاف الأسئلة المكررة بـ MinHash + LSH (qna/duplicates.py)"""
+
+    TITLE = 'حكم قراءة القرآن للحائض'
+    TEXT = 'هل يجوز للمرأة الحائض أن تقرأ القرآن من المصحف أو من الهاتف أثناء فترة الحيض'
+
+    def _ask(self, title, text, status='approved'):
+        return PublicQuestion.objects.create(title=title, question_text=text, visitor_name='زائر', status=status)
+
+    def test_signature_is_deterministic(self, _):
+        signature = minhash(shingles(self.TITLE, self.TEXT))
+        self.assertEqual(len(signature), MINHASH_SIZE)
+        self.assertEqual(signature, minhash(shingles(self.TITLE, self.TEXT)))
+        self.assertEqual(similarity(signature, signature), 1.0)
+        self.assertEqual(minhash(set()), [])
+        self.assertEqual(similarity([], signature), 0.0)
+
+    def test_saving_a_question_indexes_every_band(self, _):
+        question = self._ask(self.TITLE, self.TEXT)
+        self.assertTrue(QuestionSignature.objects.filter(question=question).exists())
+        self.assertEqual(QuestionBucket.objects.filter(question=question).count(), LSH_BANDS)
+
+        # تعديل عدد المشاهدات مابيعيدش حساب البصمة
+        QuestionBucket.objects.filter(question=question).delete()
+        question.view_count = 5
+        question.save(update_fields=['view_count'])
+        self.assertFalse(QuestionBucket.objects.filter(question=question).exists())
+
+    def test_finds_near_duplicates_only(self, _):
+        original = self._ask(self.TITLE, self.TEXT)
+        pending = self._ask(self.TITLE, self.TEXT + ' وجزاكم الله خيرا', status='pending')
+        rejected = self._ask(self.TITLE, self.TEXT, status='rejected')
+        unrelated = self._ask('مواعيد صلاة الفجر في الشتاء', 'متى يبدأ وقت صلاة الفجر وهل يختلف بين الصيف والشتاء')
+
+        found = find_duplicates(self.TITLE, 'هل يجوز للمرأة الحائض أن تقرأ القرآن من المصحف أثناء فترة الحيض')
+        ids = [pk for _, pk in found]
+        self.assertIn(original.pk, ids)
+        self.assertIn(pending.pk, ids)
+        self.assertNotIn(rejected.pk, ids)
+        self.assertNotIn(unrelated.pk, ids)
+        self.assertEqual([score for score, _ in found], sorted((score for score, _ in found), reverse=True))
+
+        ids = [pk for _, pk in find_duplicates(self.TITLE, self.TEXT, exclude_pk=original.pk)]
+        self.assertNotIn(original.pk, ids)
+        self.assertEqual(find_duplicates('', ''), [])
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+@mock.patch('core.indexnow.enqueue_unique')
+class VoteTests(TestCase):
+    """الإعجابات: INSERT واحد لكل IP والعدد من جدول الأصوات (qna/votes.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = get_user_model().objects.create_user(username='admin', password='x', is_staff=True)
+        question = _question('سؤال عن الوضوء')
+        cls.answer = QuestionAnswer.objects.create(question=question, answer_text='إجابة رسمية', answered_by=admin)
+        cls.community = CommunityAnswer.objects.create(question=question, answer_text='إجابة', visitor_name='عضو')
+
+    def test_one_vote_per_ip(self, _):
+        self.assertTrue(record_vote(QuestionAnswer, self.answer.pk, '10.0.0.1'))
+        self.assertFalse(record_vote(QuestionAnswer, self.answer.pk, '10.0.0.1'))
+        self.assertTrue(record_vote(QuestionAnswer, self.answer.pk, '10.0.0.2'))
+        self.assertFalse(record_vote(QuestionAnswer, 999999, '10.0.0.1'))
+        self.assertEqual(UserVote.objects.filter(answer=self.answer).count(), 2)
+
+    def test_like_returns_count_and_schedules_one_reconcile(self, _):
+        self.assertEqual(like_answer(QuestionAnswer, self.answer.pk, '10.0.0.1'), (True, 1))
+        self.assertEqual(like_answer(QuestionAnswer, self.answer.pk, '10.0.0.2'), (True, 2))
+        self.assertEqual(like_answer(QuestionAnswer, self.answer.pk, '10.0.0.2'), (False, None))
+        self.assertEqual(Job.objects.filter(kind='qna.reconcile_likes').count(), 1)
+
+        self.community.is_spam = True
+        self.community.save()
+        self.assertEqual(like_answer(CommunityAnswer, self.community.pk, '10.0.0.1', is_spam=False), (False, None))
+
+    def test_attach_likes_and_reconcile(self, _):
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            record_vote(QuestionAnswer, self.answer.pk, ip)
+        record_vote(CommunityAnswer, self.community.pk, '10.0.0.1')
+        answers = attach_likes(QuestionAnswer, [QuestionAnswer.objects.get(pk=self.answer.pk)])
+        self.assertEqual(answers[0].likes, 3)
+        self.assertEqual(QuestionAnswer.objects.get(pk=self.answer.pk).likes, 0)
+
+        # أصوات قديمة برا نافذة since مابتتظبطش في الدورة دي
+        CommunityAnswerVote.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(reconcile_likes(since=(timezone.now() - timedelta(minutes=5)).isoformat()), 1)
+        self.assertEqual(QuestionAnswer.objects.get(pk=self.answer.pk).likes, 3)
+        self.assertEqual(CommunityAnswer.objects.get(pk=self.community.pk).likes, 0)
+
+        self.assertEqual(reconcile_likes(), 1)
+        self.assertEqual(CommunityAnswer.objects.get(pk=self.community.pk).likes, 1)
+        self.assertEqual(reconcile_likes(), 0)
+
+    def test_deleting_a_vote_syncs_likes(self, _):
+        record_vote(QuestionAnswer, self.answer.pk, '10.0.0.1')
+        record_vote(QuestionAnswer, self.answer.pk, '10.0.0.2')
+        reconcile_likes()
+        UserVote.objects.filter(ip_address='10.0.0.1').delete()
+        self.assertEqual(QuestionAnswer.objects.get(pk=self.answer.pk).likes, 1)
+        UserVote.objects.get().delete()
+        self.assertEqual(QuestionAnswer.objects.get(pk=self.answer.pk).likes, 0)
+
+    def test_vote_views(self, _):
+        url = reverse('qna:vote_answer', args=[self.answer.pk])
+        response = self.client.post(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.json()['likes'], 1)
+        response = self.client.post(url, HTTP_X_FORWARDED_FOR='10.0.0.2, 10.0.0.1', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.json()['likes'], 2)
+        self.assertFalse(self.client.post(url, REMOTE_ADDR='10.0.0.1').json()['success'])
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.post(reverse('qna:vote_answer', args=[999999])).status_code, 404)
+            self.assertEqual(self.client.get(url).status_code, 405)
+
+        url = reverse('qna:vote_community_answer', args=[self.community.pk])
+        self.assertEqual(self.client.post(url, REMOTE_ADDR='10.0.0.1').json()['likes'], 1)
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+@mock.patch('core.indexnow.enqueue_unique')
+class SubscriptionDigestTests(TestCase):
+    """إيميل الـ digest للمشتركين (qna/tasks.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = get_user_model().objects.create_user(username='member', password='x', email='Member@example.com')
+        cls.first = _question('سؤال عن الصلاة')
+        cls.second = _question('سؤال عن الصيام')
+        past = timezone.now() - timedelta(hours=1)
+        for question in (cls.first, cls.second):
+            QuestionSubscription.objects.create(question=question, user=cls.member)
+        QuestionSubscription.objects.create(question=cls.first, email='visitor@example.com')
+        QuestionSubscription.objects.update(created_at=past)
+
+    def _answer(self, question, user=None, **fields):
+        return CommunityAnswer.objects.create(
+            question=question, answer_text='إجابة جديدة', visitor_name='عضو', answered_by=user, **fields,
+        )
+
+    def test_one_email_per_recipient(self, _):
+        self._answer(self.first)
+        self._answer(self.first)
+        self._answer(self.second)
+        self._answer(self.second, is_spam=True)
+        send_subscription_digest()
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['member@example.com', 'visitor@example.com'])
+        member_mail = next(message for message in mail.outbox if message.to == ['member@example.com'])
+        self.assertIn('2 أسئلة', member_mail.subject)
+        self.assertFalse(QuestionSubscription.objects.filter(last_notified_at__isnull=True).exists())
+
+        mail.outbox.clear()
+        send_subscription_digest()
+        self.assertEqual(mail.outbox, [])
+
+    def test_own_answers_are_not_new(self, _):
+        self._answer(self.second, user=self.member)
+        send_subscription_digest()
+        self.assertEqual(mail.outbox, [])
+        # اتعلّم برضه عشان مايتحسبش تاني
+        self.assertIsNotNone(QuestionSubscription.objects.get(question=self.second).last_notified_at)
+
+    def test_answer_after_start_goes_in_the_next_digest(self, _):
+        answer = self._answer(self.second)
+        CommunityAnswer.objects.filter(pk=answer.pk).update(created_at=timezone.now() + timedelta(minutes=1))
+        send_subscription_digest()
+        self.assertEqual(mail.outbox, [])
+
+        later = timezone.now() + timedelta(minutes=5)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            send_subscription_digest()
+        self.assertEqual([message.to for message in mail.outbox], [['member@example.com']])
+        self.assertEqual(QuestionSubscription.objects.get(question=self.second).last_notified_at, later)
@@ -15,6 +15,9 @@ urlpatterns = [
     # ✅ حذف AddCommunityAnswerView لأن النموذج الآن يُرسل لنفس صفحة السؤال
     # re_path(r'^question/(?P<slug>[\w\-]+)/answer/$', views.AddCommunityAnswerView.as_view(), name='add_community_answer'),
     
+    # AJAX: أسئلة شبيهة وقت كتابة السؤال
+    path('similar/', views.similar_questions, name='similar_questions'),
+    
     # AJAX endpoints للتصويت
     path('vote/<int:answer_id>/', views.vote_answer, name='vote_answer'),
     path('vote-community/<int:answer_id>/', views.vote_community_answer, name='vote_community_answer'),
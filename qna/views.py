@@ -1,24 +1,41 @@
 # qna/views.py
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, F, Exists, OuterRef, Prefetch
+from django.db.models import Q, F, Max, Case, When, Prefetch
 from django.views.generic import ListView, DetailView, CreateView
 from django.urls import reverse_lazy
-from django.core.mail import send_mail
-from django.conf import settings
 from django.http import JsonResponse, HttpResponseForbidden
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.html import strip_tags
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
 from .models import (
     PublicQuestion, QuestionAnswer, QuestionCategory, UserVote,
     CommunityAnswer, CommunityAnswerVote, QuestionReport, QuestionSubscription
 )
 from .forms import PublicQuestionForm, CommunityAnswerForm
+from .cache import QNA_NAMESPACE, question_cache_key
+from .duplicates import FREQUENT_MIN_DUPLICATES, SUGGESTION_THRESHOLD, find_duplicates
+from .search import attach_snippets, search_question_ids
+from .stats import QNA_STATS_NAMESPACE, get_stats
+from .tasks import SUBSCRIPTION_DIGEST_WINDOW
+from .votes import attach_likes, like_answer
+from core.jobs import enqueue, enqueue_unique
+from core.page_cache import cache_public_page, conditional_page
+from core.view_counters import question_views
 import json
 
+# الـ JSON-LD بيتبطل بالإصدار، فالـ timeout بس عشان الكاش مايكبرش
+QUESTION_SCHEMA_TIMEOUT = 60 * 60 * 24
+
 
+@method_decorator(cache_public_page(QNA_NAMESPACE, QNA_STATS_NAMESPACE), name='dispatch')
 class QuestionListView(ListView):
     model = PublicQuestion
     template_name = 'qna/question_list.html'
@@ -26,33 +43,15 @@ class QuestionListView(ListView):
     paginate_by = 8
     
     def get_queryset(self):
+        # حالة الإجابات أعمدة على السؤال نفسه (qna/stats.py) فالفلاتر بتستخدم indexes
         queryset = PublicQuestion.objects.filter(status='approved')
 
-        queryset = queryset.annotate(
-            has_official=Exists(
-                QuestionAnswer.objects.filter(question=OuterRef('pk'))
-            ),
-            has_featured=Exists(
-                QuestionAnswer.objects.filter(
-                    question=OuterRef('pk'),
-                    is_featured=True
-                )
-            ),
-            has_community_answers=Exists(
-                CommunityAnswer.objects.filter(
-                    question=OuterRef('pk'),
-                    is_spam=False
-                )
-            )
-        )
-
+        # البحث (فهرس نصي يشمل الإجابات ومرتب بالأنسب، qna/search.py)
         search_query = self.request.GET.get('search', '').strip()
+        matched_ids = []
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(question_text__icontains=search_query) |
-                Q(visitor_name__icontains=search_query)
-            )
+            matched_ids = search_question_ids(search_query)
+            queryset = queryset.filter(pk__in=matched_ids)
 
         category_slug = self.request.GET.get('category', '').strip()
         if category_slug:
@@ -60,16 +59,20 @@ class QuestionListView(ListView):
 
         filter_type = self.request.GET.get('filter', '').strip()
         if filter_type == 'featured':
-            queryset = queryset.filter(has_featured=True)
+            queryset = queryset.filter(has_featured_answer=True)
         elif filter_type == 'unanswered':
-            queryset = queryset.filter(has_official=False, has_community_answers=False)
+            queryset = queryset.filter(has_official_answer=False, community_answer_count=0)
         elif filter_type == 'frequent':
             queryset = queryset.filter(is_frequent=True)
         elif filter_type == 'answered':
-            queryset = queryset.filter(Q(has_official=True) | Q(has_community_answers=True))
+            queryset = queryset.filter(Q(has_official_answer=True) | Q(community_answer_count__gt=0))
 
-        sort_by = self.request.GET.get('sort', 'newest')
-        if sort_by == 'oldest':
+        sort_by = self.request.GET.get('sort', 'relevance' if search_query else 'newest')
+        if sort_by == 'relevance' and matched_ids:
+            queryset = queryset.order_by(
+                Case(*[When(pk=pk, then=position) for position, pk in enumerate(matched_ids)])
+            )
+        elif sort_by == 'oldest':
             queryset = queryset.order_by('created_at')
         elif sort_by == 'most_viewed':
             queryset = queryset.order_by('-view_count', '-created_at')
@@ -82,72 +85,53 @@ class QuestionListView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        context['categories'] = QuestionCategory.objects.annotate(
-            question_count=Count(
-                'publicquestion',
-                filter=Q(publicquestion__status='approved')
-            )
-        ).filter(question_count__gt=0)
-
-        context['total_questions'] = PublicQuestion.objects.filter(
-            status='approved'
-        ).count()
-
-        context['answered_count'] = PublicQuestion.objects.filter(
-            status='approved'
-        ).annotate(
-            has_official=Exists(
-                QuestionAnswer.objects.filter(question=OuterRef('pk'))
-            ),
-            has_community_answers=Exists(
-                CommunityAnswer.objects.filter(
-                    question=OuterRef('pk'),
-                    is_spam=False
-                )
-            )
-        ).filter(Q(has_official=True) | Q(has_community_answers=True)).count()
-
-        context['featured_count'] = PublicQuestion.objects.filter(
-            status='approved'
-        ).filter(
-            Exists(
-                QuestionAnswer.objects.filter(
-                    question=OuterRef('pk'),
-                    is_featured=True
-                )
-            )
-        ).count()
+        # الأرقام محسوبة مسبقًا ومتكاشة (qna/stats.py)
+        context.update(get_stats())
 
         context['current_search'] = self.request.GET.get('search', '')
         context['current_category'] = self.request.GET.get('category', '')
         context['current_filter'] = self.request.GET.get('filter', '')
-        context['current_sort'] = self.request.GET.get('sort', 'newest')
+        context['current_sort'] = self.request.GET.get('sort', 'relevance' if context['current_search'] else 'newest')
 
-        context['community_answers_count'] = CommunityAnswer.objects.filter(
-            is_spam=False
-        ).count()
+        if context['current_search']:
+            attach_snippets(context['questions'], context['current_search'])
 
         return context
 
 
+def _question_metadata(request, slug):
+    """id السؤال وآخر تعديل فيه أو في إجاباته (استعلام واحد) للـ ETag"""
+    row = PublicQuestion.objects.filter(slug=slug, status='approved').annotate(
+        official_modified=F('official_answer__updated_at'),
+        answers_modified=Max('answers__updated_at'),
+    ).values_list('pk', 'updated_at', 'official_modified', 'answers_modified').first()
+    if row is None:
+        return None
+    pk, *modified = row
+    return pk, max(stamp for stamp in modified if stamp)
+
+
+@method_decorator(
+    conditional_page(_question_metadata, QNA_NAMESPACE, QNA_STATS_NAMESPACE, counter=question_views),
+    name='dispatch',
+)
+@method_decorator(cache_public_page(QNA_NAMESPACE, QNA_STATS_NAMESPACE), name='dispatch')
 class QuestionDetailView(DetailView):
     model = PublicQuestion
     template_name = 'qna/question_detail.html'
     context_object_name = 'question'
 
     def get_queryset(self):
-        return PublicQuestion.objects.filter(status='approved')
+        # الإجابة الرسمية (OneToOne) وكاتبها والفئة في نفس استعلام السؤال
+        return PublicQuestion.objects.filter(status='approved').select_related(
+            'category', 'official_answer__answered_by',
+        )
 
     def get_object(self, queryset=None):
         slug = self.kwargs.get('slug')
-        obj = get_object_or_404(PublicQuestion, slug=slug, status='approved')
-
-        if self.request.method == 'GET':
-            PublicQuestion.objects.filter(pk=obj.pk).update(
-                view_count=F('view_count') + 1
-            )
-            obj.refresh_from_db()
-
+        obj = get_object_or_404(self.get_queryset(), slug=slug)
+        # المشاهدة بتتعد في الكاش وبتتنقل للداتابيز على دفعات (مش مع كل طلب)
+        obj.increment_views(self.request)
         return obj
 
     def post(self, request, *args, **kwargs):
@@ -208,41 +192,29 @@ class QuestionDetailView(DetailView):
         if 'form' not in context:
             context['form'] = CommunityAnswerForm(user=self.request.user)
 
-        context['community_answers'] = self.object.answers.filter(
-            is_spam=False
-        ).order_by('-is_verified', '-likes', '-created_at')
-
-        try:
-            official_answer = QuestionAnswer.objects.filter(question=self.object).first()
-            context['has_official_answer'] = official_answer is not None
-            context['official_answer'] = official_answer
-        except:
-            context['has_official_answer'] = False
-            context['official_answer'] = None
-
-        if self.request.user.is_authenticated:
-            context['is_subscribed'] = QuestionSubscription.objects.filter(
-                question=self.object,
-                user=self.request.user,
-                is_active=True
-            ).exists()
-        else:
-            context['is_subscribed'] = False
+        # القايمة بتتقري مرة واحدة، والقالب بيستخدم length بدل count.
+        # السؤال عارف عدد إجاباته (community_answer_count) فمن غير إجابات مفيش استعلام
+        question = self.object
+        community_answers = []
+        if question.community_answer_count:
+            community_answers = list(
+                question.answers.filter(is_spam=False).select_related('answered_by')
+                .order_by('-is_verified', '-likes', '-created_at')
+            )
+        # الإعجابات من جدول الأصوات (استعلام واحد)، عمود likes بيتظبط على دفعات (qna/votes.py)
+        context['community_answers'] = attach_likes(CommunityAnswer, community_answers)
+
+        official_answer = getattr(question, 'official_answer', None) if question.has_official_answer else None
+        if official_answer is not None:
+            attach_likes(QuestionAnswer, [official_answer])
+        context['has_official_answer'] = official_answer is not None
+        # الروابط الثابتة في الصفحة المتكاشة من الدومين الأساسي مش من رابط الطلب
+        context['canonical_url'] = f'{settings.CANONICAL_URL}{question.get_absolute_url()}'
+        context['official_answer'] = official_answer
 
-        # ✅ related_questions مع annotations صح
         related_qs = PublicQuestion.objects.filter(
             status='approved'
-        ).exclude(id=self.object.id).annotate(
-            has_official=Exists(
-                QuestionAnswer.objects.filter(question=OuterRef('pk'))
-            ),
-            has_community_answers=Exists(
-                CommunityAnswer.objects.filter(
-                    question=OuterRef('pk'),
-                    is_spam=False
-                )
-            )
-        ).select_related('category')
+        ).exclude(id=self.object.id)
 
         if self.object.category:
             context['related_questions'] = related_qs.filter(
@@ -251,7 +223,7 @@ class QuestionDetailView(DetailView):
         else:
             context['related_questions'] = related_qs.order_by('-created_at')[:5]
 
-        context['schema_markup'] = self.generate_schema_markup()
+        context['schema_markup'] = self.generate_schema_markup(official_answer, community_answers)
         context['user_ip'] = self.get_client_ip()
 
         return context
@@ -265,67 +237,78 @@ class QuestionDetailView(DetailView):
         return ip
 
     def send_subscription_notifications(self, question, answer):
-        try:
-            subscriptions = QuestionSubscription.objects.filter(
-                question=question,
-                is_active=True
-            )
-            for subscription in subscriptions:
-                email = subscription.user.email if subscription.user else subscription.email
-                if email:
-                    subject = f'🆕 إجابة جديدة: {question.title[:50]}'
-                    message = f"""
-إجابة جديدة على السؤال:
-
-{question.title}
-
-الإجابة:
-{answer.answer_text[:200]}...
+        # الإيميلات بتتجمع في digest واحد لكل مشترك ويبعتها run_worker (qna/tasks.py)،
+        # فشغلانة واحدة مستنية تكفي مهما كان عدد الإجابات الجديدة
+        enqueue_unique('mail.subscription_digest', delay=SUBSCRIPTION_DIGEST_WINDOW)
+
+    def generate_schema_markup(self, official_answer, community_answers):
+        """JSON-LD بتاع QAPage. الهيكل متكاش لحد ما السؤال أو إجاباته تتغير
+        (qna/cache.py)، والإعجابات (upvoteCount) بتتحط مع كل طلب من attach_likes
+        عشان الأصوات مابتبطّلش الكاش"""
+        question = self.object
+        site = f'{self.request.scheme}://{self.request.get_host()}'
+        page_url = site + question.get_absolute_url()
+        key = question_cache_key(question.pk, 'schema', site)
+        schema = cache.get(key)
+        if schema is None:
+            schema = self._build_schema(site, page_url, official_answer, community_answers)
+            cache.set(key, schema, QUESTION_SCHEMA_TIMEOUT)
+
+        likes = {f'{page_url}#answer-{answer.pk}': answer.likes or 0 for answer in community_answers}
+        if official_answer:
+            likes[f'{page_url}#official-answer'] = official_answer.likes or 0
+        entity = schema["mainEntity"]
+        for answer in [entity.get("acceptedAnswer"), *entity["suggestedAnswer"]]:
+            if answer is not None:
+                answer["upvoteCount"] = likes.get(answer["url"], 0)
+
+        # زي json_script: مفيش "</script>" ممكن يقفل الـ tag من جوه النص
+        return mark_safe(
+            json.dumps(schema, ensure_ascii=False, indent=2)
+            .replace('<', '\\u003C').replace('>', '\\u003E').replace('&', '\\u0026')
+        )
 
-اضغط هنا لقراءة الإجابة الكاملة: {self.request.build_absolute_uri(question.get_absolute_url())}
-                    """
-                    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email], fail_silently=True)
-        except Exception as e:
-            print(f"Failed to send subscription notifications: {e}")
+    def _build_schema(self, site, page_url, official_answer, community_answers):
+        question = self.object
 
-    def generate_schema_markup(self):
-        from django.utils.html import escape
+        def author(user, name=''):
+            if user is not None:
+                name = user.get_full_name() or user.username
+            return {"@type": "Person", "name": name, "url": site}
 
-        question = self.object
         schema = {
             "@context": "https://schema.org",
             "@type": "QAPage",
             "mainEntity": {
                 "@type": "Question",
-                "name": escape(question.title),
-                "text": escape(question.question_text),
+                "name": strip_tags(question.title),
+                "text": strip_tags(question.question_text),
                 "dateCreated": question.created_at.isoformat(),
-                "author": {
-                    "@type": "Person",
-                    "name": escape(question.visitor_name)
-                },
-                "answerCount": 0,
+                "author": author(None, question.visitor_name),
+                "answerCount": len(community_answers) + (1 if official_answer else 0),
             }
         }
 
-        try:
-            official_answer = QuestionAnswer.objects.filter(question=question).first()
-            if official_answer:
-                schema["mainEntity"]["answerCount"] = 1
-                schema["mainEntity"]["acceptedAnswer"] = {
-                    "@type": "Answer",
-                    "text": escape(official_answer.answer_text),
-                    "dateCreated": official_answer.answered_at.isoformat(),
-                    "author": {
-                        "@type": "Person",
-                        "name": official_answer.answered_by.get_full_name() or official_answer.answered_by.username
-                    },
-                    "upvoteCount": official_answer.likes
-                }
-        except:
-            pass
-
-        return json.dumps(schema, ensure_ascii=False, indent=2)
+        if official_answer:
+            schema["mainEntity"]["acceptedAnswer"] = {
+                "@type": "Answer",
+                "text": strip_tags(official_answer.answer_text),
+                "dateCreated": official_answer.answered_at.isoformat(),
+                "url": f'{page_url}#official-answer',
+                "author": author(official_answer.answered_by),
+            }
+
+        schema["mainEntity"]["suggestedAnswer"] = [
+            {
+                "@type": "Answer",
+                "text": Truncator(strip_tags(answer.answer_text)).words(80),
+                "dateCreated": answer.created_at.isoformat(),
+                "url": f'{page_url}#answer-{answer.pk}',
+                "author": author(answer.answered_by, answer.visitor_name),
+            }
+            for answer in community_answers
+        ]
+        return schema
 
 
 class AskQuestionView(CreateView):
@@ -343,12 +326,8 @@ class AskQuestionView(CreateView):
         context['total_answers'] = QuestionAnswer.objects.count()
 
         context['example_questions'] = PublicQuestion.objects.filter(
-            status='approved'
-        ).annotate(
-            has_official=Exists(
-                QuestionAnswer.objects.filter(question=OuterRef('pk'))
-            )
-        ).filter(has_official=True).order_by('-view_count')[:3]
+            status='approved', has_official_answer=True
+        ).order_by('-view_count')[:3]
 
         return context
 
@@ -358,17 +337,16 @@ class AskQuestionView(CreateView):
         question.ip_address = self.get_client_ip()
         question.user_agent = self.request.META.get('HTTP_USER_AGENT', '')[:500]
 
-        similar_questions = PublicQuestion.objects.filter(
-            Q(title__icontains=question.title[:30]) |
-            Q(question_text__icontains=question.question_text[:100])
-        ).filter(status__in=['approved', 'pending'])
-
-        if similar_questions.count() >= 2:
+        # الأسئلة شبه المكررة من فهرس MinHash/LSH (qna/duplicates.py)
+        duplicates = [pk for _, pk in find_duplicates(question.title, question.question_text)]
+        if len(duplicates) >= FREQUENT_MIN_DUPLICATES:
             question.is_frequent = True
 
         question.status = 'pending'
         question.save()
-        
+        if question.is_frequent:
+            # السؤال بقى متكرر، فالأسئلة اللي في نفس المجموعة كمان
+            PublicQuestion.objects.filter(pk__in=duplicates, is_frequent=False).update(is_frequent=True)
 
         self.send_admin_notification(question)
 
@@ -409,60 +387,57 @@ class AskQuestionView(CreateView):
         return ip
 
     def send_admin_notification(self, question):
-        try:
-            subject = f'📧 سؤال جديد يحتاج مراجعة: {question.title[:50]}'
-            message = f"""
-سؤال جديد يحتاج مراجعة:
-
-العنوان: {question.title}
-من: {question.visitor_name}
-البريد: {question.visitor_email or 'غير متوفر'}
-الهاتف: {question.visitor_phone or 'غير متوفر'}
-الفئة: {question.category.name if question.category else 'غير محدد'}
-
-نص السؤال:
-{question.question_text[:300]}...
-
-للمراجعة والموافقة: {self.request.build_absolute_uri('/admin/qna/publicquestion/')}
-            """
-            if hasattr(settings, 'ADMINS') and settings.ADMINS:
-                admin_emails = [email for name, email in settings.ADMINS]
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    admin_emails,
-                    fail_silently=True,
-                )
-        except Exception as e:
-            print(f"Failed to send admin notification: {e}")
+        enqueue(
+            'mail.question_admins',
+            question_id=question.pk,
+            review_url=self.request.build_absolute_uri('/admin/qna/publicquestion/'),
+        )
 
 
 # ============================================
 # دوال AJAX للتصويت والتفاعل
 # ============================================
 
+def similar_questions(request):
+    """أسئلة معتمدة شبه سؤال الزائر وهو بيكتبه (صفحة اطرح سؤالاً)"""
+    title = request.GET.get('title', '').strip()[:200]
+    text = request.GET.get('text', '').strip()[:2000]
+    if len(title) < 10:
+        return JsonResponse({'results': []})
+
+    matches = find_duplicates(title, text, statuses=('approved',), limit=5, threshold=SUGGESTION_THRESHOLD)
+    questions = PublicQuestion.objects.in_bulk([pk for _, pk in matches])
+    results = []
+    for score, pk in matches:
+        question = questions.get(pk)
+        if question is None:
+            continue
+        results.append({
+            'title': question.title,
+            'url': question.get_absolute_url(),
+            'answered': question.has_official_answer or question.community_answer_count > 0,
+            'similarity': round(score, 2),
+        })
+    return JsonResponse({'results': results})
+
+
+def _vote(request, model, answer_id, **answer_filters):
+    """الصوت INSERT واحد والعدد من جدول الأصوات (qna/votes.py)"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    ip = x_forwarded_for.split(',')[0].strip() if x_forwarded_for else request.META.get('REMOTE_ADDR')
+
+    created, likes = like_answer(model, answer_id, ip, **answer_filters)
+    if created:
+        return JsonResponse({'success': True, 'likes': likes, 'message': 'شكراً لتصويتك!'})
+    if not model.objects.filter(pk=answer_id, **answer_filters).exists():
+        return JsonResponse({'success': False, 'message': 'الإجابة غير موجودة'}, status=404)
+    return JsonResponse({'success': False, 'message': 'لقد صوّت مسبقاً على هذه الإجابة'})
+
+
 @require_POST
 def vote_answer(request, answer_id):
     try:
-        answer = get_object_or_404(QuestionAnswer, id=answer_id)
-
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        ip = x_forwarded_for.split(',')[0].strip() if x_forwarded_for else request.META.get('REMOTE_ADDR')
-
-        vote, created = UserVote.objects.get_or_create(
-            answer=answer,
-            ip_address=ip
-        )
-
-        if created:
-            answer.likes = F('likes') + 1
-            answer.save(update_fields=['likes'])
-            answer.refresh_from_db()
-            return JsonResponse({'success': True, 'likes': answer.likes, 'message': 'شكراً لتصويتك!'})
-        else:
-            return JsonResponse({'success': False, 'message': 'لقد صوّت مسبقاً على هذه الإجابة'})
-
+        return _vote(request, QuestionAnswer, answer_id)
     except Exception as e:
         print(f"Vote error: {e}")
         return JsonResponse({'success': False, 'message': 'حدث خطأ أثناء التصويت'}, status=500)
@@ -471,24 +446,7 @@ def vote_answer(request, answer_id):
 @require_POST
 def vote_community_answer(request, answer_id):
     try:
-        answer = get_object_or_404(CommunityAnswer, id=answer_id, is_spam=False)
-
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        ip = x_forwarded_for.split(',')[0].strip() if x_forwarded_for else request.META.get('REMOTE_ADDR')
-
-        vote, created = CommunityAnswerVote.objects.get_or_create(
-            answer=answer,
-            ip_address=ip
-        )
-
-        if created:
-            answer.likes = F('likes') + 1
-            answer.save(update_fields=['likes'])
-            answer.refresh_from_db()
-            return JsonResponse({'success': True, 'likes': answer.likes, 'message': 'شكراً لتصويتك!'})
-        else:
-            return JsonResponse({'success': False, 'message': 'لقد صوّت مسبقاً على هذه الإجابة'})
-
+        return _vote(request, CommunityAnswer, answer_id, is_spam=False)
     except Exception as e:
         print(f"Vote community error: {e}")
         return JsonResponse({'success': False, 'message': 'حدث خطأ أثناء التصويت'}, status=500)
@@ -0,0 +1,122 @@
+"""تسجيل الإعجابات على الإجابات من غير قفل على صف الإجابة.
+
+الصوت = INSERT واحد بيتجاهل التكرار (ON CONFLICT DO NOTHING على قيد
+(answer, ip_address) الموجود في UserVote وCommunityAnswerVote)، ومعاه
+شرط إن الإجابة موجودة (INSERT ... SELECT)، فمفيش get_or_create ولا
+UPDATE على likes ولا refresh_from_db.
+
+الرقم اللي بيرجع للزائر والرقم المعروض في الصفحة بيتعدوا من جدول الأصوات
+نفسه (COUNT على الـ index بتاع (answer, ip_address)، استعلام واحد لكل
+الإجابات في الصفحة)، فمفيش عداد في كاش لكل process يختلف من worker للتاني.
+
+عمود likes (للترتيب) بيتظبط على دفعات في شغلانة 'qna.reconcile_likes'
+بتتسجل مرة واحدة كل LIKES_RECONCILE_INTERVAL مع أول صوت، وبتعدي بس على
+الإجابات اللي جالها أصوات من وقت تسجيلها (since). مسح صوت من الأدمن بيظبط
+إجابته على طول من الـ signal (sync_likes)، وأمر reconcile_likes بيظبط الكل.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache_versions import shared_cache
+from core.jobs import enqueue
+
+from .models import CommunityAnswer, CommunityAnswerVote, QuestionAnswer, UserVote
+
+VOTE_MODELS = {
+    QuestionAnswer: UserVote,
+    CommunityAnswer: CommunityAnswerVote,
+}
+LIKES_RECONCILE_INTERVAL = 5 * 60
+LIKES_RECONCILE_KEY = 'likes:reconcile-scheduled'
+# هامش لفرق الساعة بين الـ processes، عشان صوت على الحدود مايفلتش من الظبط
+LIKES_RECONCILE_MARGIN = timedelta(minutes=1)
+
+
+def record_vote(model, answer_id, ip_address, **answer_filters):
+    """INSERT واحد للصوت لو الإجابة موجودة (وبتطابق answer_filters) والـ IP
+    ماصوتش قبل كده. بيرجع True لو الصوت اتسجل"""
+    vote_model = VOTE_MODELS[model]
+    opts = vote_model._meta
+    quote = connection.ops.quote_name
+    answer_field = opts.get_field('answer')
+    ip_field = opts.get_field('ip_address')
+    created_field = opts.get_field('created_at')
+
+    # SELECT الإجابة (لو موجودة) + قيم الصوت كأعمدة، فالـ INSERT مابيحطش صف لإجابة مش موجودة
+    select_sql, params = (
+        model.objects.filter(pk=answer_id, **answer_filters).order_by()
+        .annotate(
+            vote_ip=Value(ip_address, output_field=ip_field),
+            vote_created=Value(timezone.now(), output_field=created_field),
+        )
+        .values_list('pk', 'vote_ip', 'vote_created').query.sql_with_params()
+    )
+    # الـ SELECT فيه WHERE دايمًا، فـ SQLite مابيلخبطش ON CONFLICT مع JOIN ... ON
+    sql = (
+        f'INSERT INTO {quote(opts.db_table)} '
+        f'({quote(answer_field.column)}, {quote(ip_field.column)}, {quote(created_field.column)}) '
+        f'{select_sql} ON CONFLICT DO NOTHING'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
+
+
+def like_answer(model, answer_id, ip_address, **answer_filters):
+    """(اتسجل؟، عدد الإعجابات الحالي من جدول الأصوات)"""
+    if not record_vote(model, answer_id, ip_address, **answer_filters):
+        return False, None
+    likes = VOTE_MODELS[model].objects.filter(answer_id=answer_id).count()
+    schedule_likes_reconcile()
+    return True, likes
+
+
+def attach_likes(model, answers):
+    """بيحط عدد الأصوات الحالي (استعلام واحد) مكان likes المتخزن في الداتابيز"""
+    if not answers:
+        return answers
+    counts = dict(
+        VOTE_MODELS[model].objects.filter(answer_id__in=[answer.pk for answer in answers]).order_by()
+        .values('answer').annotate(n=Count('pk')).values_list('answer', 'n')
+    )
+    for answer in answers:
+        answer.likes = counts.get(answer.pk, 0)
+    return answers
+
+
+def sync_likes(model, pk):
+    """likes = عدد الأصوات لإجابة واحدة (بعد مسح أصوات)"""
+    model.objects.filter(pk=pk).update(likes=VOTE_MODELS[model].objects.filter(answer_id=pk).count())
+
+
+def schedule_likes_reconcile():
+    """شغلانة ظبط واحدة بس لكل LIKES_RECONCILE_INTERVAL مهما كان عدد الأصوات
+    وعدد الـ processes (العلامة في الكاش المشترك)"""
+    if shared_cache.add(LIKES_RECONCILE_KEY, 1, LIKES_RECONCILE_INTERVAL):
+        since = timezone.now() - LIKES_RECONCILE_MARGIN
+        enqueue('qna.reconcile_likes', delay=timedelta(seconds=LIKES_RECONCILE_INTERVAL), since=since.isoformat())
+
+
+def reconcile_likes(since=None):
+    """handler شغلانة 'qna.reconcile_likes': likes = عدد الأصوات للإجابات اللي
+    الرقم بتاعها مختلف بس (UPDATE واحد لكل موديل). since (ISO): الإجابات اللي
+    جالها أصوات من الوقت ده بس، ومن غيره الجدول كله. بيرجع عدد الإجابات اللي اتظبطت"""
+    since = parse_datetime(since) if isinstance(since, str) else since
+    changed = 0
+    for model, vote_model in VOTE_MODELS.items():
+        votes = Coalesce(Subquery(
+            vote_model.objects.filter(answer=OuterRef('pk')).order_by()
+            .values('answer').annotate(n=Count('pk')).values('n')
+        ), 0)
+        answers = model.objects.all()
+        if since is not None:
+            answers = answers.filter(pk__in=vote_model.objects.filter(created_at__gte=since).values('answer'))
+        stale = list(answers.annotate(vote_count=votes).exclude(likes=F('vote_count')).values_list('pk', flat=True))
+        if stale:
+            changed += model.objects.filter(pk__in=stale).update(likes=votes)
+    return changed
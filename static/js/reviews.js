@@ -2,26 +2,16 @@
 (function() {
     'use strict';
     
-    const reviews = [
-        {file: 'review1.jpeg', alt: 'رأي طالب عن تجربته في تحفيظ القرآن'},
-        {file: 'review2.jpeg', alt: 'تقييم ولي أمر لجودة التعليم'},
-        {file: 'review3.jpeg', alt: 'شهادة طالبة عن تحسن مستواها'},
-        {file: 'review4.jpeg', alt: 'رأي إيجابي عن المعلمات'},
-        {file: 'review5.jpeg', alt: 'تجربة ناجحة في التحفيظ'},
-        {file: 'review6.jpeg', alt: 'تقييم خمس نجوم'},
-        {file: 'review7.jpeg', alt: 'شكر من ولي أمر'},
-        {file: 'review8.jpeg', alt: 'رأي عن المواعيد المرنة'},
-        {file: 'review9.jpeg', alt: 'تجربة في تصحيح التلاوة'},
-        {file: 'review10.jpeg', alt: 'تقييم الدعم الفني'},
-        {file: 'review11.jpeg', alt: 'فعالية البرامج التعليمية'},
-        {file: 'review12.jpeg', alt: 'تطور سريع للطالب'}
-    ];
+    // الصور (<picture> أو <img>) متجهزة في <template id="review-images"> من السيرفر
+    const reviewImagesTemplate = document.getElementById('review-images');
+    const reviews = reviewImagesTemplate
+        ? Array.from(reviewImagesTemplate.content.children)
+        : [];
     
     let currentPage = 0;
     let reviewsPerPage = 4;
     let totalPages = Math.ceil(reviews.length / reviewsPerPage);
     let autoPlayInterval;
-    let imageObserver;
     let isInView = false;
     let sectionObserver;
     
@@ -57,24 +47,6 @@
         updateReviewsPerPage();
         window.addEventListener('resize', handleResize);
         
-        // Create intersection observer for lazy loading images
-        imageObserver = new IntersectionObserver((entries) => {
-            entries.forEach(entry => {
-                if (entry.isIntersecting) {
-                    const img = entry.target;
-                    const src = img.getAttribute('data-src');
-                    if (src) {
-                        img.src = src;
-                        img.removeAttribute('data-src');
-                        imageObserver.unobserve(img);
-                    }
-                }
-            });
-        }, {
-            rootMargin: '50px 0px',
-            threshold: 0.01
-        });
-        
         // Create intersection observer for section visibility (auto-play)
         const reviewsSection = document.querySelector('.reviews-section');
         if (reviewsSection) {
@@ -237,17 +209,17 @@
         reviewNumber.className = 'review-number';
         reviewNumber.textContent = `#${number}`;
         
-        const img = document.createElement('img');
-        img.className = 'skeleton';
-        img.setAttribute('data-src', `/static/images/${review.file}`);
-        img.alt = review.alt;
-        img.width = 300;
-        img.height = 350;
-        img.loading = 'lazy';
+        // التحميل المؤجل بقى من المتصفح نفسه (loading="lazy" على الصورة)
+        const media = review.cloneNode(true);
+        const img = media.tagName === 'IMG' ? media : media.querySelector('img');
         
         // Error handling
         img.onerror = function() {
             this.onerror = null;
+            if (this.parentNode.tagName === 'PICTURE') {
+                this.parentNode.querySelectorAll('source').forEach(source => source.remove());
+            }
+            this.removeAttribute('srcset');
             this.src = `data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='300' height='350'%3E%3Crect fill='%231b3a70' width='300' height='350'/%3E%3Ctext fill='%234CAF50' font-family='Arial' font-size='20' x='50%25' y='50%25' text-anchor='middle' dominant-baseline='middle'%3Eرأي طالب ${number}%3C/text%3E%3C/svg%3E`;
             this.classList.remove('skeleton');
         };
@@ -257,9 +229,7 @@
         };
         
         reviewItem.appendChild(reviewNumber);
-        reviewItem.appendChild(img);
-        
-        imageObserver.observe(img);
+        reviewItem.appendChild(media);
         
         return reviewItem;
     }